@@ -0,0 +1,81 @@
+import argparse
+import os
+import sys
+
+from benchmarks.cases import run_converter_cases, run_send_cases
+from benchmarks.runner import (
+    find_regressions,
+    format_results,
+    load_baseline,
+    save_baseline,
+    DEFAULT_TOLERANCE,
+)
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+# Exit code when there is no baseline, so a missing one can't pass for a run
+# without regressions
+MISSING_BASELINE_EXIT_CODE = 2
+
+
+def main(argv=None) -> int:
+    """
+    Runs the benchmarks and compares them with the baseline
+    Args:
+        argv (list or none): Command line arguments, the process ones
+            if none.
+    Returns:
+        int: Exit code, not 0 if a case regressed or there's no
+            baseline.
+    """
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks',
+        description='Benchmarks the hot paths of the connector',
+    )
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument(
+        '--save',
+        action='store_true',
+        help='save the results as the new baseline',
+    )
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument(
+        '--no-network',
+        action='store_true',
+        help='skip the cases sending to the stub server',
+    )
+    args = parser.parse_args(argv)
+
+    results = run_converter_cases(args.iterations)
+
+    if not args.no_network:
+        results += run_send_cases(args.iterations // 10)
+
+    print(format_results(results))
+
+    if args.save:
+        save_baseline(args.baseline, results)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(
+            f"No baseline at {args.baseline} to compare with, run with "
+            "--save on the base branch first"
+        )
+        return MISSING_BASELINE_EXIT_CODE
+
+    regressions = find_regressions(
+        results,
+        load_baseline(args.baseline),
+        args.tolerance,
+    )
+
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,224 @@
+from typing import Any, Dict, List
+
+import asyncio
+
+from rasa_whatsapp_connector.serialization import decode_webhook, dumps
+from rasa_whatsapp_connector.whatsapp import RasaToWhatsappConverter
+
+from benchmarks.runner import BenchmarkResult, measure, measure_async
+from benchmarks.stub_server import StubGraphServer
+
+PHONE_IDENTIFIER = '987654321'
+RECIPIENT = '12345678'
+TEXT = 'Hi! What would you like to do today?'
+BATCH_SIZE = 50
+
+
+def get_buttons(count: int) -> List[Dict[str, Any]]:
+    """
+    Gets rasa buttons
+    Args:
+        count (int): Number of buttons.
+    Returns:
+        list: The buttons.
+    """
+    return [
+        {
+            'title': f'Option number {index}',
+            'payload': f'/choose{{"option": {index}}}',
+        } for index in range(count)
+    ]
+
+
+def get_hook(messages: int) -> bytes:
+    """
+    Gets the raw body of a hook call, like the ones Meta sends
+    Args:
+        messages (int): Number of text messages in the call.
+    Returns:
+        bytes: The json encoded hook call.
+    """
+    value = {
+        "messaging_product": "whatsapp",
+        "metadata":
+            {
+                "display_phone_number": "15550000000",
+                "phone_number_id": PHONE_IDENTIFIER,
+            },
+        "contacts": [{
+            "profile": {
+                "name": "User"
+            },
+            "wa_id": RECIPIENT,
+        }],
+        "messages": [],
+    }
+
+    for index in range(messages):
+        value["messages"].append(
+            {
+                "from": RECIPIENT,
+                "id": f"wamid.{index}",
+                "timestamp": "1700000000",
+                "type": "text",
+                "text": {
+                    "body": TEXT
+                },
+            }
+        )
+
+    change = {"field": "messages", "value": value}
+
+    return dumps(
+        {
+            "object": "whatsapp_business_account",
+            "entry": [{
+                "id": "1",
+                "changes": [change]
+            }],
+        }
+    )
+
+
+def run_converter_cases(iterations: int) -> List[BenchmarkResult]:
+    """
+    Measures preparing and parsing messages, without any network
+    Args:
+        iterations (int): Number of measured calls of each case.
+    Returns:
+        list: The result of each case.
+    """
+    converter = RasaToWhatsappConverter(PHONE_IDENTIFIER, 'token')
+    # Every response is encoded again, as for responses seen for the first
+    # time, rather than spliced into a warm response cache
+    uncached = RasaToWhatsappConverter(
+        PHONE_IDENTIFIER,
+        'token',
+        response_cache_size=0,
+    )
+    buttons = get_buttons(3)
+    list_buttons = get_buttons(8)
+    menu_buttons = get_buttons(25)
+    single_hook = get_hook(1)
+    batch_hook = get_hook(BATCH_SIZE)
+
+    def prepare_dumps_button():
+        # The payload the blocking send path builds and encodes
+        dumps(converter.prepare_message(RECIPIENT, TEXT, buttons))
+
+    def prepare_body_list():
+        converter.prepare_message_body(RECIPIENT, TEXT, list_buttons)
+
+    def prepare_body_text_uncached():
+        uncached.prepare_message_body(RECIPIENT, TEXT)
+
+    def prepare_body_button_uncached():
+        uncached.prepare_message_body(RECIPIENT, TEXT, buttons)
+
+    def prepare_body_list_uncached():
+        uncached.prepare_message_body(RECIPIENT, TEXT, list_buttons)
+
+    def parse_single():
+        converter.get_message_from_whatsapp_hook(decode_webhook(single_hook))
+
+    def parse_batch():
+        for _ in converter.iter_inbound_messages_from_whatsapp_hook(
+            decode_webhook(batch_hook)
+        ):
+            pass
+
+    return [
+        measure(
+            'prepare_text',
+            lambda: converter.prepare_message(RECIPIENT, TEXT),
+            iterations,
+        ),
+        measure(
+            'prepare_button',
+            lambda: converter.prepare_message(RECIPIENT, TEXT, buttons),
+            iterations,
+        ),
+        measure(
+            'prepare_list',
+            lambda: converter.prepare_message(RECIPIENT, TEXT, list_buttons),
+            iterations,
+        ),
+        measure(
+            'prepare_menu',
+            lambda: converter.prepare_message(RECIPIENT, TEXT, menu_buttons),
+            iterations,
+        ),
+        measure(
+            'prepare_dumps_button',
+            prepare_dumps_button,
+            iterations,
+        ),
+        measure(
+            'prepare_body_list',
+            prepare_body_list,
+            iterations,
+        ),
+        measure(
+            'prepare_body_text_uncached',
+            prepare_body_text_uncached,
+            iterations,
+        ),
+        measure(
+            'prepare_body_button_uncached',
+            prepare_body_button_uncached,
+            iterations,
+        ),
+        measure(
+            'prepare_body_list_uncached',
+            prepare_body_list_uncached,
+            iterations,
+        ),
+        measure(
+            'parse_single',
+            parse_single,
+            iterations,
+        ),
+        measure(
+            'parse_batch',
+            parse_batch,
+            max(iterations // BATCH_SIZE, 1),
+            messages_per_call=BATCH_SIZE,
+            warmup=10,
+        ),
+    ]
+
+
+def run_send_cases(iterations: int) -> List[BenchmarkResult]:
+    """
+    Measures sending messages end to end to a local stub Graph Api
+    Args:
+        iterations (int): Number of measured calls of each case.
+    Returns:
+        list: The result of each case.
+    """
+    with StubGraphServer() as server:
+        converter = RasaToWhatsappConverter(
+            PHONE_IDENTIFIER,
+            'token',
+            graph_api_url=server.url,
+        )
+
+        async def run_async() -> BenchmarkResult:
+            try:
+                return await measure_async(
+                    'send_message_async',
+                    lambda: converter.send_message_async(RECIPIENT, TEXT),
+                    iterations,
+                )
+            finally:
+                await converter.close()
+
+        # Every blocking send opens a new connection, as in production
+        blocking = measure(
+            'send_message',
+            lambda: converter.send_message(RECIPIENT, TEXT),
+            max(iterations // 10, 1),
+            warmup=10,
+        )
+
+        return [blocking, asyncio.run(run_async())]
@@ -0,0 +1,257 @@
+from typing import Any, Awaitable, Callable, Dict, List
+from dataclasses import asdict, dataclass
+
+import gc
+import json
+import statistics
+import time
+import tracemalloc
+
+DEFAULT_TOLERANCE = 0.2
+
+
+@dataclass
+class BenchmarkResult:
+    """
+    Measurements of a benchmark case
+    """
+    name: str
+    messages: int
+    messages_per_second: float
+    # Latency of a single call, in microseconds
+    p50: float
+    p99: float
+    # Peak bytes allocated while handling a message
+    allocated_bytes: float
+
+    def as_dict(self) -> Dict[str, Any]:
+        """
+        Gets the result as a dict
+        Returns:
+            dict[str]: The fields of the result.
+        """
+        return asdict(self)
+
+
+def _get_percentile(latencies: List[float], percentile: int) -> float:
+    if len(latencies) == 1:
+        return latencies[0]
+
+    return statistics.quantiles(latencies, n=100)[percentile - 1]
+
+
+def _get_result(
+    name: str,
+    latencies: List[float],
+    messages_per_call: int,
+    allocated_bytes: float,
+) -> BenchmarkResult:
+    messages = len(latencies) * messages_per_call
+    total = sum(latencies)
+
+    return BenchmarkResult(
+        name,
+        messages,
+        messages / total if total else 0,
+        _get_percentile(latencies, 50) * 1e6,
+        _get_percentile(latencies, 99) * 1e6,
+        allocated_bytes / messages_per_call,
+    )
+
+
+def measure(
+    name: str,
+    func: Callable[[], Any],
+    iterations: int,
+    messages_per_call: int = 1,
+    warmup: int = 100,
+) -> BenchmarkResult:
+    """
+    Measures a blocking case. Timing and allocations are measured in
+    separate runs, since tracing allocations slows every call down.
+    Args:
+        name (str): Case name.
+        func (callable): Handles messages_per_call messages.
+        iterations (int): Number of measured calls.
+        messages_per_call (int): Messages handled by each call.
+        warmup (int): Calls made before measuring, to fill caches.
+    Returns:
+        BenchmarkResult: The measurements.
+    """
+    for _ in range(warmup):
+        func()
+
+    latencies = []
+    gc.collect()
+
+    for _ in range(iterations):
+        started_at = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - started_at)
+
+    allocated = 0
+    allocation_iterations = min(iterations, 1000)
+    tracemalloc.start()
+
+    try:
+        for _ in range(allocation_iterations):
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+            allocated += peak - before
+    finally:
+        tracemalloc.stop()
+
+    return _get_result(
+        name,
+        latencies,
+        messages_per_call,
+        allocated / allocation_iterations,
+    )
+
+
+async def measure_async(
+    name: str,
+    func: Callable[[], Awaitable[Any]],
+    iterations: int,
+    messages_per_call: int = 1,
+    warmup: int = 100,
+) -> BenchmarkResult:
+    """
+    Measures an asynchronous case, see measure
+    Args:
+        name (str): Case name.
+        func (callable): Awaitable handling messages_per_call messages.
+        iterations (int): Number of measured calls.
+        messages_per_call (int): Messages handled by each call.
+        warmup (int): Calls made before measuring, to fill caches.
+    Returns:
+        BenchmarkResult: The measurements.
+    """
+    for _ in range(warmup):
+        await func()
+
+    latencies = []
+    gc.collect()
+
+    for _ in range(iterations):
+        started_at = time.perf_counter()
+        await func()
+        latencies.append(time.perf_counter() - started_at)
+
+    allocated = 0
+    allocation_iterations = min(iterations, 1000)
+    tracemalloc.start()
+
+    try:
+        for _ in range(allocation_iterations):
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            await func()
+            _, peak = tracemalloc.get_traced_memory()
+            allocated += peak - before
+    finally:
+        tracemalloc.stop()
+
+    return _get_result(
+        name,
+        latencies,
+        messages_per_call,
+        allocated / allocation_iterations,
+    )
+
+
+def load_baseline(path: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Loads the results saved by save_baseline
+    Args:
+        path (str): Path of the json file.
+    Returns:
+        dict[str]: The results by case name.
+    """
+    with open(path, encoding='utf-8') as baseline_file:
+        return json.load(baseline_file)
+
+
+def save_baseline(path: str, results: List[BenchmarkResult]):
+    """
+    Saves results as the baseline of later runs
+    Args:
+        path (str): Path of the baseline json file.
+        results (list): Results of the run.
+    """
+    baseline = {result.name: result.as_dict() for result in results}
+
+    with open(path, 'w', encoding='utf-8') as baseline_file:
+        json.dump(baseline, baseline_file, indent=2)
+
+
+def find_regressions(
+    results: List[BenchmarkResult],
+    baseline: Dict[str, Dict[str, Any]],
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> List[str]:
+    """
+    Compares results with a baseline. A case regresses when its throughput
+    drops, or its allocations grow, by more than the tolerance. Latency
+    percentiles are reported but not compared, since they are too noisy.
+    Args:
+        results (list): Current results.
+        baseline (dict[str]): Baseline results by case name.
+        tolerance (float): Allowed relative change.
+    Returns:
+        list: A description of every regression.
+    """
+    regressions = []
+
+    for result in results:
+        expected = baseline.get(result.name)
+
+        if expected is None:
+            continue
+
+        minimum = expected['messages_per_second'] * (1 - tolerance)
+
+        if result.messages_per_second < minimum:
+            regressions.append(
+                f"{result.name}: {result.messages_per_second:.0f} msgs/s, "
+                f"baseline {expected['messages_per_second']:.0f} msgs/s"
+            )
+
+        # A few bytes of difference are just noise of the tracer
+        maximum = max(
+            expected['allocated_bytes'] * (1 + tolerance),
+            expected['allocated_bytes'] + 64,
+        )
+
+        if result.allocated_bytes > maximum:
+            regressions.append(
+                f"{result.name}: {result.allocated_bytes:.0f} bytes/msg, "
+                f"baseline {expected['allocated_bytes']:.0f} bytes/msg"
+            )
+
+    return regressions
+
+
+def format_results(results: List[BenchmarkResult]) -> str:
+    """
+    Formats results as a table
+    Args:
+        results (list): Results of the run.
+    Returns:
+        str: The table.
+    """
+    lines = [
+        f"{'case':<30}{'msgs/s':>12}{'p50 us':>10}{'p99 us':>10}"
+        f"{'bytes/msg':>12}"
+    ]
+
+    for result in results:
+        lines.append(
+            f"{result.name:<30}{result.messages_per_second:>12.0f}"
+            f"{result.p50:>10.1f}{result.p99:>10.1f}"
+            f"{result.allocated_bytes:>12.0f}"
+        )
+
+    return '\n'.join(lines)
@@ -0,0 +1,62 @@
+import asyncio
+import threading
+
+from rasa_whatsapp_connector.loadtest.simulator import GraphApiSimulator
+
+
+class StubGraphServer:
+    """
+    Local stand-in for the Graph Api messages endpoint, answering every
+    message right away. It runs the load test's GraphApiSimulator on its own
+    event loop in a background thread, so both blocking and asynchronous
+    senders can be measured against it.
+    """
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        """
+        Args:
+            host (str): Address to listen on.
+            port (int): Port to listen on, 0 picks a free one.
+        """
+        self._simulator = GraphApiSimulator(host, port)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever)
+
+    @property
+    def url(self) -> str:
+        """
+        Base url of the server
+        """
+        return self._simulator.url
+
+    @property
+    def requests(self) -> int:
+        """
+        Number of messages answered
+        """
+        return self._simulator.counts['sent']
+
+    def _run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def start(self):
+        """
+        Starts the event loop thread and the server
+        """
+        self._thread.start()
+        self._run(self._simulator.start())
+
+    def stop(self):
+        """
+        Stops the server and its event loop thread
+        """
+        self._run(self._simulator.stop())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,336 @@
+from typing import Any, Awaitable, Callable, Dict, List
+
+import asyncio
+import concurrent.futures
+import logging
+import multiprocessing
+import queue
+import zlib
+
+from rasa_whatsapp_connector.models import InboundMessage
+from rasa_whatsapp_connector.serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PARTITIONS = 8
+DEFAULT_PARTITION_SIZE = 1000
+# Seconds a multiprocessing consumer blocks before checking for cancellation
+DEFAULT_POLL_INTERVAL = 0.1
+
+
+def get_partition(sender_id: str, partitions: int) -> int:
+    """
+    Gets the partition of a sender. Every message of a sender goes to the
+    same partition, so its order is kept.
+    Args:
+        sender_id (str): Whatsapp id of the sender.
+        partitions (int): Number of partitions.
+    Returns:
+        int: The partition, from 0 to partitions - 1.
+    """
+    return zlib.crc32(sender_id.encode()) % partitions
+
+
+def encode_message(message: InboundMessage) -> bytes:
+    """
+    Encodes a normalized message for a broker, without the raw hook message
+    Args:
+        message (InboundMessage): Received message.
+    Returns:
+        bytes: The json encoded message.
+    """
+    return dumps(
+        {
+            'sender_id': message.sender_id,
+            'text': message.text,
+            'type': message.type,
+            'message_id': message.message_id,
+            'timestamp': message.timestamp,
+            'payload': message.payload,
+            'phone_number_id': message.phone_number_id,
+            'metadata': message.metadata,
+        }
+    )
+
+
+def decode_message(data: bytes) -> InboundMessage:
+    """
+    Decodes a message encoded with encode_message
+    Args:
+        data (bytes): The json encoded message.
+    Returns:
+        InboundMessage: The message.
+    Raises:
+        ValueError if the data isn't an encoded message
+    """
+    try:
+        return InboundMessage(**loads(data))
+    except TypeError as exc:
+        raise ValueError("Provided message is invalid!") from exc
+
+
+class MessageBroker:
+    """
+    Partitioned broker between the ingress processes that receive hook
+    calls and the worker processes that run rasa. Backends move opaque
+    encoded messages, so a Redis streams or Kafka backend only needs to
+    implement publish and consume.
+    """
+    def __init__(self, partitions: int = DEFAULT_PARTITIONS):
+        """
+        Args:
+            partitions (int): Number of partitions.
+        """
+        self.partitions = partitions
+
+    async def publish(self, partition: int, data: bytes) -> bool:
+        """
+        Publishes an encoded message without waiting for room
+        Args:
+            partition (int): Partition of the message.
+            data (bytes): Encoded message.
+        Returns:
+            bool: False if the partition is full and the message was not
+                published.
+        """
+        raise NotImplementedError()
+
+    async def consume(self, partition: int) -> bytes:
+        """
+        Waits for the next message of a partition
+        Args:
+            partition (int): Partition to consume.
+        Returns:
+            bytes: The encoded message.
+        """
+        raise NotImplementedError()
+
+    async def stop_consuming(self):
+        """
+        Releases what consuming needed, once the consumers of this process
+        are stopped
+        """
+
+    async def close(self):
+        """
+        Releases the resources of the broker
+        """
+
+
+class InMemoryBroker(MessageBroker):
+    """
+    Broker of asyncio queues, for an ingress and workers running in the
+    same event loop, like in tests
+    """
+    def __init__(
+        self,
+        partitions: int = DEFAULT_PARTITIONS,
+        partition_size: int = DEFAULT_PARTITION_SIZE,
+    ):
+        """
+        Args:
+            partitions (int): Number of partitions.
+            partition_size (int): Maximum number of messages of a partition.
+        """
+        super().__init__(partitions)
+        self._partition_size = partition_size
+        self._queues: Dict[int, asyncio.Queue] = {}
+
+    def _get_queue(self, partition: int) -> asyncio.Queue:
+        # Created lazily so they bind to the running event loop
+        if partition not in self._queues:
+            self._queues[partition] = asyncio.Queue(self._partition_size)
+
+        return self._queues[partition]
+
+    async def publish(self, partition: int, data: bytes) -> bool:
+        try:
+            self._get_queue(partition).put_nowait(data)
+        except asyncio.QueueFull:
+            return False
+
+        return True
+
+    async def consume(self, partition: int) -> bytes:
+        return await self._get_queue(partition).get()
+
+
+class MultiprocessingBroker(MessageBroker):
+    """
+    Broker of multiprocessing queues, for an ingress and workers running in
+    processes started from the same parent, like a local deployment using
+    every core. The broker has to be created before the processes are
+    started and passed to them.
+    """
+    def __init__(
+        self,
+        partitions: int = DEFAULT_PARTITIONS,
+        partition_size: int = DEFAULT_PARTITION_SIZE,
+        context: Any = None,
+    ):
+        """
+        Args:
+            partitions (int): Number of partitions.
+            partition_size (int): Maximum number of messages of a partition.
+            context (multiprocessing context or none): Context creating the
+                queues, the default one if none.
+        """
+        super().__init__(partitions)
+        context = context or multiprocessing.get_context()
+        self._queues = [
+            context.Queue(partition_size) for _ in range(partitions)
+        ]
+        # Gets block their thread, so they get a pool of their own rather
+        # than starving the default executor. Created in the consuming
+        # process, since the broker is handed to it before it is started.
+        self._executor: concurrent.futures.ThreadPoolExecutor | None = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_executor'] = None
+
+        return state
+
+    def _get_executor(self) -> concurrent.futures.ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                self.partitions,
+                thread_name_prefix='whatsapp-broker',
+            )
+
+        return self._executor
+
+    async def publish(self, partition: int, data: bytes) -> bool:
+        try:
+            self._queues[partition].put_nowait(data)
+        except queue.Full:
+            return False
+
+        return True
+
+    def _get(self, partition: int) -> bytes | None:
+        try:
+            return self._queues[partition].get(timeout=DEFAULT_POLL_INTERVAL)
+        except queue.Empty:
+            return None
+
+    async def consume(self, partition: int) -> bytes:
+        # Gets block a thread for a short while at most, so a cancelled
+        # consumer doesn't leave a thread waiting forever
+        loop = asyncio.get_running_loop()
+
+        while True:
+            data = await loop.run_in_executor(
+                self._get_executor(),
+                self._get,
+                partition,
+            )
+
+            if data is not None:
+                return data
+
+    async def stop_consuming(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def close(self):
+        await self.stop_consuming()
+
+        for partition_queue in self._queues:
+            partition_queue.close()
+
+
+class BrokerPublisher:
+    """
+    Ingress side of a broker, publishes received messages to the partition
+    of their sender
+    """
+    def __init__(self, broker: MessageBroker):
+        """
+        Args:
+            broker (MessageBroker): Broker to publish to.
+        """
+        self._broker = broker
+
+    async def publish(self, message: InboundMessage) -> bool:
+        """
+        Publishes a received message
+        Args:
+            message (InboundMessage): Received message.
+        Returns:
+            bool: False if the partition is full.
+        """
+        partition = get_partition(message.sender_id, self._broker.partitions)
+
+        return await self._broker.publish(partition, encode_message(message))
+
+
+class BrokerConsumer:
+    """
+    Worker side of a broker, hands the messages of a set of partitions to
+    a handler. Each partition is consumed in order, so handlers that keep
+    the order of each sender, like KeyedExecutor.submit, see the messages of
+    a sender in the order they were received.
+    """
+    def __init__(
+        self,
+        broker: MessageBroker,
+        handler: Callable[[InboundMessage], Awaitable[Any]],
+        partitions: List[int] | None = None,
+    ):
+        """
+        Args:
+            broker (MessageBroker): Broker to consume from.
+            handler (callable): Awaited with each message.
+            partitions (list or none): Partitions of this worker, every one
+                if none. Partitions must be split among the workers, each
+                partition consumed by a single worker.
+        """
+        self._broker = broker
+        self._handler = handler
+        self._partitions = partitions
+
+        if self._partitions is None:
+            self._partitions = list(range(broker.partitions))
+
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        """
+        Whether the consumer tasks are running
+        """
+        return len(self._tasks) > 0
+
+    def start(self):
+        """
+        Starts consuming, must be called from a running event loop
+        """
+        if self.running:
+            return
+
+        self._tasks = [
+            asyncio.create_task(self._consume(partition))
+            for partition in self._partitions
+        ]
+
+    async def stop(self):
+        """
+        Stops consuming
+        """
+        for task in self._tasks:
+            task.cancel()
+
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self._broker.stop_consuming()
+
+    async def _consume(self, partition: int):
+        while True:
+            data = await self._broker.consume(partition)
+
+            try:
+                await self._handler(decode_message(data))
+            except Exception:    # pylint: disable=broad-except
+                logger.exception("Failed to handle brokered whatsapp message")
@@ -0,0 +1,137 @@
+from typing import Any, Iterable, List, Mapping, Tuple
+
+import asyncio
+
+from rasa_whatsapp_connector.retry import raise_for_graph_error
+from rasa_whatsapp_connector.sender import SendResult
+from rasa_whatsapp_connector.templates import DEFAULT_TEMPLATE_LANGUAGE
+
+DEFAULT_TEMPLATE_CONCURRENCY = 16
+
+
+class TemplateSenderMixin:
+    """
+    Sends registered template messages, alone or as a campaign to many
+    recipients. Mixed into RasaToWhatsappConverter, whose send paths it
+    goes through.
+    """
+    def send_template(
+        self,
+        to: str,
+        name: str,
+        parameters: Mapping[str, Any] | None = None,
+        language: str = DEFAULT_TEMPLATE_LANGUAGE,
+    ):
+        """
+        Sends a registered template message to Whatsapp Cloud Api, for
+        instance to reach a user outside of the 24 hours session window
+        Args:
+            to (str): Message recipient.
+            name (str): Name of a registered template.
+            parameters (mapping or none): Value of each template parameter.
+            language (str): Language code of the template.
+        Raises:
+            ValueError if the template isn't registered or a parameter is
+            missing. GraphApiError, CircuitOpenError or the requests error if
+            the message can't be sent and a retry policy is set
+        """
+        message = self.prepare_template_message(to, name, parameters, language)
+
+        return self._post_message(message, 'template')
+
+    async def send_template_async(
+        self,
+        to: str,
+        name: str,
+        parameters: Mapping[str, Any] | None = None,
+        language: str = DEFAULT_TEMPLATE_LANGUAGE,
+        idempotency_key: str | None = None,
+    ):
+        """
+        Sends a registered template message to Whatsapp Cloud Api without
+        blocking the event loop
+        Args:
+            to (str): Message recipient.
+            name (str): Name of a registered template.
+            parameters (mapping or none): Value of each template parameter.
+            language (str): Language code of the template.
+            idempotency_key (str or none): Key of the message in the
+                outbox, a message is only sent once per key.
+        Returns:
+            dict[str] or None: The api response, or None if a message with
+                the same idempotency key was already sent.
+        Raises:
+            ValueError if the template isn't registered or a parameter is
+            missing. GraphApiError, CircuitOpenError or the aiohttp error if
+            the message can't be sent and a retry policy is set
+        """
+        body = self.prepare_template_message_body(
+            to,
+            name,
+            parameters,
+            language,
+        )
+
+        return await self._send_body_async(
+            to,
+            body,
+            'template',
+            idempotency_key,
+        )
+
+    async def send_templates_async(
+        self,
+        name: str,
+        recipients: Iterable[Tuple[str, Mapping[str, Any] | None]],
+        language: str = DEFAULT_TEMPLATE_LANGUAGE,
+        concurrency: int = DEFAULT_TEMPLATE_CONCURRENCY,
+        idempotency_key: str | None = None,
+    ) -> List[SendResult]:
+        """
+        Sends a registered template message to many recipients, like a
+        notification campaign. Each message only binds its parameters into
+        the compiled template, and up to concurrency messages are in flight
+        at once, paced by the converter's scheduler if any.
+        Args:
+            name (str): Name of a registered template.
+            recipients (iterable): Recipient and parameters of each message.
+            language (str): Language code of the template.
+            concurrency (int): Maximum number of messages sent at once.
+            idempotency_key (str or none): Key of the campaign in the
+                outbox, each message is keyed by it and its position, so
+                a recipient listed twice gets both messages and a campaign
+                resent with the same recipients, in the same order, is
+                only sent once.
+        Returns:
+            list: A SendResult for each recipient, in order.
+        Raises:
+            ValueError if the template isn't registered
+        """
+        template = self.get_message_template(name, language)
+        recipients = list(recipients)
+        results: List[SendResult | None] = [None] * len(recipients)
+        indexes = iter(range(len(recipients)))
+
+        # Workers share the iterator, so no more than concurrency tasks
+        # exist however many recipients there are
+        async def send():
+            for index in indexes:
+                to, parameters = recipients[index]
+
+                try:
+                    response = await self._send_body_async(
+                        to,
+                        template.encode(to, parameters),
+                        'template',
+                        idempotency_key and f"{idempotency_key}:{index}",
+                    )
+                    raise_for_graph_error(200, response)
+                    results[index] = SendResult(response)
+                except Exception as exc:    # pylint: disable=broad-except
+                    results[index] = SendResult(error=exc)
+
+        await asyncio.gather(
+            *(send() for _ in range(min(concurrency, len(recipients))))
+        )
+
+        return results
@@ -0,0 +1,567 @@
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Tuple
+
+import asyncio
+import logging
+
+from sanic import Blueprint, response
+from sanic.request import Request
+from sanic.response import HTTPResponse
+
+from rasa.core.channels.channel import InputChannel, OutputChannel, UserMessage
+
+from rasa_whatsapp_connector.broker import BrokerConsumer, MessageBroker
+from rasa_whatsapp_connector.coalesce import (
+    MessageCoalescer,
+    DEFAULT_COALESCE_MAX_WAIT,
+)
+from rasa_whatsapp_connector.dedup import (
+    DeduplicationBackend,
+    MessageDeduplicator,
+    DEFAULT_DEDUPLICATION_TTL,
+    DEFAULT_DEDUPLICATION_MAX_SIZE,
+)
+from rasa_whatsapp_connector.inbound import (
+    InboundMessageQueue,
+    DEFAULT_QUEUE_SIZE,
+)
+from rasa_whatsapp_connector.lanes import (
+    KeyedExecutor,
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_MAX_PENDING,
+    DEFAULT_IDLE_TIMEOUT,
+)
+from rasa_whatsapp_connector.metrics import get_metrics
+from rasa_whatsapp_connector.models import InboundMessage
+from rasa_whatsapp_connector.outbox import SqliteOutbox
+from rasa_whatsapp_connector.rate_limit import (
+    SendScheduler,
+    DEFAULT_PHONE_RATE,
+    DEFAULT_RECIPIENT_RATE,
+    DEFAULT_RECIPIENT_BURST,
+)
+from rasa_whatsapp_connector.registry import (
+    ConverterRegistry,
+    DEFAULT_WATCH_INTERVAL,
+)
+from rasa_whatsapp_connector.retry import (
+    CircuitBreaker,
+    RetryPolicy,
+    DEFAULT_MAX_ATTEMPTS,
+)
+from rasa_whatsapp_connector.signature import SIGNATURE_HEADER
+from rasa_whatsapp_connector.statuses import BatchingStatusSink, StatusSink
+from rasa_whatsapp_connector.webhook import WebhookHandler
+from rasa_whatsapp_connector.whatsapp import (
+    RasaToWhatsappConverter,
+    DEFAULT_GRAPH_API_URL,
+    DEFAULT_WHATSAPP_API_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class WhatsappCloudOutput(OutputChannel):
+    """
+    Output channel that sends rasa responses to the Whatsapp Cloud Api
+    """
+    @classmethod
+    def name(cls) -> str:
+        """
+        Name of the channel in rasa's credentials
+        Returns:
+            str: The channel name.
+        """
+        return "whatsapp_cloud"
+
+    def __init__(self, converter: RasaToWhatsappConverter):
+        self._converter = converter
+
+    async def send_text_message(
+        self,
+        recipient_id: str,
+        text: str,
+        **_: Any,
+    ):
+        """
+        Sends a text message
+        Args:
+            recipient_id (str): Message recipient.
+            text (str): Message text.
+        """
+        await self._converter.send_message_async(recipient_id, text)
+
+    async def send_text_with_buttons(
+        self,
+        recipient_id: str,
+        text: str,
+        buttons: List[Dict[str, Any]],
+        **_: Any,
+    ):
+        """
+        Sends a text message with reply buttons, or a list for more than
+        three buttons
+        Args:
+            recipient_id (str): Message recipient.
+            text (str): Message text.
+            buttons (list): Rasa buttons.
+        """
+        await self._converter.send_message_async(recipient_id, text, buttons)
+
+    async def send_image_url(
+        self,
+        recipient_id: str,
+        image: str,
+        **_: Any,
+    ):
+        """
+        Sends an image
+        Args:
+            recipient_id (str): Message recipient.
+            image (str): Url or path of the image.
+        """
+        await self._converter.send_media_async(recipient_id, 'image', image)
+
+    async def send_attachment(
+        self,
+        recipient_id: str,
+        attachment: str,
+        **_: Any,
+    ):
+        """
+        Sends a document
+        Args:
+            recipient_id (str): Message recipient.
+            attachment (str): Url or path of the document.
+        """
+        await self._converter.send_media_async(
+            recipient_id,
+            'document',
+            attachment,
+        )
+
+
+class WhatsappCloudInput(InputChannel):
+    """
+    Input channel for the Whatsapp Cloud Api.
+    Hook calls are acknowledged as soon as their messages are queued and
+    the messages are handed to rasa by background worker tasks, so Meta's
+    webhook timeout doesn't depend on how long the bot takes to answer.
+    """
+    # Optional credentials passed to __init__ as keyword arguments
+    _CREDENTIAL_OPTIONS = (
+        "graphql_api_version",
+        "api_timeout",
+        "queue_size",
+        "workers",
+        "max_pending",
+        "lane_idle_timeout",
+        "dedup_ttl",
+        "dedup_max_size",
+        "phone_rate",
+        "recipient_rate",
+        "recipient_burst",
+        "retry_attempts",
+        "tenants_file",
+        "tenants_watch_interval",
+        "graph_api_url",
+        "outbox_path",
+        "app_secret",
+        "coalesce_window",
+        "coalesce_max_wait",
+    )
+
+    @classmethod
+    def name(cls) -> str:
+        """
+        Name of the channel in rasa's credentials
+        Returns:
+            str: The channel name.
+        """
+        return "whatsapp_cloud"
+
+    @classmethod
+    def from_credentials(cls, credentials: Dict[str, Any] | None):
+        """
+        Creates the channel from the whatsapp_cloud credentials
+        Args:
+            credentials (dict[str] or none): Credentials with
+                phone_identifier, token and verify_token, and optionally any
+                of the keyword arguments of __init__ taking a plain value.
+        Returns:
+            WhatsappCloudInput: The channel.
+        Raises:
+            RasaException if there are no credentials
+        """
+        if not credentials:
+            cls.raise_missing_credentials_exception()
+
+        options = {
+            key: credentials[key]
+            for key in cls._CREDENTIAL_OPTIONS if key in credentials
+        }
+
+        if credentials.get("verify_token") is None:
+            logger.warning(
+                "No verify_token in the whatsapp_cloud credentials, webhook "
+                "subscriptions will be refused"
+            )
+
+        if credentials.get("app_secret") is None:
+            logger.warning(
+                "No app_secret in the whatsapp_cloud credentials, the "
+                "signature of hook calls won't be verified"
+            )
+
+        return cls(
+            credentials.get("phone_identifier"),
+            credentials.get("token"),
+            credentials.get("verify_token"),
+            **options,
+        )
+
+    def __init__(
+        self,
+        phone_identifier: str,
+        token: str,
+        verify_token: str | None,
+        graphql_api_version: str = 'v18.0',
+        api_timeout: int = DEFAULT_WHATSAPP_API_TIMEOUT,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        workers: int = DEFAULT_MAX_CONCURRENCY,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        lane_idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+        dedup_ttl: float = DEFAULT_DEDUPLICATION_TTL,
+        dedup_max_size: int = DEFAULT_DEDUPLICATION_MAX_SIZE,
+        phone_rate: float = DEFAULT_PHONE_RATE,
+        recipient_rate: float = DEFAULT_RECIPIENT_RATE,
+        recipient_burst: float = DEFAULT_RECIPIENT_BURST,
+        retry_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        tenants_file: str | None = None,
+        tenants_watch_interval: float = DEFAULT_WATCH_INTERVAL,
+        graph_api_url: str = DEFAULT_GRAPH_API_URL,
+        outbox_path: str | None = None,
+        app_secret: str | None = None,
+        coalesce_window: float = 0,
+        coalesce_max_wait: float = DEFAULT_COALESCE_MAX_WAIT,
+        deduplication_backend: DeduplicationBackend | None = None,
+        status_sink: StatusSink | None = None,
+        broker: MessageBroker | None = None,
+        broker_partitions: List[int] | None = None,
+    ):
+        self._verify_token = verify_token
+        self._app_secret = app_secret
+        self._queue_size = queue_size
+        self._workers = workers
+        self._max_pending = max_pending
+        self._lane_idle_timeout = lane_idle_timeout
+        self._coalesce_window = coalesce_window
+        self._coalesce_max_wait = coalesce_max_wait
+        # In split deployments messages come from a broker, published by
+        # a WebhookIngress, rather than from this channel's webhook
+        self._broker = broker
+        self._broker_partitions = broker_partitions
+        self._consumer: BrokerConsumer | None = None
+        self._dispatch_message = None
+        self._deduplicator = MessageDeduplicator(
+            dedup_ttl,
+            dedup_max_size,
+            deduplication_backend,
+        )
+        # Registry keys are strings, while yaml credentials may hold a number
+        self._default_phone_identifier = None
+
+        if phone_identifier is not None:
+            self._default_phone_identifier = str(phone_identifier)
+        self._status_sink = None
+
+        if status_sink is not None:
+            self._status_sink = BatchingStatusSink(status_sink)
+
+        self._tenants_file = tenants_file
+        self._tenants_watch_interval = tenants_watch_interval
+        self._scheduler = SendScheduler(
+            phone_rate,
+            phone_rate,
+            recipient_rate,
+            recipient_burst,
+        )
+        self._executor: KeyedExecutor | None = None
+        self._coalescer: MessageCoalescer | None = None
+        # Tenants watcher and outbox replay, cancelled on shutdown
+        self._background_tasks: List[asyncio.Task] = []
+        self._outbox = None
+
+        if outbox_path is not None:
+            self._outbox = SqliteOutbox(outbox_path)
+
+        self._registry = ConverterRegistry(
+            graphql_api_version,
+            api_timeout,
+            scheduler=self._scheduler,
+            retry_policy=RetryPolicy(retry_attempts),
+            circuit_breaker_factory=CircuitBreaker,
+            graph_api_url=graph_api_url,
+            outbox=self._outbox,
+        )
+
+        # Tenants are either the single number of the credentials or the
+        # numbers listed in the tenants file.
+        if tenants_file is not None:
+            self._registry.load_file(tenants_file)
+        else:
+            self._registry.load(
+                [{
+                    'phone_identifier': phone_identifier,
+                    'token': token
+                }]
+            )
+
+    def get_output_channel(self) -> OutputChannel | None:
+        """
+        Gets the output channel of the credentials' phone number
+        Returns:
+            OutputChannel or None: The output channel, or None if the phone
+                number isn't registered.
+        """
+        converter = self._registry.get(self._default_phone_identifier)
+
+        if converter is None:
+            return None
+
+        return WhatsappCloudOutput(converter)
+
+    def _create_queue(
+        self,
+        on_new_message: Callable[[UserMessage], Awaitable[Any]],
+    ) -> InboundMessageQueue:
+        async def handle_message(
+            item: Tuple[RasaToWhatsappConverter, InboundMessage],
+        ):
+            converter, message = item
+            # Replies are sent within this span, which links them to the
+            # message they answer
+            span = get_metrics().start_span(
+                'whatsapp.receive',
+                {
+                    'whatsapp.message_id': message.message_id or '',
+                    'whatsapp.phone_number_id': message.phone_number_id or '',
+                },
+            )
+
+            with span:
+                # Paging through a long list is answered without rasa
+                if converter.is_continuation(message):
+                    await converter.send_continuation_async(message)
+                    return
+
+                await on_new_message(
+                    UserMessage(
+                        message.text,
+                        WhatsappCloudOutput(converter),
+                        message.sender_id,
+                        input_channel=self.name(),
+                        metadata=message.metadata,
+                    )
+                )
+
+        # Messages of the same sender are handled in order so the tracker
+        # doesn't interleave turns, different senders run in parallel.
+        executor = KeyedExecutor(
+            handle_message,
+            self._workers,
+            self._max_pending,
+            self._lane_idle_timeout,
+        )
+        self._executor = executor
+        submit = executor.submit
+
+        # Quick bursts of text of the same sender can be merged into a
+        # single rasa turn
+        if self._coalesce_window > 0:
+            self._coalescer = MessageCoalescer(
+                executor.submit,
+                self._coalesce_window,
+                self._coalesce_max_wait,
+            )
+            submit = self._coalescer.add
+
+        async def dispatch_message(
+            item: Tuple[RasaToWhatsappConverter, InboundMessage],
+        ):
+            _, message = item
+            key = (message.phone_number_id, message.sender_id)
+
+            await submit(key, item)
+
+        self._dispatch_message = dispatch_message
+
+        return InboundMessageQueue(
+            dispatch_message,
+            self._queue_size,
+            workers=1,
+        )
+
+    async def _handle_brokered_message(self, message: InboundMessage):
+        converter = self._registry.get(message.phone_number_id)
+
+        if converter is None:
+            get_metrics().count_inbound('dropped', 'unknown_phone')
+            logger.warning(
+                "Dropped brokered message sent to unknown phone number %s",
+                message.phone_number_id,
+            )
+            return
+
+        # Waits while the lanes are full, which holds back the broker
+        await self._dispatch_message((converter, message))
+
+    def _iter_messages(self, data: Dict[str, Any]) -> Iterator[InboundMessage]:
+        registry = self._registry
+
+        for _, message in registry.iter_inbound_messages_from_whatsapp_hook(
+            data
+        ):
+            yield message
+
+    def _create_handler(self, queue: InboundMessageQueue) -> WebhookHandler:
+        async def dispatch(message: InboundMessage) -> bool:
+            converter = self._registry.get(message.phone_number_id)
+
+            # The tenants file was reloaded while the call was handled
+            if converter is None:
+                get_metrics().count_inbound('dropped', 'unknown_phone')
+                return True
+
+            return queue.put((converter, message))
+
+        return WebhookHandler(
+            self._iter_messages,
+            dispatch,
+            self._deduplicator,
+            self._verify_token,
+            self._app_secret,
+            self._status_sink,
+        )
+
+    def _start_background_task(self, coroutine: Awaitable[Any]):
+        self._background_tasks.append(asyncio.create_task(coroutine))
+
+    async def _shutdown(self, queue: InboundMessageQueue):
+        # Ordered so that nothing still writes to the outbox or the status
+        # sink once they are closed
+        tasks, self._background_tasks = self._background_tasks, []
+
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        if self._consumer is not None:
+            await self._consumer.stop()
+
+        # Messages already acknowledged to Meta are handed to rasa first
+        await queue.stop()
+
+        if self._coalescer is not None:
+            await self._coalescer.flush()
+
+        if self._executor is not None:
+            await self._executor.join()
+            await self._executor.stop()
+
+        if self._outbox is not None:
+            await self._outbox.close()
+
+        # Statuses still collected would be lost otherwise
+        if self._status_sink is not None:
+            await self._status_sink.close()
+
+    def blueprint(
+        self,
+        on_new_message: Callable[[UserMessage], Awaitable[Any]],
+    ) -> Blueprint:
+        """
+        Creates the blueprint serving the webhook, along with the listeners
+        starting and stopping the channel's background work
+        Args:
+            on_new_message (callable): Awaited with each message for rasa.
+        Returns:
+            Blueprint: The blueprint.
+        """
+        whatsapp_webhook = Blueprint("whatsapp_cloud_webhook", __name__)
+        queue = self._create_queue(on_new_message)
+        handler = self._create_handler(queue)
+
+        if self._tenants_file is not None:
+
+            @whatsapp_webhook.listener("after_server_start")
+            async def watch_tenants(*_):
+                self._start_background_task(
+                    self._registry.watch_file(
+                        self._tenants_file,
+                        self._tenants_watch_interval,
+                    )
+                )
+
+        if self._broker is not None:
+            self._consumer = BrokerConsumer(
+                self._broker,
+                self._handle_brokered_message,
+                self._broker_partitions,
+            )
+
+            @whatsapp_webhook.listener("after_server_start")
+            async def consume_broker(*_):
+                self._consumer.start()
+
+        if self._outbox is not None:
+
+            @whatsapp_webhook.listener("after_server_start")
+            async def replay_outbox(*_):
+                # Replies a crash left unsent, once the tenants are loaded
+                if self._outbox.recovered:
+                    logger.info(
+                        "Replaying %d whatsapp messages",
+                        self._outbox.recovered,
+                    )
+
+                self._start_background_task(
+                    self._outbox.replay(self._registry.send_outbox_entry)
+                )
+
+        @whatsapp_webhook.listener("before_server_stop")
+        async def shutdown(*_):
+            await self._shutdown(queue)
+
+        @whatsapp_webhook.route("/", methods=["GET"])
+        async def health(_: Request) -> HTTPResponse:
+            # Queue depths, sampled by the load test harness
+            return response.json(
+                {
+                    "status": "ok",
+                    "queue_size": queue.size,
+                    "pending": self._executor.pending,
+                    "lanes": self._executor.lanes,
+                    "send_queue_depth": self._scheduler.queue_depth,
+                }
+            )
+
+        @whatsapp_webhook.route("/webhook", methods=["GET"])
+        async def verify(request: Request) -> HTTPResponse:
+            challenge = handler.verify(request.args)
+
+            if challenge is None:
+                return response.text("", status=403)
+
+            return response.text(challenge)
+
+        @whatsapp_webhook.route("/webhook", methods=["POST"])
+        async def webhook(request: Request) -> HTTPResponse:
+            status = await handler.handle_hook(
+                request.body,
+                request.headers.get(SIGNATURE_HEADER),
+            )
+
+            return response.text("", status=status)
+
+        return whatsapp_webhook
@@ -0,0 +1,168 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Tuple
+
+import asyncio
+import logging
+import time
+
+from rasa_whatsapp_connector.metrics import get_metrics
+from rasa_whatsapp_connector.models import InboundMessage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COALESCE_WINDOW = 0.8
+DEFAULT_COALESCE_MAX_WAIT = 3
+
+
+def can_coalesce(message: InboundMessage) -> bool:
+    """
+    Checks whether a message can be merged with the ones around it. Only
+    plain text is, button and list replies carry a payload of their own.
+    Args:
+        message (InboundMessage): Received message.
+    Returns:
+        bool: Whether the message is plain text.
+    """
+    return message.type == 'text' and message.payload is None
+
+
+def merge_messages(messages: List[InboundMessage]) -> InboundMessage:
+    """
+    Merges the text messages of a burst into a single one
+    Args:
+        messages (list): Text messages of the same sender, in order.
+    Returns:
+        InboundMessage: A message with the texts on separate lines, the id
+            of the last message, and the ids of every message under the
+            message_ids metadata key.
+    """
+    first = messages[0]
+    last = messages[-1]
+    metadata = dict(first.metadata or {})
+    metadata['message_ids'] = [message.message_id for message in messages]
+
+    return InboundMessage(
+        first.sender_id,
+        '\n'.join(message.text for message in messages),
+        first.type,
+        message_id=last.message_id,
+        timestamp=last.timestamp,
+        phone_number_id=first.phone_number_id,
+        metadata=metadata,
+    )
+
+
+class _Burst:
+    __slots__ = ('context', 'messages', 'started_at', 'timer')
+
+    def __init__(self, context: Any, started_at: float):
+        self.context = context
+        self.messages: List[InboundMessage] = []
+        self.started_at = started_at
+        self.timer: asyncio.TimerHandle | None = None
+
+
+class MessageCoalescer:
+    """
+    Debounces the text messages of each sender, so a thought typed as
+    several quick messages reaches rasa as a single turn. A burst is handed
+    over once its sender has been quiet for the window, or once its first
+    message has waited max_wait seconds. Other messages, like button
+    replies, hand over the pending burst and then go on their own.
+    """
+    def __init__(
+        self,
+        submit: Callable[[Hashable, Tuple[Any, InboundMessage]], Awaitable],
+        window: float = DEFAULT_COALESCE_WINDOW,
+        max_wait: float = DEFAULT_COALESCE_MAX_WAIT,
+    ):
+        """
+        Args:
+            submit (callable): Awaited with the key and the (context,
+                message) item of every merged or passed through message.
+            window (float): Seconds of quiet that end a burst.
+            max_wait (float): Maximum seconds a message is held back.
+        """
+        self._submit = submit
+        self._window = window
+        self._max_wait = max_wait
+        self._bursts: Dict[Hashable, _Burst] = {}
+        self._tasks = set()
+
+    def __len__(self):
+        return len(self._bursts)
+
+    async def add(self, key: Hashable, item: Tuple[Any, InboundMessage]):
+        """
+        Adds a received message to the burst of its key
+        Args:
+            key (hashable): Sender key.
+            item (tuple): Context, for instance the converter, and message.
+                The context of the first message of a burst is kept.
+        """
+        context, message = item
+
+        if not can_coalesce(message):
+            await self._flush(key)
+            await self._submit(key, item)
+            return
+
+        now = time.monotonic()
+        burst = self._bursts.get(key)
+
+        if burst is None:
+            burst = _Burst(context, now)
+            self._bursts[key] = burst
+
+        burst.messages.append(message)
+
+        if burst.timer is not None:
+            burst.timer.cancel()
+
+        delay = min(self._window, burst.started_at + self._max_wait - now)
+
+        if delay <= 0:
+            await self._flush(key)
+            return
+
+        burst.timer = asyncio.get_running_loop().call_later(
+            delay,
+            self._schedule_flush,
+            key,
+        )
+
+    def _schedule_flush(self, key: Hashable):
+        task = asyncio.create_task(self._flush(key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush(self, key: Hashable):
+        # The burst is taken out before awaiting, so messages received
+        # meanwhile start a new one
+        burst = self._bursts.pop(key, None)
+
+        if burst is None:
+            return
+
+        if burst.timer is not None:
+            burst.timer.cancel()
+
+        if len(burst.messages) > 1:
+            get_metrics().count_inbound(
+                'coalesced',
+                count=len(burst.messages) - 1,
+            )
+
+        try:
+            await self._submit(
+                key,
+                (burst.context, merge_messages(burst.messages)),
+            )
+        except Exception:    # pylint: disable=broad-except
+            logger.exception("Failed to hand over whatsapp messages")
+
+    async def flush(self):
+        """
+        Hands over every pending burst right away
+        """
+        for key in list(self._bursts):
+            await self._flush(key)
@@ -0,0 +1,509 @@
+from typing import Any, Dict, Iterator, List, Mapping, Tuple
+
+from rasa_whatsapp_connector.interactive import (
+    InteractiveMenuBuilder,
+    build_sections,
+    is_continuation,
+    MAX_LIST_ROWS,
+)
+from rasa_whatsapp_connector.media import MEDIA_TYPES
+from rasa_whatsapp_connector.metrics import get_metrics
+from rasa_whatsapp_connector.models import InboundMessage, OutboundMessage
+from rasa_whatsapp_connector.payload_cache import (
+    InteractiveTemplate,
+    PayloadTemplateCache,
+    ResponseCache,
+    build_interactive_message,
+    encode_text_message,
+    DEFAULT_RESPONSE_CACHE_SIZE,
+    DEFAULT_TEMPLATE_CACHE_SIZE,
+)
+from rasa_whatsapp_connector.templates import (
+    MessageTemplate,
+    DEFAULT_TEMPLATE_LANGUAGE,
+)
+
+
+def _iter_dicts(items: Any) -> Iterator[Dict[str, Any]]:
+    # Hook data comes from the network, elements of the wrong type are
+    # skipped rather than failing the whole call
+    if not isinstance(items, list):
+        return
+
+    for item in items:
+        if isinstance(item, dict):
+            yield item
+
+
+def iter_whatsapp_hook_values(data: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Iterates over the value of every change of every entry in a whatsapp
+    hook call, in place. Malformed entries, changes and values are skipped.
+    Args:
+        data(dict[str]): Whatsapp hook data.
+    Yields:
+        dict[str]: Each change value.
+    """
+    if not isinstance(data, dict):
+        return
+
+    for entry in _iter_dicts(data.get("entry")):
+        for change in _iter_dicts(entry.get("changes")):
+            value = change.get("value")
+
+            if value and isinstance(value, dict):
+                yield value
+
+
+class WhatsappMessageConverter:
+    """
+    Dependency free core of the converter: prepares Whatsapp Cloud Api
+    payloads and parses hook calls, without any http client. It can be
+    imported on its own by processes that never send a message, like
+    webhook ingress pods, so they start without loading requests, aiohttp
+    or rasa.
+    """
+    def __init__(
+        self,
+        phone_identifier: str,
+        template_cache_size: int = DEFAULT_TEMPLATE_CACHE_SIZE,
+        response_cache_size: int = DEFAULT_RESPONSE_CACHE_SIZE,
+    ):
+        """
+        Args:
+            phone_identifier (str): Phone number id of the business number.
+            template_cache_size (int): Maximum number of cached templates.
+            response_cache_size (int): Maximum number of cached responses,
+                0 disables the response cache.
+        """
+        self._phone_identifier = phone_identifier
+        self._templates = PayloadTemplateCache(template_cache_size)
+        self._menus = InteractiveMenuBuilder(template_cache_size)
+        self._responses = None
+        self._message_templates: Dict[Tuple[str, str], MessageTemplate] = {}
+
+        if response_cache_size > 0:
+            self._responses = ResponseCache(response_cache_size)
+
+    def _build_button_action(self, buttons: List[Dict[str, Any]]):
+        whatsapp_buttons = []
+
+        # WhatsApp only allows up to three buttons per call
+        for button in buttons[:3]:
+            # Title can only have up to 20 characters.
+            title = button['title'][0:20]
+            whatsapp_id = button['payload']
+
+            whatsapp_buttons.append(
+                {
+                    'type': 'reply',
+                    'reply': {
+                        'id': whatsapp_id,
+                        'title': title
+                    }
+                }
+            )
+
+        return {'buttons': whatsapp_buttons}
+
+    def _get_template(
+        self,
+        buttons: List[Dict[str, Any]],
+        list_name: str = "Select",
+    ) -> InteractiveTemplate:
+        if len(buttons) <= 3:
+            return self._templates.get(
+                'button',
+                buttons,
+                lambda: self._build_button_action(buttons),
+            )
+
+        return self._menus.get_menu(buttons, list_name).pages[0]
+
+    def _prepare_button_message(
+        self,
+        to: str,
+        text: str,
+        buttons: List[Dict[str, Any]],
+    ):
+        # Building the few buttons is cheaper than looking their template
+        # up, which only pays off when encoding
+        return build_interactive_message(
+            to,
+            'button',
+            text,
+            self._build_button_action(buttons),
+        )
+
+    def _prepare_list_message(
+        self,
+        to: str,
+        text: str,
+        buttons: List[Dict[str, Any]],
+        list_name: str = "Select"
+    ):
+        # Only lists of several pages need their menu, to chain the pages
+        if len(buttons) <= MAX_LIST_ROWS:
+            return build_interactive_message(
+                to,
+                'list',
+                text,
+                {
+                    'button': list_name,
+                    'sections': build_sections(buttons, list_name),
+                },
+            )
+
+        return self._get_template(buttons, list_name).build(to, text)
+
+    def _prepare_text_message(self, to: str, text: str):
+        message = {
+            'messaging_product': 'whatsapp',
+            'to': to,
+            'text': {
+                'body': text
+            }
+        }
+
+        return message
+
+    @property
+    def phone_identifier(self) -> str:
+        """
+        Business phone number id of the converter
+        """
+        return self._phone_identifier
+
+    @property
+    def response_cache(self) -> ResponseCache | None:
+        """
+        Cache of encoded responses, or None if it is disabled
+        """
+        return self._responses
+
+    def prepare_message(
+        self,
+        to: str,
+        text: str,
+        buttons: List[Dict[str, Any]] | None = None,
+    ):
+        """
+        Prepares a message compatible with Whatsapp Cloud Api
+        Args:
+            to (str): Message recipient.
+            text (str): Message text.
+            buttons (list or none): Optional list of buttons
+        Returns:
+            dict[str]: The message.
+        """
+        if buttons is not None:
+            if len(buttons) <= 3:
+                message = self._prepare_button_message(to, text, buttons)
+            else:
+                message = self._prepare_list_message(to, text, buttons)
+        else:
+            message = self._prepare_text_message(to, text)
+
+        return message
+
+    def prepare_message_body(
+        self,
+        to: str,
+        text: str,
+        buttons: List[Dict[str, Any]] | None = None,
+    ) -> bytes:
+        """
+        Prepares the json encoded body of a message compatible with
+        Whatsapp Cloud Api. The recipient and text are spliced into a cached,
+        already encoded template, so nothing else is encoded again. Repeated
+        responses are cached whole, with only the recipient spliced in.
+        Args:
+            to (str): Message recipient.
+            text (str): Message text.
+            buttons (list or none): Optional list of buttons
+        Returns:
+            bytes: The json encoded message.
+        """
+        if self._responses is not None:
+
+            def encode(recipient: str) -> bytes:
+                return self._encode_message(recipient, text, buttons)
+
+            return self._responses.encode(
+                self._responses.get_key(text, buttons),
+                to,
+                encode,
+            )
+
+        return self._encode_message(to, text, buttons)
+
+    def _encode_message(
+        self,
+        to: str,
+        text: str,
+        buttons: List[Dict[str, Any]] | None = None,
+    ) -> bytes:
+        if buttons is None:
+            return encode_text_message(to, text)
+
+        return self._get_template(buttons).encode(to, text)
+
+    def register_template(
+        self,
+        name: str,
+        components: List[Dict[str, Any]] | None = None,
+        language: str = DEFAULT_TEMPLATE_LANGUAGE,
+    ) -> MessageTemplate:
+        """
+        Registers an approved message template, compiling it once for every
+        later send
+        Args:
+            name (str): Name of the approved template.
+            components (list or none): Header, body and button components,
+                with a {{name}} placeholder as the value of every parameter.
+            language (str): Language code of the template.
+        Returns:
+            MessageTemplate: The compiled template.
+        """
+        template = MessageTemplate(name, components, language)
+        self._message_templates[(name, language)] = template
+
+        return template
+
+    def get_message_template(
+        self,
+        name: str,
+        language: str = DEFAULT_TEMPLATE_LANGUAGE,
+    ) -> MessageTemplate:
+        """
+        Gets a registered message template
+        Args:
+            name (str): Name of the template.
+            language (str): Language code of the template.
+        Returns:
+            MessageTemplate: The compiled template.
+        Raises:
+            ValueError if the template isn't registered
+        """
+        template = self._message_templates.get((name, language))
+
+        if template is None:
+            raise ValueError(f"Template {name} ({language}) isn't registered!")
+
+        return template
+
+    def prepare_template_message(
+        self,
+        to: str,
+        name: str,
+        parameters: Mapping[str, Any] | None = None,
+        language: str = DEFAULT_TEMPLATE_LANGUAGE,
+    ) -> Dict[str, Any]:
+        """
+        Prepares a template message compatible with Whatsapp Cloud Api
+        Args:
+            to (str): Message recipient.
+            name (str): Name of a registered template.
+            parameters (mapping or none): Value of each template parameter.
+            language (str): Language code of the template.
+        Returns:
+            dict[str]: The message.
+        Raises:
+            ValueError if the template isn't registered or a parameter is
+            missing
+        """
+        return self.get_message_template(name, language).build(to, parameters)
+
+    def prepare_template_message_body(
+        self,
+        to: str,
+        name: str,
+        parameters: Mapping[str, Any] | None = None,
+        language: str = DEFAULT_TEMPLATE_LANGUAGE,
+    ) -> bytes:
+        """
+        Prepares the json encoded body of a template message compatible with
+        Whatsapp Cloud Api, splicing the parameters into the compiled template
+        Args:
+            to (str): Message recipient.
+            name (str): Name of a registered template.
+            parameters (mapping or none): Value of each template parameter.
+            language (str): Language code of the template.
+        Returns:
+            bytes: The json encoded message.
+        Raises:
+            ValueError if the template isn't registered or a parameter is
+            missing
+        """
+        return self.get_message_template(name, language).encode(to, parameters)
+
+    def _get_message_type(self, buttons: List[Dict[str, Any]] | None):
+        if not buttons:
+            return 'text'
+
+        return 'button' if len(buttons) <= 3 else 'list'
+
+    def _get_outbound_messages(
+        self,
+        to: str,
+        responses: List[Dict[str, Any]],
+    ) -> List[OutboundMessage]:
+        return [
+            OutboundMessage.from_rasa_response(to, response)
+            for response in responses
+        ]
+
+    def _get_outbound_media(self, message: OutboundMessage):
+        if message.image is not None:
+            return 'image', message.image
+
+        if message.attachment is not None:
+            return 'document', message.attachment
+
+        return None
+
+    def _get_outbound_type(self, message: OutboundMessage) -> str:
+        outbound_media = self._get_outbound_media(message)
+
+        if outbound_media is not None:
+            return outbound_media[0]
+
+        return self._get_message_type(message.buttons)
+
+    def is_continuation(self, message: InboundMessage) -> bool:
+        """
+        Checks whether a received message asks for the next page of a list
+        rather than being meant for rasa
+        Args:
+            message (InboundMessage): Received message.
+        Returns:
+            bool: Whether the message replied a "More…" row.
+        """
+        return is_continuation(message.payload)
+
+    def _get_value(self, data):
+        if (
+            not isinstance(data, dict)
+            or not isinstance(data.get("entry"), list)
+            or len(data["entry"]) == 0
+        ):
+            raise ValueError("Provided data is invalid!")
+
+        entry = data["entry"][0]
+
+        if (
+            not isinstance(entry, dict)
+            or not isinstance(entry.get("changes"), list)
+            or len(entry["changes"]) == 0
+        ):
+            raise ValueError("Provided data is invalid!")
+
+        change = entry["changes"][0]
+
+        if not isinstance(change, dict) or not isinstance(
+            change.get("value"),
+            dict,
+        ):
+            raise ValueError("Provided data is invalid!")
+
+        return change["value"]
+
+    def _convert_message(
+        self,
+        message: Dict[str, Any],
+        phone_number_id: str | None = None,
+    ) -> InboundMessage:
+        if not isinstance(message, dict):
+            raise ValueError("Provided data is invalid!")
+
+        try:
+            sender_id = message["from"]
+            message_type = message["type"]
+            text = None
+            payload = None
+            metadata = None
+
+            if message_type == "text":
+                text = message["text"]["body"]
+            elif message_type == "interactive":
+                interactive = message['interactive']
+                reply_type = interactive['type']
+
+                if reply_type in ('button_reply', 'list_reply'):
+                    payload = interactive[reply_type]['id']
+                    text = payload
+            elif message_type in MEDIA_TYPES:
+                # The media is downloaded on demand by its id, the caption,
+                # if any, is the message text.
+                media = message[message_type]
+                text = media.get("caption") or ""
+                metadata = {"media": {"type": message_type, **media}}
+        except (KeyError, AttributeError, TypeError) as exc:
+            raise ValueError("Provided data is invalid!") from exc
+
+        if text is None:
+            raise ValueError("Provided data is invalid!")
+
+        return InboundMessage(
+            sender_id,
+            text,
+            message_type,
+            message_id=message.get("id"),
+            timestamp=message.get("timestamp"),
+            payload=payload,
+            phone_number_id=phone_number_id,
+            metadata=metadata,
+            raw=message,
+        )
+
+    def iter_inbound_messages_from_value(
+        self,
+        value: Dict[str, Any],
+    ) -> Iterator[InboundMessage]:
+        """
+        Iterates over the messages of a single change of a whatsapp hook call
+        Args:
+            value(dict[str]): Value of the change.
+        Yields:
+            InboundMessage: Each message of the change.
+        """
+        messages = value.get("messages")
+
+        if not messages or not isinstance(messages, list):
+            return
+
+        metadata = value.get("metadata")
+        phone_number_id = None
+
+        if isinstance(metadata, dict):
+            phone_number_id = metadata.get("phone_number_id")
+
+        metrics = get_metrics()
+
+        for message in messages:
+            try:
+                inbound = self._convert_message(message, phone_number_id)
+            except ValueError:
+                metrics.count_inbound('dropped', 'invalid')
+                continue
+
+            metrics.count_inbound('parsed')
+            yield inbound
+
+    def iter_inbound_messages_from_whatsapp_hook(
+        self,
+        data: Dict[str, Any],
+    ) -> Iterator[InboundMessage]:
+        """
+        Iterates over every message in a whatsapp hook call.
+        Meta batches several messages, and even several phone numbers,
+        in a single call, so every message of every change of every entry
+        is yielded. The hook data is walked in place, without copying it.
+        Messages that can't be converted are skipped.
+        Args:
+            data(dict[str]): Whatsapp hook data.
+        Yields:
+            InboundMessage: Each message in the hook data.
+        """
+        for value in iter_whatsapp_hook_values(data):
+            yield from self.iter_inbound_messages_from_value(value)
@@ -0,0 +1,179 @@
+from typing import Any
+
+import collections
+import hashlib
+import time
+
+DEFAULT_DEDUPLICATION_TTL = 24 * 60 * 60
+DEFAULT_DEDUPLICATION_MAX_SIZE = 100000
+
+
+def _compact_key(message_id: str) -> int:
+    # A 64 bit digest takes a fraction of the memory of a full wamid and
+    # collisions are negligible at the cache sizes used here.
+    digest = hashlib.blake2b(message_id.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+class DeduplicationCache:
+    """
+    In-memory cache of seen message ids, bounded both in time and size.
+    Entries expire after the ttl and the least recently seen entries are
+    evicted when the cache is full.
+    """
+    def __init__(
+        self,
+        ttl: float = DEFAULT_DEDUPLICATION_TTL,
+        max_size: int = DEFAULT_DEDUPLICATION_MAX_SIZE,
+    ):
+        """
+        Args:
+            ttl (float): Seconds a message id is remembered.
+            max_size (int): Maximum number of remembered message ids.
+        """
+        self._ttl = ttl
+        self._max_size = max_size
+        self._entries = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _evict(self, now: float):
+        # Entries are kept ordered by the time they were last seen, so the
+        # expired ones are always at the front.
+        while self._entries:
+            key, seen_at = next(iter(self._entries.items()))
+            full = len(self._entries) >= self._max_size
+
+            if not full and now - seen_at < self._ttl:
+                break
+
+            del self._entries[key]
+
+    def add(self, message_id: str) -> bool:
+        """
+        Remembers a message id
+        Args:
+            message_id (str): Whatsapp message id.
+        Returns:
+            bool: False if the message id had already been seen.
+        """
+        now = time.monotonic()
+        key = _compact_key(message_id)
+        seen_at = self._entries.pop(key, None)
+        self._evict(now)
+        self._entries[key] = now
+
+        return seen_at is None or now - seen_at >= self._ttl
+
+    def discard(self, message_id: str):
+        """
+        Forgets a message id
+        Args:
+            message_id (str): Whatsapp message id.
+        """
+        self._entries.pop(_compact_key(message_id), None)
+
+
+class DeduplicationBackend:
+    """
+    Shared store of seen message ids, so every node of a deployment drops
+    the messages already received by any other node
+    """
+    async def add(self, message_id: str, ttl: float) -> bool:
+        """
+        Remembers a message id
+        Args:
+            message_id (str): Whatsapp message id.
+            ttl (float): Seconds the message id is remembered.
+        Returns:
+            bool: False if the message id had already been seen.
+        """
+        raise NotImplementedError()
+
+    async def discard(self, message_id: str):
+        """
+        Forgets a message id
+        Args:
+            message_id (str): Whatsapp message id.
+        """
+        raise NotImplementedError()
+
+
+class RedisDeduplicationBackend(DeduplicationBackend):
+    """
+    Deduplication backend stored in redis
+    """
+    def __init__(self, client: Any, prefix: str = 'whatsapp:wamid:'):
+        """
+        Args:
+            client (redis.asyncio.Redis): Redis client.
+            prefix (str): Prefix of the stored keys.
+        """
+        self._client = client
+        self._prefix = prefix
+
+    async def add(self, message_id: str, ttl: float) -> bool:
+        return bool(
+            await self._client.set(
+                self._prefix + message_id,
+                b'1',
+                nx=True,
+                px=int(ttl * 1000),
+            )
+        )
+
+    async def discard(self, message_id: str):
+        await self._client.delete(self._prefix + message_id)
+
+
+class MessageDeduplicator:
+    """
+    Drops whatsapp messages that were already received, as Meta redelivers
+    hook calls that aren't acknowledged fast enough. Message ids are checked
+    against a local cache first and then against the optional shared
+    backend.
+    """
+    def __init__(
+        self,
+        ttl: float = DEFAULT_DEDUPLICATION_TTL,
+        max_size: int = DEFAULT_DEDUPLICATION_MAX_SIZE,
+        backend: DeduplicationBackend | None = None,
+    ):
+        """
+        Args:
+            ttl (float): Seconds a message id is remembered.
+            max_size (int): Maximum number of message ids remembered locally.
+            backend (DeduplicationBackend or none): Optional shared backend.
+        """
+        self._ttl = ttl
+        self._cache = DeduplicationCache(ttl, max_size)
+        self._backend = backend
+
+    async def is_duplicate(self, message_id: str) -> bool:
+        """
+        Checks whether a message id was already seen and remembers it
+        Args:
+            message_id (str): Whatsapp message id.
+        Returns:
+            bool: True if the message id was already seen.
+        """
+        if not self._cache.add(message_id):
+            return True
+
+        if self._backend is not None:
+            return not await self._backend.add(message_id, self._ttl)
+
+        return False
+
+    async def forget(self, message_id: str):
+        """
+        Forgets a message id, for instance when its message couldn't be
+        processed and has to be accepted again when it is redelivered
+        Args:
+            message_id (str): Whatsapp message id.
+        """
+        self._cache.discard(message_id)
+
+        if self._backend is not None:
+            await self._backend.discard(message_id)
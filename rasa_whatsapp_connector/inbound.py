@@ -0,0 +1,108 @@
+from typing import Any, Awaitable, Callable, List
+
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_SIZE = 1000
+DEFAULT_WORKERS = 4
+
+
+class InboundMessageQueue:
+    """
+    Bounded in-process queue that decouples receiving whatsapp hook calls
+    from processing them. Messages are put on the queue without waiting
+    and a pool of worker tasks drains it into the message handler.
+    """
+    def __init__(
+        self,
+        handler: Callable[[Any], Awaitable[Any]],
+        max_size: int = DEFAULT_QUEUE_SIZE,
+        workers: int = DEFAULT_WORKERS,
+    ):
+        """
+        Args:
+            handler (callable): Coroutine function called with each message.
+            max_size (int): Maximum number of queued messages.
+            workers (int): Number of worker tasks draining the queue.
+        """
+        self._handler = handler
+        self._max_size = max_size
+        self._workers = workers
+        self._queue: asyncio.Queue | None = None
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def size(self) -> int:
+        """
+        Number of queued messages
+        """
+        return 0 if self._queue is None else self._queue.qsize()
+
+    @property
+    def running(self) -> bool:
+        """
+        Whether the worker tasks are running
+        """
+        return len(self._tasks) > 0
+
+    def start(self):
+        """
+        Starts the worker tasks, must be called from a running event loop.
+        Calling it again while running does nothing.
+        """
+        if self.running:
+            return
+
+        self._queue = asyncio.Queue(maxsize=self._max_size)
+        self._tasks = [
+            asyncio.create_task(self._work()) for _ in range(self._workers)
+        ]
+
+    def put(self, message: Any) -> bool:
+        """
+        Puts a message on the queue without waiting
+        Args:
+            message (any): Message passed to the handler.
+        Returns:
+            bool: False if the queue is full and the message was not queued.
+        """
+        self.start()
+
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            return False
+
+        return True
+
+    async def join(self):
+        """
+        Waits until every queued message has been handled
+        """
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def stop(self):
+        """
+        Waits for the queued messages to be handled and stops the workers
+        """
+        await self.join()
+
+        for task in self._tasks:
+            task.cancel()
+
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _work(self):
+        while True:
+            message = await self._queue.get()
+
+            try:
+                await self._handler(message)
+            except Exception:    # pylint: disable=broad-except
+                logger.exception("Failed to handle whatsapp message")
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,155 @@
+from typing import Any, Collection, Dict, Iterator, Mapping
+
+import logging
+
+from rasa_whatsapp_connector.broker import BrokerPublisher, MessageBroker
+from rasa_whatsapp_connector.core import WhatsappMessageConverter
+from rasa_whatsapp_connector.dedup import (
+    DeduplicationBackend,
+    MessageDeduplicator,
+    DEFAULT_DEDUPLICATION_TTL,
+    DEFAULT_DEDUPLICATION_MAX_SIZE,
+)
+from rasa_whatsapp_connector.metrics import get_metrics
+from rasa_whatsapp_connector.models import InboundMessage
+from rasa_whatsapp_connector.sender import import_aiohttp
+from rasa_whatsapp_connector.signature import SIGNATURE_HEADER
+from rasa_whatsapp_connector.statuses import BatchingStatusSink, StatusSink
+from rasa_whatsapp_connector.webhook import WebhookHandler
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookIngress:
+    """
+    Thin webhook receiver for split deployments. Hook calls are verified
+    and parsed with the dependency free converter core, and their messages
+    published to a broker, partitioned by sender, for rasa workers to
+    consume. Ingress and rasa workers can then be scaled independently.
+    """
+    def __init__(
+        self,
+        broker: MessageBroker,
+        verify_token: str | None,
+        app_secret: str | None = None,
+        phone_identifiers: Collection[str] | None = None,
+        dedup_ttl: float = DEFAULT_DEDUPLICATION_TTL,
+        dedup_max_size: int = DEFAULT_DEDUPLICATION_MAX_SIZE,
+        deduplication_backend: DeduplicationBackend | None = None,
+        status_sink: StatusSink | None = None,
+    ):
+        """
+        Args:
+            broker (MessageBroker): Broker the messages are published to.
+            verify_token (str or none): Token of the subscription handshake,
+                every handshake is refused if none.
+            app_secret (str or none): Secret of the Meta app, to verify the
+                signature of hook calls.
+            phone_identifiers (collection or none): Business phone number
+                ids accepted, every one if none.
+            dedup_ttl (float): Seconds a message id is remembered.
+            dedup_max_size (int): Maximum number of message ids remembered
+                locally.
+            deduplication_backend (DeduplicationBackend or none): Shared
+                store of seen message ids, across ingress nodes.
+            status_sink (StatusSink or none): Sink of the statuses of sent
+                messages, handed over in batches.
+        """
+        self._publisher = BrokerPublisher(broker)
+        self._phone_identifiers = phone_identifiers
+        self._converter = WhatsappMessageConverter('')
+        self._status_sink = None
+
+        if status_sink is not None:
+            self._status_sink = BatchingStatusSink(status_sink)
+
+        self._handler = WebhookHandler(
+            self._iter_messages,
+            self._publisher.publish,
+            MessageDeduplicator(
+                dedup_ttl,
+                dedup_max_size,
+                deduplication_backend,
+            ),
+            verify_token,
+            app_secret,
+            self._status_sink,
+        )
+
+    def _iter_messages(self, data: Dict[str, Any]) -> Iterator[InboundMessage]:
+        for message in self._converter.iter_inbound_messages_from_whatsapp_hook(
+            data
+        ):
+            if (
+                self._phone_identifiers is not None
+                and message.phone_number_id not in self._phone_identifiers
+            ):
+                get_metrics().count_inbound('dropped', 'unknown_phone')
+                continue
+
+            yield message
+
+    def verify(self, args: Mapping[str, str]) -> str | None:
+        """
+        Answers the subscription handshake, see verify_subscription
+        Args:
+            args (mapping): Query arguments of the request.
+        Returns:
+            str or None: The challenge, or None to refuse the subscription.
+        """
+        return self._handler.verify(args)
+
+    async def handle_hook(self, body: bytes, signature: str | None) -> int:
+        """
+        Publishes the messages of a hook call, see WebhookHandler
+        Args:
+            body (bytes): Raw request body.
+            signature (str or none): Value of the signature header.
+        Returns:
+            int: Status code to answer the call with, 503 if the broker is
+                full so Meta delivers the call again later.
+        """
+        return await self._handler.handle_hook(body, signature)
+
+    async def close(self):
+        """
+        Hands the collected statuses to the status sink
+        """
+        if self._status_sink is not None:
+            await self._status_sink.close()
+
+    def create_app(self) -> Any:
+        """
+        Creates an aiohttp application serving the webhook at /webhook
+        Returns:
+            aiohttp.web.Application: The application.
+        """
+        # Fails with the extra to install when aiohttp is missing
+        import_aiohttp()
+        from aiohttp import web    # pylint: disable=import-outside-toplevel
+
+        async def verify(request: web.Request) -> web.Response:
+            challenge = self.verify(request.query)
+
+            if challenge is None:
+                return web.Response(status=403)
+
+            return web.Response(text=challenge)
+
+        async def webhook(request: web.Request) -> web.Response:
+            status = await self.handle_hook(
+                await request.read(),
+                request.headers.get(SIGNATURE_HEADER),
+            )
+
+            return web.Response(status=status)
+
+        async def close(_: web.Application):
+            await self.close()
+
+        app = web.Application()
+        app.router.add_get('/webhook', verify)
+        app.router.add_post('/webhook', webhook)
+        app.on_cleanup.append(close)
+
+        return app
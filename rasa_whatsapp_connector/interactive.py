@@ -0,0 +1,276 @@
+from typing import Any, Dict, List, Tuple
+
+import collections
+import hashlib
+
+from rasa_whatsapp_connector.payload_cache import (
+    InteractiveTemplate,
+    DEFAULT_TEMPLATE_CACHE_SIZE,
+)
+
+# Whatsapp limits of list messages
+MAX_LIST_ROWS = 10
+MAX_ROW_TITLE_LENGTH = 24
+MAX_SECTION_TITLE_LENGTH = 24
+
+DEFAULT_LIST_NAME = "Select"
+DEFAULT_MORE_TITLE = "More…"
+DEFAULT_MORE_TEXT = "More options"
+# Prefix of the row ids that ask for the next page of a menu
+CONTINUATION_PREFIX = "__more__:"
+
+
+class InteractiveMenu:
+    """
+    Pages of a list message. Every page but the last ends with a row whose
+    id is the continuation payload of the next page.
+    """
+    __slots__ = ('menu_id', 'pages')
+
+    def __init__(self, menu_id: str, pages: List[InteractiveTemplate]):
+        """
+        Args:
+            menu_id (str): Id of the menu in continuation payloads.
+            pages (list): Template of each page.
+        """
+        self.menu_id = menu_id
+        self.pages = pages
+
+
+def is_continuation(payload: str | None) -> bool:
+    """
+    Checks whether a reply id asks for the next page of a menu
+    Args:
+        payload (str or none): Id of the replied list row.
+    Returns:
+        bool: Whether the id is a continuation payload.
+    """
+    return payload is not None and payload.startswith(CONTINUATION_PREFIX)
+
+
+def get_continuation_payload(menu_id: str, page: int) -> str:
+    """
+    Gets the id of the "More…" row leading to a page of a menu
+    Args:
+        menu_id (str): Id of the menu.
+        page (int): Index of the page.
+    Returns:
+        str: The continuation payload.
+    """
+    return f"{CONTINUATION_PREFIX}{menu_id}:{page}"
+
+
+def build_rows(
+    buttons: List[Dict[str, Any]],
+    list_name: str = DEFAULT_LIST_NAME,
+) -> List[Tuple[str, Dict[str, str]]]:
+    """
+    Builds the list rows of a set of rasa buttons
+    Args:
+        buttons (list): Rasa buttons, optionally with the section they
+            belong to under a section key.
+        list_name (str): Section of the buttons without one.
+    Returns:
+        list: The section title and row of each button.
+    """
+    rows = []
+
+    for button in buttons:
+        section = button.get('section') or list_name
+        # Title can only have up to 24 characters.
+        row = {
+            'id': button['payload'],
+            'title': button['title'][0:MAX_ROW_TITLE_LENGTH],
+        }
+        rows.append((section[0:MAX_SECTION_TITLE_LENGTH], row))
+
+    return rows
+
+
+def build_list_action(
+    rows: List[Tuple[str, Dict[str, str]]],
+    list_name: str = DEFAULT_LIST_NAME,
+) -> Dict[str, Any]:
+    """
+    Builds the action of a list message, grouping consecutive rows of the
+    same section
+    Args:
+        rows (list): Section title and row of each option.
+        list_name (str): Label of the button opening the list.
+    Returns:
+        dict[str]: The list action.
+    """
+    sections = []
+
+    for title, row in rows:
+        if not sections or sections[-1]['title'] != title:
+            sections.append({'title': title, 'rows': []})
+
+        sections[-1]['rows'].append(row)
+
+    return {
+        'button': list_name,
+        'sections': sections,
+    }
+
+
+def build_sections(
+    buttons: List[Dict[str, Any]],
+    list_name: str = DEFAULT_LIST_NAME,
+) -> List[Dict[str, Any]]:
+    """
+    Builds the sections of a list message fitting a single page, in a
+    single pass over the buttons, see build_rows and build_list_action
+    Args:
+        buttons (list): Rasa buttons, optionally with the section they
+            belong to under a section key.
+        list_name (str): Section of the buttons without one.
+    Returns:
+        list: The sections.
+    """
+    sections = []
+    title = None
+    rows = None
+
+    for button in buttons:
+        section = button.get('section') or list_name
+        section = section[0:MAX_SECTION_TITLE_LENGTH]
+
+        if section != title:
+            title = section
+            rows = []
+            sections.append({'title': title, 'rows': rows})
+
+        rows.append(
+            {
+                'id': button['payload'],
+                'title': button['title'][0:MAX_ROW_TITLE_LENGTH],
+            }
+        )
+
+    return sections
+
+
+class InteractiveMenuBuilder:
+    """
+    Builds list messages with several sections and splits the ones with
+    more options than Whatsapp allows into pages, chained through a
+    "More…" row. Menus are built once per set of buttons and kept in a
+    least recently used cache, so large menus are cheap to render and
+    continuation replies can be resolved to their page.
+    """
+    def __init__(
+        self,
+        max_size: int = DEFAULT_TEMPLATE_CACHE_SIZE,
+        more_title: str = DEFAULT_MORE_TITLE,
+        more_text: str = DEFAULT_MORE_TEXT,
+    ):
+        """
+        Args:
+            max_size (int): Maximum number of cached menus.
+            more_title (str): Title of the row leading to the next page.
+            more_text (str): Body text of the pages after the first one.
+        """
+        self._max_size = max_size
+        self._more_title = more_title[0:MAX_ROW_TITLE_LENGTH]
+        self._more_text = more_text
+        self._menus = collections.OrderedDict()
+        self._menus_by_id: Dict[str, InteractiveMenu] = {}
+
+    def __len__(self):
+        return len(self._menus)
+
+    @property
+    def more_text(self) -> str:
+        """
+        Body text of the pages after the first one
+        """
+        return self._more_text
+
+    def _build_menu(
+        self,
+        key: Tuple,
+        buttons: List[Dict[str, Any]],
+        list_name: str,
+    ) -> InteractiveMenu:
+        menu_id = hashlib.blake2b(
+            repr(key).encode(),
+            digest_size=8,
+        ).hexdigest()
+        rows = build_rows(buttons, list_name)
+        pages = []
+
+        # Every full page but the last keeps a row for the "More…" option
+        while len(rows) > MAX_LIST_ROWS:
+            page = rows[:MAX_LIST_ROWS - 1]
+            rows = rows[MAX_LIST_ROWS - 1:]
+            payload = get_continuation_payload(menu_id, len(pages) + 1)
+            more = {'id': payload, 'title': self._more_title}
+            page.append((page[-1][0], more))
+            pages.append(page)
+
+        pages.append(rows)
+
+        return InteractiveMenu(
+            menu_id,
+            [
+                InteractiveTemplate('list', build_list_action(page, list_name))
+                for page in pages
+            ],
+        )
+
+    def get_menu(
+        self,
+        buttons: List[Dict[str, Any]],
+        list_name: str = DEFAULT_LIST_NAME,
+    ) -> InteractiveMenu:
+        """
+        Gets the menu of a set of buttons, building it if needed
+        Args:
+            buttons (list): Rasa buttons.
+            list_name (str): Label of the button opening the list.
+        Returns:
+            InteractiveMenu: The cached menu.
+        """
+        key = (
+            tuple(
+                (button['title'], button['payload'], button.get('section'))
+                for button in buttons
+            ),
+            list_name,
+        )
+        menu = self._menus.get(key)
+
+        if menu is not None:
+            self._menus.move_to_end(key)
+            return menu
+
+        menu = self._build_menu(key, buttons, list_name)
+        self._menus[key] = menu
+        self._menus_by_id[menu.menu_id] = menu
+
+        if len(self._menus) > self._max_size:
+            _, evicted = self._menus.popitem(last=False)
+            del self._menus_by_id[evicted.menu_id]
+
+        return menu
+
+    def get_continuation(self, payload: str) -> InteractiveTemplate | None:
+        """
+        Gets the page a continuation payload leads to
+        Args:
+            payload (str): Id of the replied "More…" row.
+        Returns:
+            InteractiveTemplate or None: The page, or None if the payload
+                is invalid or its menu is no longer cached.
+        """
+        if not is_continuation(payload):
+            return None
+
+        menu_id, _, page = payload[len(CONTINUATION_PREFIX):].partition(':')
+        menu = self._menus_by_id.get(menu_id)
+
+        if menu is None or not page.isdigit() or int(page) >= len(menu.pages):
+            return None
+
+        return menu.pages[int(page)]
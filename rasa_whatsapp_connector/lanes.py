@@ -0,0 +1,154 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+import asyncio
+import collections
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = 16
+DEFAULT_MAX_PENDING = 1000
+DEFAULT_IDLE_TIMEOUT = 60
+
+
+class _Lane:
+    __slots__ = ('items', 'wakeup', 'task')
+
+    def __init__(self):
+        self.items = collections.deque()
+        self.wakeup = asyncio.Event()
+        self.task: asyncio.Task | None = None
+
+
+class KeyedExecutor:
+    """
+    Executes items concurrently across keys while keeping the items of the
+    same key strictly in order. Each key gets its own serial lane, every
+    lane shares a global concurrency cap, and lanes that stay idle are
+    evicted so memory doesn't grow with the number of keys ever seen.
+    """
+    def __init__(
+        self,
+        handler: Callable[[Any], Awaitable[Any]],
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+    ):
+        """
+        Args:
+            handler (callable): Coroutine function called with each item.
+            max_concurrency (int): Maximum number of items handled at once.
+            max_pending (int): Maximum number of submitted items not handled
+                yet, submit waits while it is reached.
+            idle_timeout (float): Seconds a lane stays alive without items.
+        """
+        self._handler = handler
+        self._max_concurrency = max_concurrency
+        self._max_pending = max_pending
+        self._idle_timeout = idle_timeout
+        self._lanes: Dict[Hashable, _Lane] = {}
+        self._concurrency: asyncio.Semaphore | None = None
+        self._pending: asyncio.Semaphore | None = None
+        self._unfinished = 0
+        self._finished: asyncio.Event | None = None
+
+    @property
+    def lanes(self) -> int:
+        """
+        Number of lanes alive
+        """
+        return len(self._lanes)
+
+    @property
+    def pending(self) -> int:
+        """
+        Number of submitted items not handled yet
+        """
+        return self._unfinished
+
+    def _init_semaphores(self):
+        # Created lazily so they bind to the running event loop
+        if self._concurrency is None:
+            self._concurrency = asyncio.Semaphore(self._max_concurrency)
+            self._pending = asyncio.Semaphore(self._max_pending)
+            self._finished = asyncio.Event()
+            self._finished.set()
+
+    async def submit(self, key: Hashable, item: Any):
+        """
+        Submits an item to the lane of its key, waiting while too many
+        items are pending
+        Args:
+            key (hashable): Ordering key, for instance the sender id.
+            item (any): Item passed to the handler.
+        """
+        self._init_semaphores()
+        await self._pending.acquire()
+
+        self._unfinished += 1
+        self._finished.clear()
+
+        lane = self._lanes.get(key)
+
+        if lane is None:
+            lane = _Lane()
+            self._lanes[key] = lane
+            lane.task = asyncio.create_task(self._run_lane(key, lane))
+
+        lane.items.append(item)
+        lane.wakeup.set()
+
+    async def join(self):
+        """
+        Waits until every submitted item has been handled
+        """
+        if self._finished is not None:
+            await self._finished.wait()
+
+    async def stop(self):
+        """
+        Cancels every lane, dropping the items not handled yet
+        """
+        lanes = list(self._lanes.values())
+        self._lanes.clear()
+
+        for lane in lanes:
+            lane.task.cancel()
+
+        await asyncio.gather(
+            *(lane.task for lane in lanes),
+            return_exceptions=True,
+        )
+
+        self._concurrency = None
+        self._pending = None
+        self._unfinished = 0
+        self._finished = None
+
+    async def _run_lane(self, key: Hashable, lane: _Lane):
+        while True:
+            while lane.items:
+                item = lane.items.popleft()
+
+                try:
+                    async with self._concurrency:
+                        await self._handler(item)
+                except Exception:    # pylint: disable=broad-except
+                    logger.exception("Failed to handle item of lane %s", key)
+                finally:
+                    self._pending.release()
+                    self._unfinished -= 1
+
+                    if self._unfinished == 0:
+                        self._finished.set()
+
+            lane.wakeup.clear()
+
+            try:
+                await asyncio.wait_for(lane.wakeup.wait(), self._idle_timeout)
+            except asyncio.TimeoutError:
+                # No awaits between the check and the removal, so an item
+                # can't be submitted to the lane while it is being evicted.
+                if not lane.items:
+                    self._lanes.pop(key, None)
+                    return
@@ -0,0 +1,119 @@
+import argparse
+import asyncio
+
+from rasa_whatsapp_connector.loadtest.flood import (
+    WebhookFlooder,
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_CONCURRENCY,
+)
+from rasa_whatsapp_connector.loadtest.simulator import (
+    GraphApiSimulator,
+    DEFAULT_STATUS_DELAY,
+)
+
+
+def _get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='python -m rasa_whatsapp_connector.loadtest',
+        description=(
+            'Floods the webhook of a running connector while simulating the '
+            'Graph Api it replies to. Point the connector at the simulator '
+            'with the graph_api_url credential.'
+        ),
+    )
+    parser.add_argument(
+        '--connector-url',
+        default='http://127.0.0.1:5005/webhooks/whatsapp_cloud',
+        help='url of the whatsapp_cloud channel of the running connector',
+    )
+    parser.add_argument('--phone-number-id', required=True)
+    parser.add_argument('--rate', type=float, default=100)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--senders', type=int, default=0)
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+    )
+    parser.add_argument('--simulator-host', default='127.0.0.1')
+    parser.add_argument('--simulator-port', type=int, default=8081)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--latency-jitter', type=float, default=0.05)
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--throttle-rate', type=float, default=0)
+    parser.add_argument(
+        '--statuses',
+        action='store_true',
+        help='send status hook calls for every reply',
+    )
+    parser.add_argument(
+        '--status-delay',
+        type=float,
+        default=DEFAULT_STATUS_DELAY,
+    )
+    parser.add_argument(
+        '--app-secret',
+        help='secret of the Meta app, to sign hook calls like Meta does',
+    )
+    parser.add_argument(
+        '--drain',
+        type=float,
+        default=5,
+        help='maximum seconds to wait for replies after the flood',
+    )
+
+    return parser
+
+
+async def run(args: argparse.Namespace):
+    """
+    Runs the simulator and the flood, then prints the report
+    Args:
+        args (argparse.Namespace): Parsed command line arguments.
+    """
+    webhook_url = f"{args.connector_url}/webhook"
+    simulator = GraphApiSimulator(
+        args.simulator_host,
+        args.simulator_port,
+        args.latency,
+        args.latency_jitter,
+        args.error_rate,
+        args.throttle_rate,
+        webhook_url if args.statuses else None,
+        args.status_delay,
+        args.phone_number_id,
+        app_secret=args.app_secret,
+    )
+    flooder = WebhookFlooder(
+        webhook_url,
+        args.phone_number_id,
+        args.rate,
+        args.duration,
+        args.batch_size,
+        args.senders,
+        args.concurrency,
+        f"{args.connector_url}/",
+        app_secret=args.app_secret,
+    )
+    simulator.add_reply_handler(flooder.handle_reply)
+
+    async with simulator:
+        print(f"Graph Api simulator listening on {simulator.url}")
+
+        report = await flooder.run(args.drain)
+
+    print(report.format())
+    print(f"simulator          {simulator.counts}")
+    print(f"simulator in flight max {simulator.max_in_flight}")
+
+
+def main():
+    """
+    Entry point of python -m rasa_whatsapp_connector.loadtest
+    """
+    asyncio.run(run(_get_parser().parse_args()))
+
+
+if __name__ == '__main__':
+    main()
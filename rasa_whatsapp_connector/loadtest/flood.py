@@ -0,0 +1,315 @@
+from typing import Any, Dict, List
+from dataclasses import dataclass, field
+
+import asyncio
+import collections
+import itertools
+import time
+
+import aiohttp
+
+from rasa_whatsapp_connector.loadtest.payloads import (
+    build_messages_hook,
+    post_hook,
+)
+from rasa_whatsapp_connector.serialization import dumps
+from rasa_whatsapp_connector.signature import WebhookSignatureVerifier
+
+DEFAULT_BATCH_SIZE = 1
+DEFAULT_CONCURRENCY = 64
+DEFAULT_HEALTH_INTERVAL = 0.5
+DEFAULT_DRAIN_INTERVAL = 0.05
+# Health fields sampled as queue depths
+QUEUE_DEPTH_FIELDS = ('queue_size', 'pending', 'lanes', 'send_queue_depth')
+
+
+def get_percentile(values: List[float], percentile: float) -> float:
+    """
+    Gets a percentile by the nearest rank method
+    Args:
+        values (list): Measured values.
+        percentile (float): Percentile, from 0 to 100.
+    Returns:
+        float: The percentile, or 0 without values.
+    """
+    if not values:
+        return 0
+
+    ordered = sorted(values)
+    index = round(percentile / 100 * (len(ordered) - 1))
+
+    return ordered[index]
+
+
+@dataclass
+class LoadTestReport:
+    """
+    Results of a webhook flood
+    """
+    duration: float
+    # Seconds spent waiting for the last replies after the flood
+    drain: float
+    messages: int
+    # Webhook answers by status code, in messages
+    answers: Dict[int, int]
+    replies: int
+    webhook_latencies: List[float] = field(repr=False)
+    loop_latencies: List[float] = field(repr=False)
+    queue_depths: Dict[str, List[int]] = field(repr=False)
+
+    @property
+    def accepted_per_second(self) -> float:
+        """
+        Hook calls answered with 200 per second of flood
+        """
+        return self.answers.get(200, 0) / self.duration
+
+    @property
+    def replies_per_second(self) -> float:
+        """
+        Replies received per second, draining included
+        """
+        return self.replies / (self.duration + self.drain)
+
+    def format(self) -> str:
+        """
+        Formats the report as text
+        Returns:
+            str: The report.
+        """
+        lines = [
+            f"duration           {self.duration:.1f} s, "
+            f"drained in {self.drain:.1f} s",
+            f"messages           {self.messages}",
+            f"answers            {dict(sorted(self.answers.items()))}",
+            f"accepted           {self.accepted_per_second:.1f} msgs/s",
+            f"replies            {self.replies_per_second:.1f} msgs/s",
+        ]
+
+        for name, latencies in (
+            ('webhook latency', self.webhook_latencies),
+            ('loop latency', self.loop_latencies),
+        ):
+            lines.append(
+                f"{name:<19}"
+                f"p50 {get_percentile(latencies, 50) * 1000:.1f} ms, "
+                f"p99 {get_percentile(latencies, 99) * 1000:.1f} ms, "
+                f"max {max(latencies, default=0) * 1000:.1f} ms"
+            )
+
+        for name, depths in self.queue_depths.items():
+            if depths:
+                lines.append(
+                    f"{name:<19}avg {sum(depths) / len(depths):.1f}, "
+                    f"max {max(depths)}"
+                )
+
+        return '\n'.join(lines)
+
+
+class WebhookFlooder:
+    """
+    Floods the connector's webhook with batched hook calls at a target rate.
+    The time from posting a message to the first reply the simulator gets
+    for its sender measures the full receive, rasa and send loop.
+    """
+    def __init__(
+        self,
+        webhook_url: str,
+        phone_number_id: str,
+        rate: float,
+        duration: float,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        senders: int = 0,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        health_url: str | None = None,
+        text: str = 'hello',
+        app_secret: str | None = None,
+    ):
+        """
+        Args:
+            webhook_url (str): Url of the connector's webhook.
+            phone_number_id (str): Business phone number of the messages.
+            rate (float): Target messages per second.
+            duration (float): Seconds to flood for.
+            batch_size (int): Messages in each hook call.
+            senders (int): Number of distinct senders, 0 for a new sender
+                per message.
+            concurrency (int): Maximum hook calls awaiting an answer.
+            health_url (str or none): Url of the connector's health check,
+                sampled for its queue depths.
+            text (str): Text of every message.
+            app_secret (str or none): Secret of the Meta app, to sign the
+                hook calls as Meta does.
+        """
+        self._webhook_url = webhook_url
+        self._phone_number_id = phone_number_id
+        self._rate = rate
+        self._duration = duration
+        self._batch_size = batch_size
+        self._senders = senders
+        self._concurrency = concurrency
+        self._health_url = health_url
+        self._text = text
+        self._signature_verifier = None
+        self._ids = itertools.count()
+        self._run_id = int(time.time())
+        # Post time of the oldest unanswered message of each sender
+        self._waiting: Dict[str, float] = {}
+        self._answers = collections.Counter()
+        self._webhook_latencies = []
+        self._loop_latencies = []
+        self._queue_depths = {name: [] for name in QUEUE_DEPTH_FIELDS}
+        self._replies = 0
+        self._messages = 0
+
+        if app_secret is not None:
+            self._signature_verifier = WebhookSignatureVerifier(app_secret)
+
+    def handle_reply(self, recipient_id: str, replied_at: float):
+        """
+        Records a reply sent by the connector, meant to be added as reply
+        handler of the GraphApiSimulator
+        Args:
+            recipient_id (str): Recipient of the reply.
+            replied_at (float): Monotonic time of the reply.
+        """
+        self._replies += 1
+        posted_at = self._waiting.pop(recipient_id, None)
+
+        if posted_at is not None:
+            self._loop_latencies.append(replied_at - posted_at)
+
+    def _get_messages(self) -> List[Any]:
+        messages = []
+
+        for _ in range(self._batch_size):
+            index = next(self._ids)
+
+            if self._senders:
+                sender_id = f"load{index % self._senders}"
+            else:
+                sender_id = f"load{index}"
+
+            message_id = f"wamid.load.{self._run_id}.{index}"
+            messages.append((sender_id, message_id, self._text))
+
+        return messages
+
+    async def _post(
+        self,
+        session: aiohttp.ClientSession,
+        semaphore: asyncio.Semaphore,
+        messages: List[Any],
+    ):
+        body = dumps(
+            build_messages_hook(
+                self._phone_number_id,
+                messages,
+                int(time.time()),
+            )
+        )
+        posted_at = time.monotonic()
+
+        for sender_id, _, _ in messages:
+            self._waiting.setdefault(sender_id, posted_at)
+
+        try:
+            status = await post_hook(
+                session,
+                self._webhook_url,
+                body,
+                self._signature_verifier,
+            )
+        except aiohttp.ClientError:
+            status = 0
+        finally:
+            semaphore.release()
+
+        self._webhook_latencies.append(time.monotonic() - posted_at)
+        self._answers[status] += len(messages)
+
+        if status != 200:
+            for sender_id, _, _ in messages:
+                self._waiting.pop(sender_id, None)
+
+    async def _sample_health(self, session: aiohttp.ClientSession):
+        while True:
+            try:
+                async with session.get(self._health_url) as response:
+                    health = await response.json()
+            except (aiohttp.ClientError, ValueError):
+                health = {}
+
+            for name, depths in self._queue_depths.items():
+                if isinstance(health.get(name), int):
+                    depths.append(health[name])
+
+            await asyncio.sleep(DEFAULT_HEALTH_INTERVAL)
+
+    async def _drain(self, timeout: float) -> float:
+        started_at = time.monotonic()
+
+        while self._waiting and time.monotonic() - started_at < timeout:
+            await asyncio.sleep(DEFAULT_DRAIN_INTERVAL)
+
+        return time.monotonic() - started_at
+
+    async def run(self, drain: float = 0) -> LoadTestReport:
+        """
+        Floods the webhook for the configured duration
+        Args:
+            drain (float): Maximum seconds to wait for the replies of the
+                messages still unanswered once the flood ends.
+        Returns:
+            LoadTestReport: The results.
+        """
+        interval = self._batch_size / self._rate
+        semaphore = asyncio.Semaphore(self._concurrency)
+        tasks = []
+
+        async with aiohttp.ClientSession() as session:
+            sampler = None
+
+            if self._health_url is not None:
+                sampler = asyncio.create_task(self._sample_health(session))
+
+            started_at = time.monotonic()
+            batch = 0
+
+            while time.monotonic() - started_at < self._duration:
+                # Calls are paced by their schedule rather than by the
+                # previous one, so a slow answer doesn't lower the rate.
+                delay = started_at + batch * interval - time.monotonic()
+
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                await semaphore.acquire()
+                messages = self._get_messages()
+                self._messages += len(messages)
+                tasks.append(
+                    asyncio.create_task(
+                        self._post(session, semaphore, messages)
+                    )
+                )
+                batch += 1
+
+            await asyncio.gather(*tasks)
+            duration = time.monotonic() - started_at
+            drained = await self._drain(drain)
+
+            if sampler is not None:
+                sampler.cancel()
+                await asyncio.gather(sampler, return_exceptions=True)
+
+        return LoadTestReport(
+            duration,
+            drained,
+            self._messages,
+            dict(self._answers),
+            self._replies,
+            self._webhook_latencies,
+            self._loop_latencies,
+            self._queue_depths,
+        )
@@ -0,0 +1,141 @@
+from typing import Any, Dict, List, Tuple
+
+from rasa_whatsapp_connector.signature import (
+    SIGNATURE_HEADER,
+    WebhookSignatureVerifier,
+)
+
+
+def _build_hook(value: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "object":
+            "whatsapp_business_account",
+        "entry":
+            [{
+                "id": "0",
+                "changes": [{
+                    "field": "messages",
+                    "value": value
+                }],
+            }],
+    }
+
+
+def build_messages_hook(
+    phone_number_id: str,
+    messages: List[Tuple[str, str, str]],
+    timestamp: int = 0,
+) -> Dict[str, Any]:
+    """
+    Builds a hook call batching several text messages, as Meta sends them
+    Args:
+        phone_number_id (str): Business phone number receiving them.
+        messages (list): Sender id, message id and text of each message.
+        timestamp (int): Timestamp of the messages.
+    Returns:
+        dict[str]: The hook call.
+    """
+    return _build_hook(
+        {
+            "messaging_product":
+                "whatsapp",
+            "metadata": {
+                "phone_number_id": phone_number_id
+            },
+            "messages":
+                [
+                    {
+                        "from": sender_id,
+                        "id": message_id,
+                        "timestamp": str(timestamp),
+                        "type": "text",
+                        "text": {
+                            "body": text
+                        },
+                    } for sender_id, message_id, text in messages
+                ],
+        }
+    )
+
+
+def build_statuses_hook(
+    phone_number_id: str,
+    statuses: List[Tuple[str, str, str]],
+    timestamp: int = 0,
+) -> Dict[str, Any]:
+    """
+    Builds a hook call with the delivery statuses of sent messages
+    Args:
+        phone_number_id (str): Business phone number that sent them.
+        statuses (list): Message id, recipient id and status of each one.
+        timestamp (int): Timestamp of the statuses.
+    Returns:
+        dict[str]: The hook call.
+    """
+    return _build_hook(
+        {
+            "messaging_product":
+                "whatsapp",
+            "metadata": {
+                "phone_number_id": phone_number_id
+            },
+            "statuses":
+                [
+                    {
+                        "id": message_id,
+                        "recipient_id": recipient_id,
+                        "status": status,
+                        "timestamp": str(timestamp),
+                    } for message_id, recipient_id, status in statuses
+                ],
+        }
+    )
+
+
+def get_hook_headers(
+    body: bytes,
+    signature_verifier: WebhookSignatureVerifier | None = None,
+) -> Dict[str, str]:
+    """
+    Gets the headers of a hook call, signed as Meta signs them
+    Args:
+        body (bytes): Json encoded hook call.
+        signature_verifier (WebhookSignatureVerifier or none): Verifier of
+            the app secret, none to leave the call unsigned.
+    Returns:
+        dict[str]: The headers.
+    """
+    headers = {'Content-Type': 'application/json'}
+
+    if signature_verifier is not None:
+        headers[SIGNATURE_HEADER] = signature_verifier.get_signature(body)
+
+    return headers
+
+
+async def post_hook(
+    session: Any,
+    webhook_url: str,
+    body: bytes,
+    signature_verifier: WebhookSignatureVerifier | None = None,
+) -> int:
+    """
+    Posts a hook call to a webhook, signed as Meta signs them
+    Args:
+        session (aiohttp.ClientSession): Session to post with.
+        webhook_url (str): Url of the webhook.
+        body (bytes): Json encoded hook call.
+        signature_verifier (WebhookSignatureVerifier or none): Verifier of
+            the app secret, none to leave the call unsigned.
+    Returns:
+        int: The status of the answer.
+    Raises:
+        aiohttp.ClientError: If the webhook can't be reached.
+    """
+    async with session.post(
+        webhook_url,
+        data=body,
+        headers=get_hook_headers(body, signature_verifier),
+    ) as response:
+        await response.read()
+        return response.status
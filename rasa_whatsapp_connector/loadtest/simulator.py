@@ -0,0 +1,240 @@
+from typing import Any, Callable, Dict, List
+
+import asyncio
+import itertools
+import logging
+import random
+import time
+
+import aiohttp
+from aiohttp import web
+
+from rasa_whatsapp_connector.loadtest.payloads import (
+    build_statuses_hook,
+    post_hook,
+)
+from rasa_whatsapp_connector.serialization import dumps, loads
+from rasa_whatsapp_connector.signature import WebhookSignatureVerifier
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATUS_DELAY = 0.1
+# Route of the messages endpoint, matching a single version and phone number
+# id so malformed urls are refused like the Graph Api does
+MESSAGES_ROUTE = '/{version}/{phone_number_id}/messages'
+# Statuses Meta reports for a delivered and read message, in order
+STATUSES = ('sent', 'delivered', 'read')
+
+
+class GraphApiSimulator:
+    """
+    Local simulator of the Graph Api messages endpoint, to load test the
+    connector without sending anything to Meta. Answers take a configurable
+    latency, a share of them fail or are throttled, and every sent message
+    can be followed by status hook calls to the connector's webhook.
+    """
+    def __init__(
+        self,
+        host: str = '127.0.0.1',
+        port: int = 0,
+        latency: float = 0,
+        latency_jitter: float = 0,
+        error_rate: float = 0,
+        throttle_rate: float = 0,
+        webhook_url: str | None = None,
+        status_delay: float = DEFAULT_STATUS_DELAY,
+        phone_number_id: str = '0',
+        seed: int | None = None,
+        app_secret: str | None = None,
+    ):
+        """
+        Args:
+            host (str): Address to listen on.
+            port (int): Port to listen on, 0 picks a free one.
+            latency (float): Seconds every answer takes.
+            latency_jitter (float): Random seconds added to the latency.
+            error_rate (float): Share of messages answered with a 500.
+            throttle_rate (float): Share of messages answered with a 429.
+            webhook_url (str or none): Webhook receiving the statuses of
+                the sent messages, none to send no statuses.
+            status_delay (float): Seconds between consecutive statuses.
+            phone_number_id (str): Business phone number of the statuses.
+            seed (int or none): Seed of the random failures.
+            app_secret (str or none): Secret of the Meta app, to sign the
+                status hook calls as Meta does.
+        """
+        self._host = host
+        self._port = port
+        self._latency = latency
+        self._latency_jitter = latency_jitter
+        self._error_rate = error_rate
+        self._throttle_rate = throttle_rate
+        self._webhook_url = webhook_url
+        self._status_delay = status_delay
+        self._phone_number_id = phone_number_id
+        self._random = random.Random(seed)
+        self._signature_verifier = None
+        self._ids = itertools.count()
+        self._runner: web.AppRunner | None = None
+        self._session: aiohttp.ClientSession | None = None
+        self._tasks = set()
+        self._reply_handlers: List[Callable[[str, float], Any]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.counts: Dict[str, int] = {
+            'sent': 0,
+            'failed': 0,
+            'throttled': 0,
+            'statuses': 0,
+        }
+
+        if app_secret is not None:
+            self._signature_verifier = WebhookSignatureVerifier(app_secret)
+
+    @property
+    def url(self) -> str:
+        """
+        Base url of the simulator
+        """
+        return f"http://{self._host}:{self._port}"
+
+    def add_reply_handler(self, handler: Callable[[str, float], Any]):
+        """
+        Adds a callable called with the recipient and the time of every
+        successfully sent message
+        Args:
+            handler (callable): Reply handler.
+        """
+        self._reply_handlers.append(handler)
+
+    def _get_error(self) -> web.Response | None:
+        draw = self._random.random()
+
+        if draw < self._throttle_rate:
+            self.counts['throttled'] += 1
+            status, code = 429, 130429
+        elif draw < self._throttle_rate + self._error_rate:
+            self.counts['failed'] += 1
+            status, code = 500, 131000
+        else:
+            return None
+
+        body = {'error': {'code': code, 'message': 'Simulated error'}}
+
+        return web.Response(
+            status=status,
+            body=dumps(body),
+            content_type='application/json',
+        )
+
+    async def _handle_message(self, request: web.Request) -> web.Response:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        try:
+            message = loads(await request.read())
+            delay = self._latency + self._random.uniform(
+                0,
+                self._latency_jitter,
+            )
+
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            error = self._get_error()
+
+            if error is not None:
+                return error
+
+            message_id = f"wamid.simulated.{next(self._ids)}"
+            recipient_id = message.get('to')
+            self.counts['sent'] += 1
+
+            for handler in self._reply_handlers:
+                handler(recipient_id, time.monotonic())
+
+            if self._webhook_url is not None:
+                task = asyncio.create_task(
+                    self._send_statuses(message_id, recipient_id)
+                )
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+            body = {
+                'messaging_product': 'whatsapp',
+                'contacts': [{
+                    'input': recipient_id,
+                    'wa_id': recipient_id
+                }],
+                'messages': [{
+                    'id': message_id
+                }],
+            }
+
+            return web.Response(
+                body=dumps(body),
+                content_type='application/json',
+            )
+        finally:
+            self.in_flight -= 1
+
+    async def _send_statuses(self, message_id: str, recipient_id: str):
+        for status in STATUSES:
+            await asyncio.sleep(self._status_delay)
+
+            body = dumps(
+                build_statuses_hook(
+                    self._phone_number_id,
+                    [(message_id, recipient_id, status)],
+                    int(time.time()),
+                )
+            )
+
+            try:
+                await post_hook(
+                    self._session,
+                    self._webhook_url,
+                    body,
+                    self._signature_verifier,
+                )
+            except aiohttp.ClientError:
+                logger.warning("Failed to send simulated status")
+                return
+
+            self.counts['statuses'] += 1
+
+    async def start(self):
+        """
+        Starts listening, on a free port if the port is 0
+        """
+        app = web.Application()
+        app.router.add_post(MESSAGES_ROUTE, self._handle_message)
+
+        self._session = aiohttp.ClientSession()
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+
+        site = web.TCPSite(self._runner, self._host, self._port)
+        await site.start()
+
+        self._port = self._runner.addresses[0][1]
+
+    async def stop(self):
+        """
+        Stops listening, cancelling the pending replies and statuses
+        """
+        tasks = list(self._tasks)
+
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self._runner.cleanup()
+        await self._session.close()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
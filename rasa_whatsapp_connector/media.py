@@ -0,0 +1,181 @@
+from typing import Any, Dict
+
+import collections
+import hashlib
+import mimetypes
+import time
+
+# Message types carrying a media object
+MEDIA_TYPES = ('image', 'audio', 'document', 'video', 'sticker')
+# Media types that can have a caption
+CAPTIONED_MEDIA_TYPES = ('image', 'document', 'video')
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+DEFAULT_MEDIA_CACHE_SIZE = 1024
+# Uploaded media is kept by the api for 30 days
+DEFAULT_MEDIA_CACHE_TTL = 29 * 24 * 60 * 60
+DEFAULT_MIME_TYPE = 'application/octet-stream'
+
+
+def get_content_hash(data: bytes) -> str:
+    """
+    Gets the hash identifying a media content
+    Args:
+        data (bytes): Media content.
+    Returns:
+        str: The sha256 hex digest of the content.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+def get_file_hash(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> str:
+    """
+    Gets the hash identifying the content of a media file, reading it in
+    chunks
+    Args:
+        path (str): Path of the file.
+        chunk_size (int): Bytes read at once.
+    Returns:
+        str: The sha256 hex digest of the content.
+    """
+    content_hash = hashlib.sha256()
+
+    with open(path, 'rb') as media_file:
+        while chunk := media_file.read(chunk_size):
+            content_hash.update(chunk)
+
+    return content_hash.hexdigest()
+
+
+def get_mime_type(path: str) -> str:
+    """
+    Guesses the mime type of a media
+    Args:
+        path (str): Path, url or filename of the media.
+    Returns:
+        str: The mime type, or a generic binary type if unknown.
+    """
+    mime_type, _ = mimetypes.guess_type(path)
+
+    return mime_type or DEFAULT_MIME_TYPE
+
+
+def is_media_link(source: str) -> bool:
+    """
+    Checks whether a media source is a link the api fetches by itself,
+    rather than a local file to upload
+    Args:
+        source (str): Url or path of the media.
+    Returns:
+        bool: Whether the source is an http or https url.
+    """
+    return source.startswith(('https://', 'http://'))
+
+
+class MediaUploadCache:
+    """
+    Least recently used cache of uploaded media ids keyed by content hash,
+    so an asset is uploaded once and its id reused on every send. Ids are
+    forgotten before the api expires them.
+    """
+    def __init__(
+        self,
+        max_size: int = DEFAULT_MEDIA_CACHE_SIZE,
+        ttl: float = DEFAULT_MEDIA_CACHE_TTL,
+    ):
+        """
+        Args:
+            max_size (int): Maximum number of cached media ids.
+            ttl (float): Seconds a media id is reused.
+        """
+        self._max_size = max_size
+        self._ttl = ttl
+        self._media = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._media)
+
+    def get(self, content_hash: str) -> str | None:
+        """
+        Gets the media id of an uploaded content
+        Args:
+            content_hash (str): Hash of the content.
+        Returns:
+            str or None: The media id, if uploaded and not expired.
+        """
+        cached = self._media.get(content_hash)
+
+        if cached is None:
+            return None
+
+        media_id, expires_at = cached
+
+        if expires_at <= time.monotonic():
+            del self._media[content_hash]
+            return None
+
+        self._media.move_to_end(content_hash)
+
+        return media_id
+
+    def set(self, content_hash: str, media_id: str):
+        """
+        Remembers the media id of an uploaded content
+        Args:
+            content_hash (str): Hash of the content.
+            media_id (str): Id returned by the api.
+        """
+        self._media[content_hash] = (media_id, time.monotonic() + self._ttl)
+        self._media.move_to_end(content_hash)
+
+        if len(self._media) > self._max_size:
+            self._media.popitem(last=False)
+
+    def discard(self, content_hash: str):
+        """
+        Forgets the media id of a content, for instance once the api
+        rejected it as expired
+        Args:
+            content_hash (str): Hash of the content.
+        """
+        self._media.pop(content_hash, None)
+
+
+def prepare_media_message(
+    to: str,
+    media_type: str,
+    media: Dict[str, Any],
+    caption: str | None = None,
+    filename: str | None = None,
+) -> Dict[str, Any]:
+    """
+    Prepares a media message compatible with Whatsapp Cloud Api
+    Args:
+        to (str): Message recipient.
+        media_type (str): One of MEDIA_TYPES.
+        media (dict[str]): Media object with either an id or a link.
+        caption (str or none): Optional caption, dropped for media types
+            that can't have one.
+        filename (str or none): Optional filename of a document.
+    Returns:
+        dict[str]: The message.
+    Raises:
+        ValueError if the media type isn't supported
+    """
+    if media_type not in MEDIA_TYPES:
+        raise ValueError(f"Unsupported media type {media_type}")
+
+    media = dict(media)
+
+    if caption and media_type in CAPTIONED_MEDIA_TYPES:
+        media['caption'] = caption
+
+    if filename and media_type == 'document':
+        media['filename'] = filename
+
+    return {
+        'messaging_product': 'whatsapp',
+        'to': to,
+        'type': media_type,
+        media_type: media,
+    }
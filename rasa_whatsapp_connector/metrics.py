@@ -0,0 +1,243 @@
+from typing import Any, Dict, Iterator
+
+DEFAULT_NAMESPACE = 'whatsapp'
+# Graph Api latency buckets, in seconds
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any):
+        """
+        Ignores the attribute
+        Args:
+            key (str): Attribute name.
+            value (any): Attribute value.
+        """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Metrics:
+    """
+    Instrumentation of the send and receive paths. Every method is a no-op,
+    so the connector pays almost nothing unless a backend is set with
+    set_metrics.
+    """
+    enabled = False
+
+    def observe_send(self, message_type: str, status: str, duration: float):
+        """
+        Records a message sent to the Graph Api
+        Args:
+            message_type (str): Text, button, list or media type.
+            status (str): Response status code, or the kind of failure.
+            duration (float): Seconds the send took, retries included.
+        """
+
+    def count_inbound(self, outcome: str, reason: str = '', count: int = 1):
+        """
+        Counts messages received from hook calls
+        Args:
+            outcome (str): Parsed, dropped or duplicate.
+            reason (str): Why the messages were dropped.
+            count (int): Number of messages.
+        """
+
+    def add_sends_in_flight(self, delta: int):
+        """
+        Tracks the sends awaiting the Graph Api
+        Args:
+            delta (int): 1 when a send starts, -1 when it ends.
+        """
+
+    def set_pool_usage(self, in_use: int, limit: int):
+        """
+        Tracks the utilization of the connection pool
+        Args:
+            in_use (int): Requests holding a connection.
+            limit (int): Maximum number of connections, 0 for no limit.
+        """
+
+    def start_span(    # pylint: disable=unused-argument
+        self,
+        name: str,
+        attributes: Dict[str, Any] | None = None,
+    ):
+        """
+        Starts a tracing span, as the current span of the context
+        Args:
+            name (str): Span name.
+            attributes (dict[str] or none): Span attributes.
+        Returns:
+            context manager: Yields the span, with a set_attribute method.
+        """
+        return _NULL_SPAN
+
+
+class PrometheusMetrics(Metrics):
+    """
+    Metrics exported through prometheus_client, which is only imported
+    when the backend is created. Spans aren't recorded.
+    """
+    enabled = True
+
+    def __init__(self, registry=None, namespace: str = DEFAULT_NAMESPACE):
+        """
+        Args:
+            registry (CollectorRegistry or none): Registry of the metrics,
+                the default one if none.
+            namespace (str): Prefix of the metric names.
+        """
+        import prometheus_client    # pylint: disable=import-outside-toplevel
+
+        if registry is None:
+            registry = prometheus_client.REGISTRY
+
+        self._send_latency = prometheus_client.Histogram(
+            f'{namespace}_graph_api_request_seconds',
+            'Seconds taken to send a message to the Graph Api',
+            ('message_type', 'status'),
+            registry=registry,
+            buckets=LATENCY_BUCKETS,
+        )
+        self._inbound = prometheus_client.Counter(
+            f'{namespace}_inbound_messages',
+            'Messages received from hook calls',
+            ('outcome', 'reason'),
+            registry=registry,
+        )
+        self._in_flight = prometheus_client.Gauge(
+            f'{namespace}_sends_in_flight',
+            'Sends awaiting the Graph Api',
+            registry=registry,
+        )
+        self._pool_in_use = prometheus_client.Gauge(
+            f'{namespace}_pool_connections_in_use',
+            'Requests holding a pooled connection',
+            registry=registry,
+        )
+        self._pool_limit = prometheus_client.Gauge(
+            f'{namespace}_pool_connections_limit',
+            'Maximum number of pooled connections',
+            registry=registry,
+        )
+
+    def observe_send(self, message_type: str, status: str, duration: float):
+        self._send_latency.labels(message_type, status).observe(duration)
+
+    def count_inbound(self, outcome: str, reason: str = '', count: int = 1):
+        self._inbound.labels(outcome, reason).inc(count)
+
+    def add_sends_in_flight(self, delta: int):
+        self._in_flight.inc(delta)
+
+    def set_pool_usage(self, in_use: int, limit: int):
+        self._pool_in_use.set(in_use)
+        self._pool_limit.set(limit)
+
+
+class OpenTelemetryMetrics(Metrics):
+    """
+    Metrics and spans recorded through the OpenTelemetry api, exported by
+    whatever sdk the application configures. Send spans are started inside
+    the span of the received message, so a reply is traced back to the
+    message id it answers.
+    """
+    enabled = True
+
+    def __init__(self, meter_provider=None, tracer_provider=None):
+        """
+        Args:
+            meter_provider (MeterProvider or none): Provider of the meter,
+                the global one if none.
+            tracer_provider (TracerProvider or none): Provider of the
+                tracer, the global one if none.
+        """
+        # pylint: disable=import-outside-toplevel
+        from opentelemetry import metrics as otel_metrics
+        from opentelemetry import trace as otel_trace
+
+        self._observation = otel_metrics.Observation
+        meter = otel_metrics.get_meter(__name__, meter_provider=meter_provider)
+        self._tracer = otel_trace.get_tracer(
+            __name__,
+            tracer_provider=tracer_provider,
+        )
+        self._send_latency = meter.create_histogram(
+            'whatsapp.graph_api.duration',
+            unit='s',
+            description='Seconds taken to send a message to the Graph Api',
+        )
+        self._inbound = meter.create_counter(
+            'whatsapp.inbound.messages',
+            description='Messages received from hook calls',
+        )
+        self._in_flight = meter.create_up_down_counter(
+            'whatsapp.sends.in_flight',
+            description='Sends awaiting the Graph Api',
+        )
+        self._pool_usage = (0, 0)
+        meter.create_observable_gauge(
+            'whatsapp.pool.connections',
+            callbacks=[self._observe_pool],
+            description='Requests holding a pooled connection',
+        )
+
+    def _observe_pool(self, _) -> Iterator:
+        in_use, limit = self._pool_usage
+
+        yield self._observation(in_use, {'state': 'in_use'})
+        yield self._observation(limit, {'state': 'limit'})
+
+    def observe_send(self, message_type: str, status: str, duration: float):
+        self._send_latency.record(
+            duration,
+            {
+                'message_type': message_type,
+                'status': status
+            },
+        )
+
+    def count_inbound(self, outcome: str, reason: str = '', count: int = 1):
+        self._inbound.add(count, {'outcome': outcome, 'reason': reason})
+
+    def add_sends_in_flight(self, delta: int):
+        self._in_flight.add(delta)
+
+    def set_pool_usage(self, in_use: int, limit: int):
+        self._pool_usage = (in_use, limit)
+
+    def start_span(self, name: str, attributes: Dict[str, Any] | None = None):
+        return self._tracer.start_as_current_span(name, attributes=attributes)
+
+
+_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    """
+    Gets the metrics backend used by the connector
+    Returns:
+        Metrics: The backend set with set_metrics, or the no-op one.
+    """
+    return _metrics
+
+
+def set_metrics(metrics: Metrics):
+    """
+    Replaces the instrumentation used by the connector
+    Args:
+        metrics (Metrics): New instrumentation, for instance
+            PrometheusMetrics() or OpenTelemetryMetrics().
+    """
+    global _metrics    # pylint: disable=global-statement
+    _metrics = metrics
@@ -0,0 +1,65 @@
+from typing import Any, Dict, List
+from dataclasses import dataclass, field
+
+
+@dataclass(slots=True)
+class InboundMessage:
+    """
+    Message received from a whatsapp hook call
+    """
+    sender_id: str
+    text: str
+    type: str
+    message_id: str | None = None
+    timestamp: str | None = None
+    # Id of the replied button or list row, for interactive replies
+    payload: str | None = None
+    phone_number_id: str | None = None
+    metadata: Dict[str, Any] | None = None
+    # The hook's message itself, referenced rather than copied
+    raw: Dict[str, Any] | None = field(default=None, repr=False, compare=False)
+
+    def to_rasa_message(self) -> Dict[str, Any]:
+        """
+        Gets the message as returned by get_message_from_whatsapp_hook
+        Returns:
+            dict[str]: The sender id, text, metadata and message id.
+        """
+        return {
+            "sender_id": self.sender_id,
+            "text": self.text,
+            "metadata": self.metadata if self.metadata is not None else {},
+            "message_id": self.message_id,
+        }
+
+
+@dataclass(slots=True)
+class OutboundMessage:
+    """
+    Message to send to the Whatsapp Cloud Api
+    """
+    to: str
+    text: str
+    buttons: List[Dict[str, Any]] | None = None
+    # Url or path of an image or attachment, sent with the text as caption
+    image: str | None = None
+    attachment: str | None = None
+
+    @classmethod
+    def from_rasa_response(cls, to: str, response: Dict[str, Any]):
+        """
+        Creates a message from a rasa response
+        Args:
+            to (str): Message recipient.
+            response (dict[str]): Rasa response dict with text, buttons,
+                image and attachment.
+        Returns:
+            OutboundMessage: The message.
+        """
+        return cls(
+            to,
+            response.get('text'),
+            response.get('buttons') or None,
+            response.get('image'),
+            response.get('attachment'),
+        )
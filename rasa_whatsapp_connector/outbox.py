@@ -0,0 +1,285 @@
+from typing import Any, Awaitable, Callable, List
+from dataclasses import dataclass, field
+
+import asyncio
+import logging
+import sqlite3
+import time
+
+logger = logging.getLogger(__name__)
+
+# Seconds a write waits for others to share its commit, and fsync
+DEFAULT_OUTBOX_COMMIT_DELAY = 0.002
+# Seconds acked entries are kept to recognize their idempotency keys
+DEFAULT_OUTBOX_RETENTION = 24 * 60 * 60
+# Seconds after which an unacked entry is too old to be replayed
+DEFAULT_OUTBOX_MAX_AGE = 60 * 60
+# Seconds between deletions of the acked entries past their retention
+DEFAULT_OUTBOX_PRUNE_INTERVAL = 10 * 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    key TEXT PRIMARY KEY,
+    phone_identifier TEXT NOT NULL,
+    recipient TEXT NOT NULL,
+    message_type TEXT NOT NULL,
+    body BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    acked_at REAL
+)
+"""
+
+
+@dataclass(slots=True)
+class OutboxEntry:
+    """
+    Message written to the outbox before it is sent
+    """
+    # Idempotency key, a message is only sent once per key
+    key: str
+    phone_identifier: str
+    to: str
+    message_type: str
+    body: bytes = field(repr=False)
+    created_at: float = field(default_factory=time.time)
+
+
+class SqliteOutbox:
+    """
+    Write-ahead outbox of outbound messages stored in sqlite. Messages are
+    written before they are sent and acked once the Graph Api has answered,
+    so the messages a crash leaves unacked are replayed on the next start.
+    Writes made while a commit is pending share it, so a burst of messages
+    pays for a single fsync.
+    Messages that fail to send while the process runs, even with a
+    retryable error or an open circuit, aren't retried by the outbox: the
+    error reaches the sender, and the entry stays unacked until the next
+    start replays it, unless it is older than the replay's max age by then.
+    """
+    def __init__(
+        self,
+        path: str,
+        commit_delay: float = DEFAULT_OUTBOX_COMMIT_DELAY,
+        retention: float = DEFAULT_OUTBOX_RETENTION,
+        prune_interval: float = DEFAULT_OUTBOX_PRUNE_INTERVAL,
+    ):
+        """
+        Args:
+            path (str): Path of the sqlite database.
+            commit_delay (float): Seconds a write waits for others to share
+                its commit.
+            retention (float): Seconds acked entries are kept, to recognize
+                their idempotency keys.
+            prune_interval (float): Seconds between deletions of the acked
+                entries past their retention, along with a commit.
+        """
+        self._commit_delay = commit_delay
+        self._retention = retention
+        self._prune_interval = prune_interval
+        self._connection = sqlite3.connect(
+            path,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        # Every commit is synced to disk, commits are batched instead
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=FULL")
+        self._connection.execute(_SCHEMA)
+        self._prune()
+        self._pruned_at = time.monotonic()
+        self._writes: List[Any] = []
+        self._acks: List[str] = []
+        self._commit_task: asyncio.Task | None = None
+        self.commits = 0
+        # Entries left unacked by the previous process
+        self._recovered = self.pending()
+
+    @property
+    def recovered(self) -> int:
+        """
+        Number of entries left unacked by the previous process and not
+        replayed yet
+        """
+        return len(self._recovered)
+
+    def pending(self) -> List[OutboxEntry]:
+        """
+        Gets the unacked entries, in the order they were written
+        Returns:
+            list: The unacked entries.
+        """
+        rows = self._connection.execute(
+            "SELECT key, phone_identifier, recipient, message_type, body, "
+            "created_at FROM outbox WHERE acked_at IS NULL ORDER BY rowid"
+        )
+
+        return [OutboxEntry(*row) for row in rows]
+
+    def _prune(self):
+        self._connection.execute(
+            "DELETE FROM outbox WHERE acked_at < ?",
+            (time.time() - self._retention, ),
+        )
+
+    def _write(
+        self,
+        entries: List[OutboxEntry],
+        acks: List[str],
+        prune: bool = False,
+    ):
+        inserted = []
+        now = time.time()
+
+        self._connection.execute("BEGIN IMMEDIATE")
+
+        try:
+            for entry in entries:
+                cursor = self._connection.execute(
+                    "INSERT OR IGNORE INTO outbox (key, phone_identifier, "
+                    "recipient, message_type, body, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        entry.key,
+                        entry.phone_identifier,
+                        entry.to,
+                        entry.message_type,
+                        entry.body,
+                        entry.created_at,
+                    ),
+                )
+                inserted.append(cursor.rowcount == 1)
+
+            self._connection.executemany(
+                "UPDATE outbox SET acked_at = ? WHERE key = ?",
+                [(now, key) for key in acks],
+            )
+
+            if prune:
+                self._prune()
+
+            self._connection.execute("COMMIT")
+        except BaseException:
+            self._connection.execute("ROLLBACK")
+            raise
+
+        return inserted
+
+    async def _commit(self):
+        try:
+            while self._writes or self._acks:
+                await asyncio.sleep(self._commit_delay)
+                writes, self._writes = self._writes, []
+                acks, self._acks = self._acks, []
+                # A long running process writes a row per message, so old
+                # acked rows are deleted periodically, not only on start
+                prune = (
+                    time.monotonic() - self._pruned_at >= self._prune_interval
+                )
+
+                try:
+                    inserted = await asyncio.to_thread(
+                        self._write,
+                        [entry for entry, _ in writes],
+                        acks,
+                        prune,
+                    )
+                except Exception as exc:    # pylint: disable=broad-except
+                    # A lost ack only means the message is replayed
+                    logger.exception("Failed to write the whatsapp outbox")
+
+                    for _, future in writes:
+                        if not future.done():
+                            future.set_exception(exc)
+
+                    continue
+
+                self.commits += 1
+
+                if prune:
+                    self._pruned_at = time.monotonic()
+
+                for (_, future), new in zip(writes, inserted):
+                    if not future.done():
+                        future.set_result(new)
+        finally:
+            self._commit_task = None
+
+    def _schedule_commit(self):
+        if self._commit_task is None:
+            self._commit_task = asyncio.create_task(self._commit())
+
+    async def add(self, entry: OutboxEntry) -> bool:
+        """
+        Writes an entry, returning once it is synced to disk
+        Args:
+            entry (OutboxEntry): Entry to write.
+        Returns:
+            bool: False if an entry with the same idempotency key was
+                already written, in which case the message mustn't be sent.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._writes.append((entry, future))
+        self._schedule_commit()
+
+        return await future
+
+    def ack(self, key: str):
+        """
+        Marks an entry as sent. Acks are written along with the next commit
+        and not awaited, a lost ack only makes the message be replayed.
+        Args:
+            key (str): Idempotency key of the entry.
+        """
+        self._acks.append(key)
+        self._schedule_commit()
+
+    async def replay(
+        self,
+        send: Callable[[OutboxEntry], Awaitable[Any]],
+        max_age: float = DEFAULT_OUTBOX_MAX_AGE,
+    ) -> int:
+        """
+        Sends the entries left unacked by the previous process, in order.
+        Entries that fail again stay unacked.
+        Args:
+            send (callable): Awaited with each entry to send it.
+            max_age (float): Seconds after which an entry is dropped
+                instead of being sent.
+        Returns:
+            int: Number of replayed entries.
+        """
+        entries, self._recovered = self._recovered, []
+        replayed = 0
+
+        for entry in entries:
+            if time.time() - entry.created_at > max_age:
+                logger.warning("Dropped stale outbox message %s", entry.key)
+                self.ack(entry.key)
+                continue
+
+            try:
+                await send(entry)
+            except Exception:    # pylint: disable=broad-except
+                logger.exception(
+                    "Failed to replay outbox message %s", entry.key
+                )
+                continue
+
+            self.ack(entry.key)
+            replayed += 1
+
+        return replayed
+
+    async def flush(self):
+        """
+        Waits for the pending writes and acks to be committed
+        """
+        while self._commit_task is not None:
+            await asyncio.shield(self._commit_task)
+
+    async def close(self):
+        """
+        Commits the pending acks and closes the database
+        """
+        await self.flush()
+        self._connection.close()
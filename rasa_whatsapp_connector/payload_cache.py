@@ -0,0 +1,318 @@
+from typing import Any, Callable, Dict, Hashable, List
+
+import collections
+
+from rasa_whatsapp_connector.serialization import dumps as _dumps
+
+DEFAULT_TEMPLATE_CACHE_SIZE = 1024
+DEFAULT_RESPONSE_CACHE_SIZE = 4096
+# Recipient responses are encoded with, then split at, when first cached.
+# The recipient comes before the text in every payload, so a text holding
+# the placeholder can't be mistaken for it.
+_RECIPIENT_PLACEHOLDER = '\x00to\x00'
+
+
+def build_interactive_message(
+    to: str,
+    kind: str,
+    text: str,
+    action: Dict[str, Any],
+) -> Dict[str, Any]:
+    """
+    Builds an interactive message
+    Args:
+        to (str): Message recipient.
+        kind (str): Interactive message type, button or list.
+        text (str): Message text.
+        action (dict[str]): Interactive action.
+    Returns:
+        dict[str]: The message.
+    """
+    return {
+        'messaging_product': 'whatsapp',
+        'to': to,
+        'type': 'interactive',
+        'interactive':
+            {
+                'type': kind,
+                'body': {
+                    "text": text
+                },
+                'action': action,
+            }
+    }
+
+
+class InteractiveTemplate:
+    """
+    Pre-built skeleton of an interactive message. The action, with its
+    already truncated buttons or rows, is built and serialized once, so a
+    message only needs the recipient and the body text spliced in. Its
+    buttons or rows are kept as tuples nothing can modify, and every built
+    message gets fresh dicts of them.
+    """
+    __slots__ = ('kind', '_label', '_items', '_prefix', '_middle', '_suffix')
+
+    def __init__(self, kind: str, action: Dict[str, Any]):
+        """
+        Args:
+            kind (str): Interactive message type, button or list.
+            action (dict[str]): Interactive action, encoded once and copied
+                into every message built from the template.
+        """
+        self.kind = kind
+        self._label = action.get('button')
+
+        # Items of each reply or row, rebuilt with a single dict call
+        if kind == 'button':
+            self._items = tuple(
+                tuple(button['reply'].items()) for button in action['buttons']
+            )
+        else:
+            self._items = tuple(
+                (
+                    section['title'],
+                    tuple(tuple(row.items()) for row in section['rows']),
+                ) for section in action['sections']
+            )
+
+        # Keys are laid out in the same order as in build, so both give the
+        # same payload.
+        self._prefix = b'{"messaging_product":"whatsapp","to":'
+        self._middle = (
+            b',"type":"interactive","interactive":{"type":' + _dumps(kind) +
+            b',"body":{"text":'
+        )
+        self._suffix = b'},"action":' + _dumps(action) + b'}}'
+
+    @property
+    def action(self) -> Dict[str, Any]:
+        """
+        Gets the interactive action
+        Returns:
+            dict[str]: A new copy of the action.
+        """
+        if self.kind == 'button':
+            return {
+                'buttons':
+                    [
+                        {
+                            'type': 'reply',
+                            'reply': dict(reply)
+                        } for reply in self._items
+                    ]
+            }
+
+        return {
+            'button':
+                self._label,
+            'sections':
+                [
+                    {
+                        'title': title,
+                        'rows': [dict(row) for row in rows]
+                    } for title, rows in self._items
+                ],
+        }
+
+    def build(self, to: str, text: str) -> Dict[str, Any]:
+        """
+        Builds a message from the template
+        Args:
+            to (str): Message recipient.
+            text (str): Message text.
+        Returns:
+            dict[str]: The message, with its own copy of the action so
+                callers can modify it.
+        """
+        return build_interactive_message(to, self.kind, text, self.action)
+
+    def encode(self, to: str, text: str) -> bytes:
+        """
+        Encodes a message from the template as json
+        Args:
+            to (str): Message recipient.
+            text (str): Message text.
+        Returns:
+            bytes: The json encoded message.
+        """
+        return b''.join(
+            (
+                self._prefix,
+                _dumps(to),
+                self._middle,
+                _dumps(text),
+                self._suffix,
+            )
+        )
+
+
+class PayloadTemplateCache:
+    """
+    Least recently used cache of interactive templates, keyed by the
+    message type and its set of buttons. A domain's button sets are mostly
+    static, so every response reuses the template built the first time.
+    """
+    def __init__(self, max_size: int = DEFAULT_TEMPLATE_CACHE_SIZE):
+        """
+        Args:
+            max_size (int): Maximum number of cached templates.
+        """
+        self._max_size = max_size
+        self._templates = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._templates)
+
+    def get(
+        self,
+        kind: str,
+        buttons: List[Dict[str, Any]],
+        build_action: Callable[[], Dict[str, Any]],
+        *extra_key: Hashable,
+    ) -> InteractiveTemplate:
+        """
+        Gets the template of a set of buttons, building it if needed
+        Args:
+            kind (str): Interactive message type, button or list.
+            buttons (list): Rasa buttons.
+            build_action (callable): Builds the interactive action.
+            extra_key (hashable): Other values the action depends on.
+        Returns:
+            InteractiveTemplate: The cached template.
+        """
+        key = (
+            kind,
+            tuple((button['title'], button['payload']) for button in buttons),
+        ) + extra_key
+        template = self._templates.get(key)
+
+        if template is not None:
+            self._templates.move_to_end(key)
+            return template
+
+        template = InteractiveTemplate(kind, build_action())
+        self._templates[key] = template
+
+        if len(self._templates) > self._max_size:
+            self._templates.popitem(last=False)
+
+        return template
+
+
+def encode_text_message(to: str, text: str) -> bytes:
+    """
+    Encodes a text message as json
+    Args:
+        to (str): Message recipient.
+        text (str): Message text.
+    Returns:
+        bytes: The json encoded message.
+    """
+    return b''.join(
+        (
+            b'{"messaging_product":"whatsapp","to":',
+            _dumps(to),
+            b',"text":{"body":',
+            _dumps(text),
+            b'}}',
+        )
+    )
+
+
+class _CachedResponse:
+    __slots__ = ('head', 'tail')
+
+    def __init__(self):
+        self.head: bytes | None = None
+        self.tail: bytes | None = None
+
+
+class ResponseCache:
+    """
+    Least recently used cache of whole encoded responses, keyed by their
+    type, text and buttons. Replies like greetings and menus are the same
+    for every user, so a repeated response skips building, truncating and
+    encoding its payload, and only the recipient is spliced into the cached
+    body. Only bytes are cached, nothing a caller could modify is shared.
+    """
+    def __init__(self, max_size: int = DEFAULT_RESPONSE_CACHE_SIZE):
+        """
+        Args:
+            max_size (int): Maximum number of cached responses.
+        """
+        self._max_size = max_size
+        self._responses = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._responses)
+
+    @staticmethod
+    def get_key(
+        text: str,
+        buttons: List[Dict[str, Any]] | None = None,
+    ) -> Hashable:
+        """
+        Gets the key of a response, whatever its recipient
+        Args:
+            text (str): Message text.
+            buttons (list or none): Optional list of buttons.
+        Returns:
+            hashable: The response key.
+        """
+        if buttons is None:
+            return ('text', text)
+
+        return (
+            'button' if len(buttons) <= 3 else 'list',
+            text,
+            tuple(
+                (button['title'], button['payload'], button.get('section'))
+                for button in buttons
+            ),
+        )
+
+    def _get(self, key: Hashable) -> _CachedResponse:
+        response = self._responses.get(key)
+
+        if response is not None:
+            self._responses.move_to_end(key)
+            return response
+
+        response = _CachedResponse()
+        self._responses[key] = response
+
+        if len(self._responses) > self._max_size:
+            self._responses.popitem(last=False)
+
+        return response
+
+    def encode(
+        self,
+        key: Hashable,
+        to: str,
+        encode: Callable[[str], bytes],
+    ) -> bytes:
+        """
+        Gets the json encoded body of a response, encoding it if needed
+        Args:
+            key (hashable): Response key, its type, text and buttons.
+            to (str): Message recipient.
+            encode (callable): Encodes the response for a recipient.
+        Returns:
+            bytes: The json encoded message.
+        """
+        response = self._get(key)
+
+        if response.head is None:
+            self.misses += 1
+            body = encode(_RECIPIENT_PLACEHOLDER)
+            response.head, _, response.tail = body.partition(
+                _dumps(_RECIPIENT_PLACEHOLDER)
+            )
+        else:
+            self.hits += 1
+
+        return b''.join((response.head, _dumps(to), response.tail))
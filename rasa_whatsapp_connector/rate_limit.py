@@ -0,0 +1,193 @@
+from typing import Dict, Any
+
+import asyncio
+import collections
+import time
+
+# Default Cloud Api throughput of a business phone number
+DEFAULT_PHONE_RATE = 80
+DEFAULT_PHONE_BURST = 80
+# A business phone number can send a burst of messages to the same user,
+# but then has to average one message every six seconds.
+DEFAULT_RECIPIENT_RATE = 1 / 6
+DEFAULT_RECIPIENT_BURST = 45
+DEFAULT_MAX_RECIPIENTS = 10000
+
+
+class TokenBucket:
+    """
+    Token bucket that makes callers wait for a token instead of failing.
+    Tokens are reserved in arrival order, so waiting callers are served
+    first come first served and bursts are smoothed to the bucket's rate.
+    """
+    def __init__(self, rate: float, capacity: float):
+        """
+        Args:
+            rate (float): Tokens added per second.
+            capacity (float): Maximum number of tokens, the allowed burst.
+        """
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    def reserve(self) -> float:
+        """
+        Takes a token, going in debt when none is left
+        Returns:
+            float: Seconds to wait until the token is actually available.
+        """
+        now = time.monotonic()
+        self._tokens = min(
+            self._capacity,
+            self._tokens + (now - self._updated) * self._rate,
+        )
+        self._updated = now
+        self._tokens -= 1
+
+        if self._tokens >= 0:
+            return 0
+
+        return -self._tokens / self._rate
+
+    def refund(self):
+        """
+        Gives back a reserved token that won't be used, for instance by a
+        caller cancelled while waiting for it
+        """
+        self._tokens = min(self._capacity, self._tokens + 1)
+
+
+class SendScheduler:
+    """
+    Schedules outbound messages so they stay within the Cloud Api
+    throughput limits, with one token bucket per business phone number and
+    one per phone number and recipient pair. Messages over the limits are
+    delayed rather than rejected. A message first waits for its recipient's
+    bucket and only then for the phone number's one.
+    """
+    def __init__(
+        self,
+        phone_rate: float = DEFAULT_PHONE_RATE,
+        phone_burst: float = DEFAULT_PHONE_BURST,
+        recipient_rate: float = DEFAULT_RECIPIENT_RATE,
+        recipient_burst: float = DEFAULT_RECIPIENT_BURST,
+        max_recipients: int = DEFAULT_MAX_RECIPIENTS,
+    ):
+        """
+        Args:
+            phone_rate (float): Messages per second of a phone number.
+            phone_burst (float): Burst size of a phone number.
+            recipient_rate (float): Messages per second to a recipient.
+            recipient_burst (float): Burst size to a recipient.
+            max_recipients (int): Maximum number of recipient buckets kept,
+                the least recently used ones are dropped.
+        """
+        self._phone_rate = phone_rate
+        self._phone_burst = phone_burst
+        self._recipient_rate = recipient_rate
+        self._recipient_burst = recipient_burst
+        self._max_recipients = max_recipients
+        self._phone_buckets: Dict[str, TokenBucket] = {}
+        self._recipient_buckets = collections.OrderedDict()
+        self._waiting = 0
+        self._scheduled = 0
+        self._delayed = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        """
+        Number of messages waiting for their turn
+        """
+        return self._waiting
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Gets the scheduler metrics
+        Returns:
+            dict[str]: Current queue depth, number of scheduled and delayed
+                messages, and the total and maximum wait time in seconds.
+        """
+        return {
+            'queue_depth': self._waiting,
+            'scheduled': self._scheduled,
+            'delayed': self._delayed,
+            'total_wait': self._total_wait,
+            'max_wait': self._max_wait,
+        }
+
+    def _get_phone_bucket(self, phone_identifier: str) -> TokenBucket:
+        bucket = self._phone_buckets.get(phone_identifier)
+
+        if bucket is None:
+            bucket = TokenBucket(self._phone_rate, self._phone_burst)
+            self._phone_buckets[phone_identifier] = bucket
+
+        return bucket
+
+    def _get_recipient_bucket(
+        self,
+        phone_identifier: str,
+        to: str,
+    ) -> TokenBucket:
+        key = (phone_identifier, to)
+        bucket = self._recipient_buckets.pop(key, None)
+
+        if bucket is None:
+            bucket = TokenBucket(self._recipient_rate, self._recipient_burst)
+
+            if len(self._recipient_buckets) >= self._max_recipients:
+                self._recipient_buckets.popitem(last=False)
+
+        self._recipient_buckets[key] = bucket
+
+        return bucket
+
+    async def acquire(self, phone_identifier: str, to: str):
+        """
+        Waits until a message can be sent
+        Args:
+            phone_identifier (str): Sending business phone number id.
+            to (str): Message recipient.
+        """
+        recipient_bucket = self._get_recipient_bucket(phone_identifier, to)
+        phone_bucket = self._get_phone_bucket(phone_identifier)
+        wait = recipient_bucket.reserve()
+        phone_wait = None
+
+        self._scheduled += 1
+        self._waiting += 1
+
+        try:
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+            # The phone token is only taken once the recipient's turn has
+            # come, so messages held back for a busy recipient don't hold
+            # back the messages to every other recipient
+            phone_wait = phone_bucket.reserve()
+
+            if phone_wait > 0:
+                await asyncio.sleep(phone_wait)
+        except asyncio.CancelledError:
+            # The message won't be sent, so the messages queued behind it
+            # shouldn't wait for its tokens
+            recipient_bucket.refund()
+
+            if phone_wait is not None:
+                phone_bucket.refund()
+
+            raise
+        finally:
+            self._waiting -= 1
+
+        wait += phone_wait
+
+        if wait <= 0:
+            return
+
+        self._delayed += 1
+        self._total_wait += wait
+        self._max_wait = max(self._max_wait, wait)
@@ -0,0 +1,257 @@
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+import asyncio
+import logging
+import os
+
+from rasa_whatsapp_connector.core import iter_whatsapp_hook_values
+from rasa_whatsapp_connector.metrics import get_metrics
+from rasa_whatsapp_connector.models import InboundMessage
+from rasa_whatsapp_connector.outbox import OutboxEntry, SqliteOutbox
+from rasa_whatsapp_connector.rate_limit import SendScheduler
+from rasa_whatsapp_connector.retry import CircuitBreaker, RetryPolicy
+from rasa_whatsapp_connector.sender import AsyncWhatsappSender
+from rasa_whatsapp_connector.serialization import loads
+from rasa_whatsapp_connector.whatsapp import (
+    RasaToWhatsappConverter,
+    DEFAULT_GRAPH_API_URL,
+    DEFAULT_WHATSAPP_API_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WATCH_INTERVAL = 5
+
+
+class ConverterRegistry:
+    """
+    Registry of the converters of several whatsapp business numbers, so a
+    single deployment can serve all of them. Hook changes are routed to the
+    converter of their phone number id. Every converter shares the same
+    connection pool and scheduler, but gets its own circuit breaker so a
+    failing number doesn't stop the others from sending.
+    """
+    def __init__(
+        self,
+        graphql_api_version: str = 'v18.0',
+        api_timeout: int = DEFAULT_WHATSAPP_API_TIMEOUT,
+        async_sender: AsyncWhatsappSender | None = None,
+        scheduler: SendScheduler | None = None,
+        retry_policy: RetryPolicy | None = None,
+        circuit_breaker_factory: Callable[[], CircuitBreaker] | None = None,
+        graph_api_url: str = DEFAULT_GRAPH_API_URL,
+        outbox: SqliteOutbox | None = None,
+    ):
+        """
+        Args:
+            graphql_api_version (str): Default api version of the tenants.
+            api_timeout (int): Default api timeout of the tenants.
+            async_sender (AsyncWhatsappSender or none): Shared sender.
+            scheduler (SendScheduler or none): Shared scheduler.
+            retry_policy (RetryPolicy or none): Shared retry policy.
+            circuit_breaker_factory (callable or none): Creates the circuit
+                breaker of each phone number.
+            graph_api_url (str): Base url of the Graph Api, for instance of
+                a local simulator.
+            outbox (SqliteOutbox or none): Shared outbox.
+        """
+        if async_sender is None:
+            async_sender = AsyncWhatsappSender(api_timeout)
+
+        self._graphql_api_version = graphql_api_version
+        self._api_timeout = api_timeout
+        self._async_sender = async_sender
+        self._circuit_breaker_factory = circuit_breaker_factory
+        # Arguments every converter shares
+        self._converter_kwargs = {
+            'async_sender': async_sender,
+            'scheduler': scheduler,
+            'retry_policy': retry_policy,
+            'graph_api_url': graph_api_url,
+            'outbox': outbox,
+        }
+        self._converters: Dict[str, RasaToWhatsappConverter] = {}
+        self._configs: Dict[str, Tuple] = {}
+
+    def __len__(self):
+        return len(self._converters)
+
+    def __contains__(self, phone_identifier: str):
+        return phone_identifier in self._converters
+
+    def get(self, phone_identifier: str) -> RasaToWhatsappConverter | None:
+        """
+        Gets the converter of a business phone number
+        Args:
+            phone_identifier (str): Phone number id.
+        Returns:
+            RasaToWhatsappConverter or None: The converter, if registered.
+        """
+        return self._converters.get(phone_identifier)
+
+    def _get_config(self, tenant: Dict[str, Any]) -> Tuple:
+        return (
+            tenant['token'],
+            tenant.get('graphql_api_version', self._graphql_api_version),
+            tenant.get('api_timeout', self._api_timeout),
+        )
+
+    def load(self, tenants: List[Dict[str, Any]]):
+        """
+        Replaces the registered tenants. Converters of unchanged tenants are
+        kept, along with their caches, and the new set of converters is
+        swapped in at once.
+        Args:
+            tenants (list): Tenant dicts with phone_identifier, token and
+                optionally graphql_api_version and api_timeout.
+        Raises:
+            ValueError if a tenant is invalid
+        """
+        converters = {}
+        configs = {}
+
+        for tenant in tenants:
+            try:
+                phone_identifier = str(tenant['phone_identifier'])
+                config = self._get_config(tenant)
+            except (KeyError, TypeError) as exc:
+                raise ValueError("Provided tenant is invalid!") from exc
+
+            converter = self._converters.get(phone_identifier)
+
+            if converter is None or self._configs[phone_identifier] != config:
+                token, graphql_api_version, api_timeout = config
+                circuit_breaker = None
+
+                if self._circuit_breaker_factory is not None:
+                    circuit_breaker = self._circuit_breaker_factory()
+
+                converter = RasaToWhatsappConverter(
+                    phone_identifier,
+                    token,
+                    graphql_api_version,
+                    api_timeout,
+                    circuit_breaker=circuit_breaker,
+                    **self._converter_kwargs,
+                )
+
+            converters[phone_identifier] = converter
+            configs[phone_identifier] = config
+
+        self._converters = converters
+        self._configs = configs
+
+    def load_file(self, path: str):
+        """
+        Replaces the registered tenants with the ones of a json file,
+        holding either a list of tenants or a dict with a tenants list
+        Args:
+            path (str): Path of the file.
+        Raises:
+            ValueError if the file or a tenant is invalid
+        """
+        with open(path, 'rb') as tenants_file:
+            tenants = loads(tenants_file.read())
+
+        if isinstance(tenants, dict):
+            tenants = tenants.get('tenants')
+
+        if not isinstance(tenants, list):
+            raise ValueError("Provided tenants file is invalid!")
+
+        self.load(tenants)
+
+    async def watch_file(
+        self,
+        path: str,
+        interval: float = DEFAULT_WATCH_INTERVAL,
+    ):
+        """
+        Reloads the tenants whenever a json file changes, until cancelled.
+        An invalid file is logged and the current tenants are kept.
+        Args:
+            path (str): Path of the file.
+            interval (float): Seconds between checks.
+        """
+        modified_at = None
+
+        while True:
+            try:
+                current = os.stat(path).st_mtime_ns
+
+                if current != modified_at:
+                    # Recorded first, so an invalid file is only reported
+                    # once rather than at every check until it changes
+                    modified_at = current
+                    self.load_file(path)
+                    logger.info("Loaded %d whatsapp tenants", len(self))
+            except (OSError, ValueError):
+                logger.exception("Failed to load whatsapp tenants")
+
+            await asyncio.sleep(interval)
+
+    def iter_inbound_messages_from_whatsapp_hook(
+        self,
+        data: Dict[str, Any],
+    ) -> Iterator[Tuple[RasaToWhatsappConverter, InboundMessage]]:
+        """
+        Iterates over every message in a whatsapp hook call, along with the
+        converter of the phone number it was sent to. Messages sent to
+        unregistered phone numbers are skipped.
+        Args:
+            data(dict[str]): Whatsapp hook data.
+        Yields:
+            tuple: Each converter and message.
+        """
+        for value in iter_whatsapp_hook_values(data):
+            metadata = value.get("metadata")
+            phone_number_id = None
+
+            if isinstance(metadata, dict):
+                phone_number_id = metadata.get("phone_number_id")
+
+            converter = None
+
+            if isinstance(phone_number_id, str):
+                converter = self._converters.get(phone_number_id)
+
+            if converter is None:
+                messages = value.get("messages")
+
+                if messages and isinstance(messages, list):
+                    get_metrics().count_inbound(
+                        'dropped',
+                        'unknown_phone',
+                        len(messages),
+                    )
+                    logger.warning(
+                        "Dropped messages sent to unknown phone number %s",
+                        phone_number_id,
+                    )
+
+                continue
+
+            for message in converter.iter_inbound_messages_from_value(value):
+                yield converter, message
+
+    async def send_outbox_entry(self, entry: OutboxEntry):
+        """
+        Sends an outbox entry through the converter of its phone number,
+        meant to be passed to SqliteOutbox.replay
+        Args:
+            entry (OutboxEntry): Entry to send.
+        Raises:
+            ValueError if the phone number is no longer registered
+        """
+        converter = self._converters.get(entry.phone_identifier)
+
+        if converter is None:
+            raise ValueError("Provided phone number is unknown!")
+
+        await converter.send_outbox_entry(entry)
+
+    async def close(self):
+        """
+        Closes the shared connection pool
+        """
+        await self._async_sender.close()
@@ -0,0 +1,342 @@
+from typing import Any, Awaitable, Callable, Dict, Tuple, Type
+
+import asyncio
+import random
+import time
+
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_BASE_DELAY = 0.5
+DEFAULT_MAX_DELAY = 8
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30
+
+# Graph Api error codes worth retrying: throttling and transient failures.
+# Every other error code, such as an invalid recipient or an expired token,
+# fails the same way however many times it is retried.
+RETRYABLE_ERROR_CODES = frozenset(
+    {
+        1,    # API Unknown
+        2,    # API Service
+        4,    # API Too Many Calls
+        17,    # API User Too Many Calls
+        341,    # Application limit reached
+        80007,    # Rate limit issues
+        130429,    # Rate limit hit
+        131000,    # Something went wrong
+        131016,    # Service unavailable
+        131056,    # Pair rate limit hit
+        133004,    # Server temporarily unavailable
+    }
+)
+
+
+class GraphApiError(Exception):
+    """
+    Error returned by the Graph Api
+    """
+    def __init__(self, status: int, error: Dict[str, Any]):
+        super().__init__(error.get('message', f'Graph Api error {status}'))
+        self.status = status
+        self.code = error.get('code')
+        self.error = error
+
+    @property
+    def retryable(self) -> bool:
+        """
+        Whether the call may succeed if retried
+        """
+        return (
+            self.status == 429 or self.status >= 500
+            or self.code in RETRYABLE_ERROR_CODES
+        )
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling the Graph Api while the circuit is open
+    """
+
+
+def raise_for_graph_error(status: int, body: Any):
+    """
+    Raises the error of a Graph Api response, if any
+    Args:
+        status (int): Response status code.
+        body (any): Decoded response body.
+    Raises:
+        GraphApiError if the response is an error
+    """
+    error = body.get('error') if isinstance(body, dict) else None
+
+    if status >= 400 or error is not None:
+        raise GraphApiError(status, error if isinstance(error, dict) else {})
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter, bounded by a number of attempts
+    and by a total deadline
+    """
+    def __init__(
+        self,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        base_delay: float = DEFAULT_BASE_DELAY,
+        max_delay: float = DEFAULT_MAX_DELAY,
+        deadline: float | None = None,
+    ):
+        """
+        Args:
+            max_attempts (int): Maximum number of attempts.
+            base_delay (float): Delay before the first retry, in seconds.
+            max_delay (float): Maximum delay between attempts, in seconds.
+            deadline (float or none): Total seconds every attempt has to
+                fit in. None uses the api timeout of the converter.
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    def get_delay(self, attempt: int) -> float:
+        """
+        Gets the delay before retrying
+        Args:
+            attempt (int): Number of attempts made so far.
+        Returns:
+            float: Seconds to wait.
+        """
+        return random.uniform(
+            0,
+            min(self.max_delay, self.base_delay * 2**(attempt - 1)),
+        )
+
+
+class CircuitBreaker:
+    """
+    Fails fast while the Graph Api is degraded. After a number of
+    consecutive failures the circuit opens and calls are rejected, until
+    the reset timeout lets a single trial call through.
+    """
+    def __init__(
+        self,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        reset_timeout: float = DEFAULT_RESET_TIMEOUT,
+    ):
+        """
+        Args:
+            failure_threshold (int): Consecutive failures opening the circuit.
+            reset_timeout (float): Seconds the circuit stays open.
+        """
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial = False
+
+    @property
+    def open(self) -> bool:
+        """
+        Whether calls are currently rejected
+        """
+        return self._opened_at is not None
+
+    def before_call(self):
+        """
+        Checks a call can be made
+        Raises:
+            CircuitOpenError if the circuit is open
+        """
+        if self._opened_at is None:
+            return
+
+        elapsed = time.monotonic() - self._opened_at
+
+        if elapsed < self._reset_timeout or self._trial:
+            raise CircuitOpenError("Graph Api circuit is open")
+
+        self._trial = True
+
+    def record_success(self):
+        """
+        Records a successful call, closing the circuit
+        """
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+
+    def record_failure(self):
+        """
+        Records a failed call, opening the circuit after too many of them
+        in a row or when a trial call failed
+        """
+        self._failures += 1
+
+        if self._trial or self._failures >= self._failure_threshold:
+            self._opened_at = time.monotonic()
+
+        self._trial = False
+
+    def release_trial(self):
+        """
+        Lets another trial call through, when the current one ended without
+        an outcome, like a cancelled call
+        """
+        self._trial = False
+
+
+class _Attempts:
+    """
+    Bookkeeping shared by the blocking and asynchronous retry loops
+    """
+    def __init__(
+        self,
+        policy: RetryPolicy,
+        breaker: CircuitBreaker | None,
+        timeout: float,
+        transient_errors: Tuple[Type[BaseException], ...],
+    ):
+        deadline = policy.deadline if policy.deadline is not None else timeout
+
+        self._policy = policy
+        self._breaker = breaker
+        self._timeout = timeout
+        self._transient_errors = transient_errors
+        self._expires_at = time.monotonic() + deadline
+        self.attempt = 0
+
+    def start(self) -> float:
+        """
+        Starts an attempt
+        Returns:
+            float: Timeout of the attempt, within the policy's deadline.
+        Raises:
+            CircuitOpenError if the circuit is open
+        """
+        if self._breaker is not None:
+            self._breaker.before_call()
+
+        self.attempt += 1
+
+        return max(0, min(self._timeout, self._expires_at - time.monotonic()))
+
+    def succeeded(self):
+        """
+        Records the attempt succeeded
+        """
+        if self._breaker is not None:
+            self._breaker.record_success()
+
+    def failed(self, exc: BaseException) -> float:
+        """
+        Records the attempt failed
+        Args:
+            exc (BaseException): Error of the attempt.
+        Returns:
+            float: Seconds to wait before retrying.
+        Raises:
+            The error when it isn't retried
+        """
+        if isinstance(exc, GraphApiError) and not exc.retryable:
+            # The api answered, so it isn't degraded
+            self.succeeded()
+            raise exc
+
+        # Unclassified errors aren't retried, but still count as failures so
+        # a trial call ending with one settles the circuit
+        if self._breaker is not None:
+            self._breaker.record_failure()
+
+        if not isinstance(exc, (GraphApiError, ) + self._transient_errors):
+            raise exc
+
+        delay = self._policy.get_delay(self.attempt)
+
+        if (
+            self.attempt >= self._policy.max_attempts
+            or time.monotonic() + delay >= self._expires_at
+        ):
+            raise exc
+
+        return delay
+
+    def cancelled(self):
+        """
+        Records the attempt was cancelled without an outcome
+        """
+        if self._breaker is not None:
+            self._breaker.release_trial()
+
+
+def call_with_retry(
+    call: Callable[[float], Any],
+    policy: RetryPolicy,
+    breaker: CircuitBreaker | None,
+    timeout: float,
+    transient_errors: Tuple[Type[BaseException], ...] = (),
+):
+    """
+    Calls the Graph Api, retrying retryable errors
+    Args:
+        call (callable): Function making the call, given its timeout.
+        policy (RetryPolicy): Retry policy.
+        breaker (CircuitBreaker or none): Optional circuit breaker.
+        timeout (float): Timeout of a single attempt.
+        transient_errors (tuple): Transport errors worth retrying.
+    Returns:
+        any: The result of the call.
+    Raises:
+        GraphApiError, CircuitOpenError or the transport error when giving up
+    """
+    attempts = _Attempts(policy, breaker, timeout, transient_errors)
+
+    while True:
+        attempt_timeout = attempts.start()
+
+        try:
+            result = call(attempt_timeout)
+        except Exception as exc:    # pylint: disable=broad-except
+            time.sleep(attempts.failed(exc))
+        except BaseException:
+            attempts.cancelled()
+            raise
+        else:
+            attempts.succeeded()
+            return result
+
+
+async def call_with_retry_async(
+    call: Callable[[float], Awaitable[Any]],
+    policy: RetryPolicy,
+    breaker: CircuitBreaker | None,
+    timeout: float,
+    transient_errors: Tuple[Type[BaseException], ...] = (),
+):
+    """
+    Calls the Graph Api without blocking, retrying retryable errors
+    Args:
+        call (callable): Coroutine function making the call, given its
+            timeout.
+        policy (RetryPolicy): Retry policy.
+        breaker (CircuitBreaker or none): Optional circuit breaker.
+        timeout (float): Timeout of a single attempt.
+        transient_errors (tuple): Transport errors worth retrying.
+    Returns:
+        any: The result of the call.
+    Raises:
+        GraphApiError, CircuitOpenError or the transport error when giving up
+    """
+    attempts = _Attempts(policy, breaker, timeout, transient_errors)
+
+    while True:
+        attempt_timeout = attempts.start()
+
+        try:
+            result = await call(attempt_timeout)
+        except Exception as exc:    # pylint: disable=broad-except
+            await asyncio.sleep(attempts.failed(exc))
+        except BaseException:
+            attempts.cancelled()
+            raise
+        else:
+            attempts.succeeded()
+            return result
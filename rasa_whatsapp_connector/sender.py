@@ -0,0 +1,368 @@
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    Tuple,
+)
+from dataclasses import dataclass
+
+import contextlib
+import time
+
+from rasa_whatsapp_connector.metrics import get_metrics
+from rasa_whatsapp_connector.retry import CircuitOpenError, GraphApiError
+from rasa_whatsapp_connector.serialization import loads
+
+if TYPE_CHECKING:    # pragma: no cover
+    import aiohttp
+
+DEFAULT_POOL_LIMIT = 100
+DEFAULT_POOL_LIMIT_PER_HOST = 0
+DEFAULT_KEEPALIVE_TIMEOUT = 30
+DEFAULT_DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def import_aiohttp():
+    """
+    Imports aiohttp, which is only installed with the http extra
+    Returns:
+        module: The aiohttp module.
+    Raises:
+        ImportError if aiohttp isn't installed
+    """
+    try:
+        import aiohttp    # pylint: disable=import-outside-toplevel
+    except ImportError as exc:
+        raise ImportError(
+            'Sending messages asynchronously needs aiohttp, install it with '
+            '"pip install rasa_whatsapp_connector[http]"'
+        ) from exc
+
+    return aiohttp
+
+
+@dataclass
+class SendResult:
+    """
+    Result of sending one message of a batch
+    """
+    response: Dict[str, Any] | None = None
+    error: Exception | None = None
+    skipped: bool = False
+
+    @property
+    def ok(self) -> bool:
+        """
+        Whether the message was sent
+        """
+        return self.error is None and not self.skipped
+
+
+@dataclass
+class SendTracker:
+    """
+    Outcome of a send being timed by track_send
+    """
+    span: Any
+    status: str = 'error'
+
+    def record(self, status: int, response: Any):
+        """
+        Records the response of the send
+        Args:
+            status (int): Response status.
+            response (any): Decoded response body.
+        """
+        self.status = str(status)
+
+        if not isinstance(response, dict):
+            return
+
+        for message in response.get('messages') or ():
+            self.span.set_attribute('whatsapp.message_id', message.get('id'))
+
+
+@contextlib.contextmanager
+def track_send(message_type: str) -> Iterator[SendTracker]:
+    """
+    Times a send, labelled by the status of its response, in a span that is
+    a child of the received message's one
+    Args:
+        message_type (str): Type of the sent message.
+    Yields:
+        SendTracker: Tracker to record the response with.
+    """
+    metrics = get_metrics()
+    attributes = {'whatsapp.message_type': message_type}
+    started_at = time.perf_counter()
+    metrics.add_sends_in_flight(1)
+
+    with metrics.start_span('whatsapp.send', attributes) as span:
+        tracker = SendTracker(span)
+
+        try:
+            yield tracker
+        except GraphApiError as exc:
+            tracker.status = str(exc.status)
+            raise
+        except CircuitOpenError:
+            tracker.status = 'circuit_open'
+            raise
+        finally:
+            metrics.add_sends_in_flight(-1)
+            metrics.observe_send(
+                message_type,
+                tracker.status,
+                time.perf_counter() - started_at,
+            )
+
+
+class AsyncWhatsappSender:
+    """
+    Asynchronous sender that keeps a pool of long-lived keep-alive
+    connections to the Whatsapp Cloud Api, so consecutive messages
+    don't pay for a new TCP and TLS handshake each time.
+    """
+    def __init__(
+        self,
+        api_timeout: float,
+        pool_limit: int = DEFAULT_POOL_LIMIT,
+        pool_limit_per_host: int = DEFAULT_POOL_LIMIT_PER_HOST,
+        keepalive_timeout: float = DEFAULT_KEEPALIVE_TIMEOUT,
+    ):
+        """
+        Args:
+            api_timeout (float): Total timeout of a single request.
+            pool_limit (int): Maximum number of open connections.
+            pool_limit_per_host (int): Maximum number of open connections
+                to the same host, 0 means no limit.
+            keepalive_timeout (float): Seconds an idle connection is kept
+                open for reuse.
+        """
+        self._api_timeout = api_timeout
+        self._pool_limit = pool_limit
+        self._pool_limit_per_host = pool_limit_per_host
+        self._keepalive_timeout = keepalive_timeout
+        self._session: 'aiohttp.ClientSession | None' = None
+        # Requests holding a pooled connection
+        self._in_use = 0
+
+    @property
+    def in_use(self) -> int:
+        """
+        Number of requests holding a pooled connection
+        """
+        return self._in_use
+
+    @property
+    def closed(self) -> bool:
+        """
+        Whether the connection pool is closed
+        """
+        return self._session is None or self._session.closed
+
+    def _get_session(self) -> 'aiohttp.ClientSession':
+        # The session has to be created inside a running event loop, so it
+        # is built lazily on the first request instead of in __init__. So is
+        # aiohttp imported, to keep it out of processes that never send.
+        aiohttp = import_aiohttp()
+
+        if self.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self._pool_limit,
+                limit_per_host=self._pool_limit_per_host,
+                keepalive_timeout=self._keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self._api_timeout),
+            )
+
+        return self._session
+
+    def _get_timeout(self, timeout: float | None) -> Dict[str, Any]:
+        # Passing timeout=None to aiohttp disables the timeout altogether,
+        # so it's left out to fall back to the session's one
+        if timeout is None:
+            return {}
+
+        aiohttp = import_aiohttp()
+
+        return {'timeout': aiohttp.ClientTimeout(total=timeout)}
+
+    @contextlib.contextmanager
+    def _use_connection(self):
+        metrics = get_metrics()
+        self._in_use += 1
+        metrics.set_pool_usage(self._in_use, self._pool_limit)
+
+        try:
+            yield
+        finally:
+            self._in_use -= 1
+            metrics.set_pool_usage(self._in_use, self._pool_limit)
+
+    async def _read_json(self, response: 'aiohttp.ClientResponse') -> Any:
+        try:
+            return loads(await response.read())
+        except ValueError:
+            return None
+
+    async def request(
+        self,
+        url: str,
+        headers: Dict[str, str],
+        message: Dict[str, Any] | bytes,
+        timeout: float | None = None,
+    ) -> Tuple[int, Any]:
+        """
+        Posts a message to the Whatsapp Cloud Api
+        Args:
+            url (str): Endpoint url.
+            headers (dict[str]): Request headers.
+            message (dict[str] or bytes): Message payload, or its json
+                encoded body.
+            timeout (float or none): Timeout overriding the sender's one.
+        Returns:
+            tuple: The response status and decoded body, or None if the body
+                isn't json.
+        """
+        session = self._get_session()
+
+        if isinstance(message, bytes):
+            body = {'data': message}
+            headers = {**headers, 'Content-Type': 'application/json'}
+        else:
+            body = {'json': message}
+
+        with self._use_connection():
+            async with session.post(
+                url,
+                headers=headers,
+                **self._get_timeout(timeout),
+                **body,
+            ) as response:
+                return response.status, await self._read_json(response)
+
+    async def get(
+        self,
+        url: str,
+        headers: Dict[str, str],
+        timeout: float | None = None,
+    ) -> Tuple[int, Any]:
+        """
+        Gets a Graph Api object, like the url of a media
+        Args:
+            url (str): Object url.
+            headers (dict[str]): Request headers.
+            timeout (float or none): Timeout overriding the sender's one.
+        Returns:
+            tuple: The response status and decoded body, or None if the body
+                isn't json.
+        """
+        with self._use_connection():
+            async with self._get_session().get(
+                url,
+                headers=headers,
+                **self._get_timeout(timeout),
+            ) as response:
+                return response.status, await self._read_json(response)
+
+    async def upload(
+        self,
+        url: str,
+        headers: Dict[str, str],
+        form: 'aiohttp.FormData',
+        timeout: float | None = None,
+    ) -> Tuple[int, Any]:
+        """
+        Posts a multipart form, streaming the files in it
+        Args:
+            url (str): Endpoint url.
+            headers (dict[str]): Request headers.
+            form (aiohttp.FormData): Form to post.
+            timeout (float or none): Timeout overriding the sender's one.
+        Returns:
+            tuple: The response status and decoded body, or None if the body
+                isn't json.
+        """
+        with self._use_connection():
+            async with self._get_session().post(
+                url,
+                headers=headers,
+                data=form,
+                **self._get_timeout(timeout),
+            ) as response:
+                return response.status, await self._read_json(response)
+
+    async def download(
+        self,
+        url: str,
+        headers: Dict[str, str],
+        handler: Callable[[bytes], Awaitable[Any]],
+        chunk_size: int = DEFAULT_DOWNLOAD_CHUNK_SIZE,
+        timeout: float | None = None,
+    ) -> int:
+        """
+        Downloads a file in chunks, without holding it in memory
+        Args:
+            url (str): File url.
+            headers (dict[str]): Request headers.
+            handler (callable): Awaited with each chunk of the file.
+            chunk_size (int): Maximum bytes of a chunk.
+            timeout (float or none): Timeout overriding the sender's one.
+        Returns:
+            int: The response status. Chunks are only handed over for
+                successful responses.
+        """
+        with self._use_connection():
+            async with self._get_session().get(
+                url,
+                headers=headers,
+                **self._get_timeout(timeout),
+            ) as response:
+                if response.status >= 400:
+                    return response.status
+
+                async for chunk in response.content.iter_chunked(chunk_size):
+                    await handler(chunk)
+
+                return response.status
+
+    async def post(
+        self,
+        url: str,
+        headers: Dict[str, str],
+        message: Dict[str, Any] | bytes,
+    ) -> Dict[str, Any]:
+        """
+        Posts a message to the Whatsapp Cloud Api
+        Args:
+            url (str): Endpoint url.
+            headers (dict[str]): Request headers.
+            message (dict[str] or bytes): Message payload, or its json
+                encoded body.
+        Returns:
+            dict[str]: The decoded api response.
+        """
+        _, body = await self.request(url, headers, message)
+
+        return body
+
+    async def close(self):
+        """
+        Closes every pooled connection
+        """
+        if not self.closed:
+            await self._session.close()
+
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
@@ -0,0 +1,164 @@
+from typing import Any, Dict
+
+import json
+
+try:
+    import orjson
+except ImportError:    # pragma: no cover
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:    # pragma: no cover
+    msgspec = None
+
+
+class JsonSerializer:
+    """
+    Json serializer based on the standard library
+    """
+    name = 'json'
+
+    def dumps(self, value: Any) -> bytes:
+        """
+        Encodes a value as compact json
+        Args:
+            value (any): Value to encode.
+        Returns:
+            bytes: The json encoded value.
+        """
+        return json.dumps(
+            value,
+            separators=(',', ':'),
+            ensure_ascii=False,
+        ).encode()
+
+    def loads(self, data: bytes | str) -> Any:
+        """
+        Decodes json
+        Args:
+            data (bytes or str): Json to decode.
+        Returns:
+            any: The decoded value.
+        Raises:
+            ValueError if the data isn't valid json
+        """
+        return json.loads(data)
+
+    def decode_webhook(self, data: bytes | str) -> Dict[str, Any]:
+        """
+        Decodes the body of a whatsapp hook call
+        Args:
+            data (bytes or str): Raw request body.
+        Returns:
+            dict[str]: The hook data.
+        Raises:
+            ValueError if the data isn't valid json
+        """
+        return self.loads(data)
+
+
+class OrjsonSerializer(JsonSerializer):
+    """
+    Json serializer based on orjson
+    """
+    name = 'orjson'
+
+    def dumps(self, value: Any) -> bytes:
+        return orjson.dumps(value)
+
+    def loads(self, data: bytes | str) -> Any:
+        return orjson.loads(data)
+
+
+class MsgspecSerializer(JsonSerializer):
+    """
+    Json serializer based on msgspec
+    """
+    name = 'msgspec'
+
+    def __init__(self):
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+
+    def dumps(self, value: Any) -> bytes:
+        return self._encoder.encode(value)
+
+    def loads(self, data: bytes | str) -> Any:
+        return self._decoder.decode(data)
+
+
+def get_default_serializer() -> JsonSerializer:
+    """
+    Gets the fastest serializer installed. Hook calls are decoded whole,
+    so the messages keep every field, and orjson decodes them faster than
+    msgspec does without a schema.
+    Returns:
+        JsonSerializer: orjson, msgspec or standard library serializer.
+    """
+    if orjson is not None:
+        return OrjsonSerializer()
+
+    if msgspec is not None:
+        return MsgspecSerializer()
+
+    return JsonSerializer()
+
+
+_serializer = get_default_serializer()
+
+
+def get_serializer() -> JsonSerializer:
+    """
+    Gets the serializer used by the connector
+    Returns:
+        JsonSerializer: The serializer.
+    """
+    return _serializer
+
+
+def set_serializer(serializer: JsonSerializer):
+    """
+    Replaces the serializer used by the connector
+    Args:
+        serializer (JsonSerializer): New serializer.
+    """
+    global _serializer    # pylint: disable=global-statement
+    _serializer = serializer
+
+
+def dumps(value: Any) -> bytes:
+    """
+    Encodes a value with the connector's serializer
+    Args:
+        value (any): Value to encode.
+    Returns:
+        bytes: The json encoded value.
+    """
+    return _serializer.dumps(value)
+
+
+def loads(data: bytes | str) -> Any:
+    """
+    Decodes json with the connector's serializer
+    Args:
+        data (bytes or str): Json to decode.
+    Returns:
+        any: The decoded value.
+    Raises:
+        ValueError if the data isn't valid json
+    """
+    return _serializer.loads(data)
+
+
+def decode_webhook(data: bytes | str) -> Dict[str, Any]:
+    """
+    Decodes the body of a hook call with the connector's serializer
+    Args:
+        data (bytes or str): Body of the hook call.
+    Returns:
+        dict[str]: The hook data.
+    Raises:
+        ValueError if the body isn't a json object
+    """
+    return _serializer.decode_webhook(data)
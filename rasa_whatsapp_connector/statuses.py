@@ -0,0 +1,318 @@
+from typing import Any, Dict, Iterator, List
+from dataclasses import dataclass
+
+import asyncio
+import collections
+import logging
+
+from rasa_whatsapp_connector.core import iter_whatsapp_hook_values
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_FLUSH_INTERVAL = 1
+DEFAULT_MAX_TRACKED_MESSAGES = 100000
+DEFAULT_MAX_TRACKED_RECIPIENTS = 10000
+
+
+@dataclass(slots=True)
+class HookClassification:
+    """
+    Number of messages, statuses and errors in a whatsapp hook call
+    """
+    messages: int = 0
+    statuses: int = 0
+    errors: int = 0
+
+
+@dataclass(slots=True)
+class StatusEvent:
+    """
+    Delivery status of a sent message, received from a whatsapp hook call
+    """
+    message_id: str | None
+    recipient_id: str | None
+    status: str | None
+    timestamp: int | None
+    phone_number_id: str | None = None
+    errors: List[Dict[str, Any]] | None = None
+
+
+def _count(items: Any) -> int:
+    return len(items) if isinstance(items, list) else 0
+
+
+def classify_whatsapp_hook(data: Dict[str, Any]) -> HookClassification:
+    """
+    Counts the messages, statuses and errors of a whatsapp hook call,
+    without raising for any kind of hook data
+    Args:
+        data(dict[str]): Whatsapp hook data.
+    Returns:
+        HookClassification: The counts.
+    """
+    classification = HookClassification()
+
+    # Values of the wrong type are skipped and lists of the wrong type
+    # count as empty
+    for value in iter_whatsapp_hook_values(data):
+        classification.messages += _count(value.get("messages"))
+        classification.statuses += _count(value.get("statuses"))
+        classification.errors += _count(value.get("errors"))
+
+    return classification
+
+
+def _get_timestamp(status: Dict[str, Any]) -> int | None:
+    try:
+        return int(status["timestamp"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def iter_statuses_from_whatsapp_hook(
+    data: Dict[str, Any],
+) -> Iterator[StatusEvent]:
+    """
+    Iterates over every status in a whatsapp hook call
+    Args:
+        data(dict[str]): Whatsapp hook data.
+    Yields:
+        StatusEvent: Each status in the hook data.
+    """
+    for value in iter_whatsapp_hook_values(data):
+        statuses = value.get("statuses")
+
+        if not statuses or not isinstance(statuses, list):
+            continue
+
+        metadata = value.get("metadata")
+        phone_number_id = None
+
+        if isinstance(metadata, dict):
+            phone_number_id = metadata.get("phone_number_id")
+
+        for status in statuses:
+            if not isinstance(status, dict):
+                continue
+
+            yield StatusEvent(
+                status.get("id"),
+                status.get("recipient_id"),
+                status.get("status"),
+                _get_timestamp(status),
+                phone_number_id,
+                status.get("errors"),
+            )
+
+
+class StatusSink:
+    """
+    Receives the statuses of sent messages, in batches
+    """
+    async def handle(self, events: List[StatusEvent]):
+        """
+        Handles a batch of statuses
+        Args:
+            events (list): Status events.
+        """
+        raise NotImplementedError()
+
+
+class BatchingStatusSink:
+    """
+    Collects statuses without waiting and hands them to a sink in batches,
+    once a batch is full or after a flush interval
+    """
+    def __init__(
+        self,
+        sink: StatusSink,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+    ):
+        """
+        Args:
+            sink (StatusSink): Sink receiving the batches.
+            batch_size (int): Maximum number of statuses in a batch.
+            flush_interval (float): Maximum seconds a status waits.
+        """
+        self._sink = sink
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._events: List[StatusEvent] = []
+        self._flush_task: asyncio.Task | None = None
+        # Batches being handled, referenced so they aren't garbage collected
+        self._tasks = set()
+
+    @property
+    def pending(self) -> int:
+        """
+        Number of statuses collected and not handed to the sink yet
+        """
+        return len(self._events)
+
+    def add(self, event: StatusEvent):
+        """
+        Adds a status to the current batch, must be called from a running
+        event loop
+        Args:
+            event (StatusEvent): Status event.
+        """
+        self._events.append(event)
+
+        if len(self._events) >= self._batch_size:
+            events, self._events = self._events, []
+            task = asyncio.create_task(self._handle(events))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self._flush_interval)
+        self._flush_task = None
+        await self.flush()
+
+    async def flush(self):
+        """
+        Hands the collected statuses to the sink
+        """
+        events, self._events = self._events, []
+
+        if events:
+            await self._handle(events)
+
+    async def close(self):
+        """
+        Hands the collected statuses to the sink and waits for every batch
+        being handled, for instance before the server stops
+        """
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+
+        await self.flush()
+        await asyncio.gather(*self._tasks)
+
+    async def _handle(self, events: List[StatusEvent]):
+        try:
+            await self._sink.handle(events)
+        except Exception:    # pylint: disable=broad-except
+            logger.exception("Failed to handle whatsapp statuses")
+
+
+class _Latency:
+    __slots__ = ('count', 'total', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, latency: int):
+        """
+        Adds the latency of a message
+        Args:
+            latency (int): Seconds it took.
+        """
+        self.count += 1
+        self.total += latency
+        self.max = max(self.max, latency)
+
+    def as_dict(self) -> Dict[str, float]:
+        """
+        Gets the aggregated latencies
+        Returns:
+            dict[str]: The count, average and maximum latency.
+        """
+        return {
+            'count': self.count,
+            'average': self.total / self.count if self.count else 0,
+            'max': self.max,
+        }
+
+
+class DeliveryLatencyAggregator(StatusSink):
+    """
+    Status sink aggregating, per recipient, the seconds between a message
+    being sent and it being delivered and read. The recipients with the
+    least recent deliveries are dropped past max_tracked_recipients.
+    """
+    def __init__(
+        self,
+        max_tracked_messages: int = DEFAULT_MAX_TRACKED_MESSAGES,
+        max_tracked_recipients: int = DEFAULT_MAX_TRACKED_RECIPIENTS,
+    ):
+        """
+        Args:
+            max_tracked_messages (int): Maximum number of sent messages
+                waiting for their delivery, the oldest ones are dropped.
+            max_tracked_recipients (int): Maximum number of recipients
+                whose latencies are kept.
+        """
+        self._max_tracked_messages = max_tracked_messages
+        self._max_tracked_recipients = max_tracked_recipients
+        self._sent_at = collections.OrderedDict()
+        self._latencies = collections.OrderedDict()
+
+    async def handle(self, events: List[StatusEvent]):
+        for event in events:
+            self.add(event)
+
+    def add(self, event: StatusEvent):
+        """
+        Aggregates a status
+        Args:
+            event (StatusEvent): Status event.
+        """
+        if event.message_id is None or event.timestamp is None:
+            return
+
+        if event.status == 'sent':
+            self._sent_at[event.message_id] = event.timestamp
+
+            if len(self._sent_at) > self._max_tracked_messages:
+                self._sent_at.popitem(last=False)
+
+            return
+
+        if event.status not in ('delivered', 'read'):
+            return
+
+        sent_at = self._sent_at.get(event.message_id)
+
+        if sent_at is None:
+            return
+
+        if event.status == 'read':
+            del self._sent_at[event.message_id]
+
+        latencies = self._latencies.get(event.recipient_id)
+
+        if latencies is None:
+            latencies = {}
+            self._latencies[event.recipient_id] = latencies
+
+            if len(self._latencies) > self._max_tracked_recipients:
+                self._latencies.popitem(last=False)
+        else:
+            self._latencies.move_to_end(event.recipient_id)
+
+        latency = latencies.setdefault(event.status, _Latency())
+        latency.add(event.timestamp - sent_at)
+
+    def get_stats(self, recipient_id: str) -> Dict[str, Dict[str, float]]:
+        """
+        Gets the delivery latencies of a recipient
+        Args:
+            recipient_id (str): Recipient.
+        Returns:
+            dict[str]: Count, average and maximum seconds until delivered
+                and until read.
+        """
+        latencies = self._latencies.get(recipient_id, {})
+
+        return {
+            status: latency.as_dict()
+            for status, latency in latencies.items()
+        }
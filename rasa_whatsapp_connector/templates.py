@@ -0,0 +1,180 @@
+from typing import Any, Dict, List, Mapping, Tuple
+
+import re
+
+from rasa_whatsapp_connector.serialization import dumps as _dumps
+
+DEFAULT_TEMPLATE_LANGUAGE = 'en_US'
+# Parameters are string values of the components made of a name between
+# double braces, like {{name}}
+PARAMETER_PATTERN = re.compile(r'^\{\{\s*(\w+)\s*\}\}$')
+_SLOT_MARKER = '\x00'
+
+
+def _get_slot(index: int) -> str:
+    return f'{_SLOT_MARKER}{index}{_SLOT_MARKER}'
+
+
+class MessageTemplate:
+    """
+    Approved message template, compiled once for every later send. The
+    components are encoded as json a single time, split at the recipient
+    and at each parameter, so a message only needs its values encoded and
+    spliced in, without walking or copying the component tree again.
+    """
+    __slots__ = (
+        'name',
+        'language',
+        'components',
+        'parameters',
+        '_tree',
+        '_slots',
+        '_fragments',
+    )
+
+    def __init__(
+        self,
+        name: str,
+        components: List[Dict[str, Any]] | None = None,
+        language: str = DEFAULT_TEMPLATE_LANGUAGE,
+    ):
+        """
+        Args:
+            name (str): Name of the approved template.
+            components (list or none): Header, body and button components,
+                as in the Cloud Api, with a {{name}} placeholder as the value
+                of every parameter bound on send.
+            language (str): Language code of the template.
+        """
+        self.name = name
+        self.language = language
+        self.components = components or []
+        # Name of the parameter bound at each slot, slot 0 is the recipient
+        self._slots: Dict[str, str | None] = {_get_slot(0): None}
+        self._tree = self._compile(self.components)
+        self.parameters: Tuple[str, ...] = tuple(
+            dict.fromkeys(name for name in self._slots.values() if name)
+        )
+        self._fragments = self._split(
+            _dumps(self._build_message(_get_slot(0), self._tree))
+        )
+
+    def _compile(self, value: Any) -> Any:
+        if isinstance(value, dict):
+            return {key: self._compile(item) for key, item in value.items()}
+
+        if isinstance(value, list):
+            return [self._compile(item) for item in value]
+
+        if isinstance(value, str):
+            match = PARAMETER_PATTERN.match(value)
+
+            if match is not None:
+                slot = _get_slot(len(self._slots))
+                self._slots[slot] = match.group(1)
+                return slot
+
+        return value
+
+    def _split(self, body: bytes) -> List[bytes]:
+        # Slots are encoded in the order they were compiled, since the tree
+        # keeps its order and the recipient comes first
+        fragments = []
+
+        for slot in self._slots:
+            fragment, found, body = body.partition(_dumps(slot))
+
+            if not found:
+                raise ValueError(f"Template {self.name} can't be compiled!")
+
+            fragments.append(fragment)
+
+        fragments.append(body)
+
+        return fragments
+
+    def _build_message(self, to: str, components: Any) -> Dict[str, Any]:
+        template = {'name': self.name, 'language': {'code': self.language}}
+
+        if components:
+            template['components'] = components
+
+        return {
+            'messaging_product': 'whatsapp',
+            'to': to,
+            'type': 'template',
+            'template': template,
+        }
+
+    def _get_values(
+        self,
+        to: str,
+        parameters: Mapping[str, Any] | None,
+    ) -> List[Any]:
+        parameters = parameters or {}
+
+        try:
+            return [to] + [
+                parameters[name] for name in self._slots.values() if name
+            ]
+        except KeyError as exc:
+            raise ValueError(
+                f"Template {self.name} is missing parameter {exc.args[0]}!"
+            ) from exc
+
+    def _bind(self, value: Any, values: Dict[str, Any]) -> Any:
+        if isinstance(value, dict):
+            return {key: self._bind(item, values) for key, item in value.items()}
+
+        if isinstance(value, list):
+            return [self._bind(item, values) for item in value]
+
+        if isinstance(value, str) and value in values:
+            return values[value]
+
+        return value
+
+    def build(
+        self,
+        to: str,
+        parameters: Mapping[str, Any] | None = None,
+    ) -> Dict[str, Any]:
+        """
+        Builds a message from the template
+        Args:
+            to (str): Message recipient.
+            parameters (mapping or none): Value of each parameter.
+        Returns:
+            dict[str]: The message.
+        Raises:
+            ValueError if a parameter is missing
+        """
+        values = dict(zip(self._slots, self._get_values(to, parameters)))
+
+        return self._build_message(to, self._bind(self._tree, values))
+
+    def encode(
+        self,
+        to: str,
+        parameters: Mapping[str, Any] | None = None,
+    ) -> bytes:
+        """
+        Encodes a message from the template as json
+        Args:
+            to (str): Message recipient.
+            parameters (mapping or none): Value of each parameter.
+        Returns:
+            bytes: The json encoded message.
+        Raises:
+            ValueError if a parameter is missing
+        """
+        parts = [self._fragments[0]]
+
+        for value, fragment in zip(
+            self._get_values(to, parameters),
+            self._fragments[1:],
+        ):
+            parts.append(_dumps(value))
+            parts.append(fragment)
+
+        return b''.join(parts)
@@ -0,0 +1,137 @@
+from typing import Any, Awaitable, Callable, Dict, Iterable, Mapping
+
+import logging
+
+from rasa_whatsapp_connector.dedup import MessageDeduplicator
+from rasa_whatsapp_connector.metrics import get_metrics
+from rasa_whatsapp_connector.models import InboundMessage
+from rasa_whatsapp_connector.serialization import decode_webhook
+from rasa_whatsapp_connector.signature import (
+    WebhookSignatureVerifier,
+    verify_subscription,
+)
+from rasa_whatsapp_connector.statuses import (
+    BatchingStatusSink,
+    classify_whatsapp_hook,
+    iter_statuses_from_whatsapp_hook,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookHandler:
+    """
+    Framework free handling of the webhook, shared by the rasa channel and
+    the ingress of split deployments. A hook call is checked against its
+    signature, decoded and classified. Its statuses go to the status sink,
+    and its new messages are dispatched, for instance queued or published
+    to a broker. The handler answers with the status code to reply with.
+    """
+    def __init__(
+        self,
+        iter_messages: Callable[[Dict[str, Any]], Iterable[InboundMessage]],
+        dispatch: Callable[[InboundMessage], Awaitable[bool]],
+        deduplicator: MessageDeduplicator,
+        verify_token: str | None,
+        app_secret: str | None = None,
+        status_sink: BatchingStatusSink | None = None,
+    ):
+        """
+        Args:
+            iter_messages (callable): Iterates over the messages of hook
+                data, skipping the ones that aren't handled.
+            dispatch (callable): Awaited with each new message, gives False
+                if there is no room for it.
+            deduplicator (MessageDeduplicator): Seen message ids.
+            verify_token (str or none): Token of the subscription handshake,
+                every handshake is refused if none.
+            app_secret (str or none): Secret of the Meta app, to verify the
+                signature of hook calls.
+            status_sink (BatchingStatusSink or none): Sink of the statuses
+                of sent messages.
+        """
+        self._iter_messages = iter_messages
+        self._dispatch = dispatch
+        self._deduplicator = deduplicator
+        self._verify_token = verify_token
+        self._signature_verifier = None
+        self._status_sink = status_sink
+
+        # Hook calls are only checked against their signature when the app
+        # secret is configured
+        if app_secret is not None:
+            self._signature_verifier = WebhookSignatureVerifier(app_secret)
+
+    def verify(self, args: Mapping[str, str]) -> str | None:
+        """
+        Answers the subscription handshake, see verify_subscription
+        Args:
+            args (mapping): Query arguments of the request.
+        Returns:
+            str or None: The challenge, or None to refuse the subscription.
+        """
+        return verify_subscription(args, self._verify_token)
+
+    async def handle_hook(self, body: bytes, signature: str | None) -> int:
+        """
+        Handles a hook call
+        Args:
+            body (bytes): Raw request body.
+            signature (str or none): Value of the signature header.
+        Returns:
+            int: Status code to answer the call with, 503 if a message
+                couldn't be dispatched so Meta delivers the call again later.
+        """
+        metrics = get_metrics()
+
+        if self._signature_verifier is not None and (
+            not self._signature_verifier.verify(body, signature)
+        ):
+            metrics.count_inbound('dropped', 'invalid_signature')
+            return 403
+
+        try:
+            data = decode_webhook(body)
+        except ValueError:
+            data = None
+
+        if not isinstance(data, dict):
+            metrics.count_inbound('dropped', 'invalid_body')
+            return 400
+
+        # Most hook calls only carry statuses, which are handled without
+        # going through the message pipeline.
+        classification = classify_whatsapp_hook(data)
+
+        if classification.statuses and self._status_sink is not None:
+            for event in iter_statuses_from_whatsapp_hook(data):
+                self._status_sink.add(event)
+
+        if classification.errors:
+            logger.warning("Received %d whatsapp errors", classification.errors)
+
+        if not classification.messages:
+            return 200
+
+        for message in self._iter_messages(data):
+            message_id = message.message_id
+
+            if (
+                message_id is not None
+                and await self._deduplicator.is_duplicate(message_id)
+            ):
+                metrics.count_inbound('duplicate')
+                continue
+
+            if not await self._dispatch(message):
+                # Meta redelivers the whole call when it isn't
+                # acknowledged, so the remaining messages aren't lost.
+                logger.warning("Whatsapp message queue is full")
+                metrics.count_inbound('dropped', 'queue_full')
+
+                if message_id is not None:
+                    await self._deduplicator.forget(message_id)
+
+                return 503
+
+        return 200
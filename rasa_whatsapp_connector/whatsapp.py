@@ -1,191 +1,892 @@
-from typing import List, Dict, Any
-
-import requests
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Tuple,
+)
+
+import asyncio
+import logging
+import os
+import uuid
+
+from rasa_whatsapp_connector.campaigns import TemplateSenderMixin
+# iter_whatsapp_hook_values is still importable from here
+from rasa_whatsapp_connector.core import (    # pylint: disable=unused-import
+    WhatsappMessageConverter,
+    iter_whatsapp_hook_values,
+)
+from rasa_whatsapp_connector.media import (
+    MediaUploadCache,
+    DEFAULT_CHUNK_SIZE,
+    get_content_hash,
+    get_file_hash,
+    get_mime_type,
+    is_media_link,
+    prepare_media_message,
+)
+from rasa_whatsapp_connector.metrics import get_metrics
+from rasa_whatsapp_connector.models import InboundMessage, OutboundMessage
+from rasa_whatsapp_connector.outbox import OutboxEntry, SqliteOutbox
+from rasa_whatsapp_connector.payload_cache import (
+    InteractiveTemplate,
+    DEFAULT_RESPONSE_CACHE_SIZE,
+    DEFAULT_TEMPLATE_CACHE_SIZE,
+)
+from rasa_whatsapp_connector.rate_limit import SendScheduler
+from rasa_whatsapp_connector.retry import (
+    CircuitBreaker,
+    GraphApiError,
+    RetryPolicy,
+    call_with_retry,
+    call_with_retry_async,
+    raise_for_graph_error,
+)
+from rasa_whatsapp_connector.sender import (
+    AsyncWhatsappSender,
+    SendResult,
+    import_aiohttp,
+    track_send,
+)
+from rasa_whatsapp_connector.serialization import dumps
+
+if TYPE_CHECKING:    # pragma: no cover
+    import requests
+
+logger = logging.getLogger(__name__)
 
 DEFAULT_WHATSAPP_API_TIMEOUT = 10
+DEFAULT_GRAPH_API_URL = 'https://graph.facebook.com'
 
 
-class RasaToWhatsappConverter:
+class RasaToWhatsappConverter(TemplateSenderMixin, WhatsappMessageConverter):
     """
     Converter class that takes in rasa's collector outputs,
-    converts them and sends them to the Whatsapp Cloud Api
+    converts them and sends them to the Whatsapp Cloud Api. Http clients
+    are imported on first use.
     """
     def __init__(
         self,
         phone_identifier: str,
         token: str,
         graphql_api_version: str = 'v18.0',
-        api_timeout: int = DEFAULT_WHATSAPP_API_TIMEOUT
+        api_timeout: int = DEFAULT_WHATSAPP_API_TIMEOUT,
+        async_sender: AsyncWhatsappSender | None = None,
+        scheduler: SendScheduler | None = None,
+        retry_policy: RetryPolicy | None = None,
+        circuit_breaker: CircuitBreaker | None = None,
+        template_cache_size: int = DEFAULT_TEMPLATE_CACHE_SIZE,
+        media_cache: MediaUploadCache | None = None,
+        graph_api_url: str = DEFAULT_GRAPH_API_URL,
+        outbox: SqliteOutbox | None = None,
+        response_cache_size: int = DEFAULT_RESPONSE_CACHE_SIZE,
     ):
-        self._phone_identifier = phone_identifier
+        super().__init__(
+            phone_identifier,
+            template_cache_size,
+            response_cache_size,
+        )
         self._token = token
         self._graphql_api_version = graphql_api_version
         self._api_timeout = api_timeout
+        self._async_sender = async_sender
+        self._scheduler = scheduler
+        self._retry_policy = retry_policy
+        self._circuit_breaker = circuit_breaker
+        self._graph_api_url = graph_api_url
+        self._media_cache = media_cache
+        self._outbox = outbox
+        # Blocking sends reuse the keep-alive connections of one session
+        self._session: 'requests.Session | None' = None
+
+        if self._media_cache is None:
+            self._media_cache = MediaUploadCache()
+
+        if self._async_sender is None:
+            self._async_sender = AsyncWhatsappSender(api_timeout)
+
+    def _get_session(self) -> 'requests.Session':
+        if self._session is None:
+            import requests    # pylint: disable=import-outside-toplevel
+
+            self._session = requests.Session()
+
+        return self._session
+
+    def _get_graph_url(self, path: str):
+        return f"{self._graph_api_url}/{self._graphql_api_version}/{path}"
+
+    def _get_messages_url(self):
+        return self._get_graph_url(f"{self._phone_identifier}/messages")
+
+    def _get_media_upload_url(self):
+        return self._get_graph_url(f"{self._phone_identifier}/media")
+
+    def _get_headers(self):
+        return {'Authorization': f'Bearer {self._token}'}
+
+    def _post_message(
+        self,
+        message: Dict[str, Any],
+        message_type: str = 'text',
+    ):
+        with track_send(message_type) as tracker:
+            status, response = self._request_message(message)
+            tracker.record(status, response)
+
+            return response
 
-    def _prepare_button_message(
+    async def _post_message_async(
+        self,
+        message: bytes,
+        message_type: str = 'text',
+    ):
+        with track_send(message_type) as tracker:
+            status, response = await self._request_message_async(message)
+            tracker.record(status, response)
+
+            return response
+
+    async def _send_body_async(
         self,
         to: str,
-        text: str,
-        buttons: List[Dict[str, Any]],
+        body: bytes,
+        message_type: str,
+        idempotency_key: str | None = None,
     ):
-        whatsapp_buttons = []
-
-        # WhatsApp only allows up to three buttons per call
-        for button in buttons[:3]:
-            # Title can only have up to 20 characters.
-            title = button['title'][0:20]
-            whatsapp_id = button['payload']
-
-            whatsapp_buttons.append(
-                {
-                    'type': 'reply',
-                    'reply': {
-                        'id': whatsapp_id,
-                        'title': title
-                    }
-                }
+        # With an outbox the message is synced to disk before waiting for
+        # its turn, and acked once the api has answered it
+        if self._outbox is None:
+            if self._scheduler is not None:
+                await self._scheduler.acquire(self._phone_identifier, to)
+
+            return await self._post_message_async(body, message_type)
+
+        entry = OutboxEntry(
+            idempotency_key or uuid.uuid4().hex,
+            self._phone_identifier,
+            to,
+            message_type,
+            body,
+        )
+
+        if not await self._outbox.add(entry):
+            logger.info("Skipped already sent message %s", entry.key)
+            return None
+
+        response = await self.send_outbox_entry(entry)
+        self._outbox.ack(entry.key)
+
+        return response
+
+    async def send_outbox_entry(self, entry: OutboxEntry):
+        """
+        Sends a message written to the outbox, for instance one replayed
+        after a restart. Errors the api won't recover from ack the entry,
+        any other error leaves it unacked, to be replayed on the next start.
+        Args:
+            entry (OutboxEntry): Outbox entry of this phone number.
+        Returns:
+            dict[str]: The api response.
+        Raises:
+            GraphApiError, CircuitOpenError or the aiohttp error if the
+            message can't be sent
+        """
+        if self._scheduler is not None:
+            await self._scheduler.acquire(self._phone_identifier, entry.to)
+
+        try:
+            return await self._post_message_async(
+                entry.body,
+                entry.message_type,
+            )
+        except GraphApiError as exc:
+            if not exc.retryable and self._outbox is not None:
+                self._outbox.ack(entry.key)
+
+            raise
+
+    def _request_message(self, message: Dict[str, Any]) -> Tuple[int, Any]:
+        # Returns the response status along with its body, which labels the
+        # send metrics even when errors aren't raised
+        import requests    # pylint: disable=import-outside-toplevel
+
+        if self._retry_policy is None:
+            response = self._get_session().post(
+                self._get_messages_url(),
+                headers=self._get_headers(),
+                json=message,
+                timeout=self._api_timeout,
+            )
+
+            return response.status_code, response.json()
+
+        def post(timeout: float):
+            response = self._get_session().post(
+                self._get_messages_url(),
+                headers=self._get_headers(),
+                json=message,
+                timeout=timeout,
+            )
+
+            try:
+                body = response.json()
+            except ValueError:
+                body = None
+
+            raise_for_graph_error(response.status_code, body)
+
+            return response.status_code, body
+
+        return call_with_retry(
+            post,
+            self._retry_policy,
+            self._circuit_breaker,
+            self._api_timeout,
+            (requests.ConnectionError, requests.Timeout),
+        )
+
+    async def _request_message_async(
+        self,
+        message: bytes,
+    ) -> Tuple[int, Any]:
+        aiohttp = import_aiohttp()
+
+        if self._retry_policy is None:
+            return await self._async_sender.request(
+                self._get_messages_url(),
+                self._get_headers(),
+                message,
+            )
+
+        async def post(timeout: float):
+            status, response = await self._async_sender.request(
+                self._get_messages_url(),
+                self._get_headers(),
+                message,
+                timeout,
             )
 
-        message = {
-            'messaging_product': 'whatsapp',
-            'to': to,
-            'type': 'interactive',
-            'interactive':
-                {
-                    'type': 'button',
-                    'body': {
-                        "text": text
-                    },
-                    'action': {
-                        'buttons': whatsapp_buttons
-                    }
-                }
-        }
-
-        return message
-
-    def _prepare_list_message(
+            raise_for_graph_error(status, response)
+
+            return status, response
+
+        return await call_with_retry_async(
+            post,
+            self._retry_policy,
+            self._circuit_breaker,
+            self._api_timeout,
+            (aiohttp.ClientConnectionError, asyncio.TimeoutError),
+        )
+
+    def send_message(
         self,
         to: str,
         text: str,
-        buttons: List[Dict[str, Any]],
-        list_name: str = "Select"
+        buttons: List[Dict[str, Any]] | None = None,
     ):
-        whatsapp_list = []
-
-        for button in buttons[:10]:
-            # Title can only have up to 24 characters.
-            title = button['title'][0:24]
-            whatsapp_id = button['payload']
-
-            whatsapp_list.append({
-                'id': whatsapp_id,
-                'title': title,
-            })
-
-        message = {
-            'messaging_product': 'whatsapp',
-            'to': to,
-            'type': 'interactive',
-            'interactive':
-                {
-                    'type': 'list',
-                    'body': {
-                        "text": text
-                    },
-                    'action':
-                        {
-                            'button':
-                                list_name,
-                            'sections':
-                                [{
-                                    'title': list_name,
-                                    'rows': whatsapp_list,
-                                }]
-                        }
-                }
-        }
-
-        return message
-
-    def _prepare_text_message(self, to: str, text: str):
-        message = {
-            'messaging_product': 'whatsapp',
-            'to': to,
-            'text': {
-                'body': text
-            }
-        }
-
-        return message
-
-    def prepare_message(
+        """
+        Sends a rasa message to Whatsapp Cloud Api
+        Args:
+            to (str): Message recipient.
+            text (str): Message text.
+            buttons (list or none): Optional list of buttons 
+        Raises:
+            GraphApiError, CircuitOpenError or the requests error if the
+            message can't be sent and a retry policy is set
+        """
+        message = self.prepare_message(to, text, buttons)
+
+        return self._post_message(message, self._get_message_type(buttons))
+
+    async def send_message_async(
         self,
         to: str,
         text: str,
         buttons: List[Dict[str, Any]] | None = None,
+        idempotency_key: str | None = None,
     ):
         """
-        Prepares a message compatible with Whatsapp Cloud Api
+        Sends a rasa message to Whatsapp Cloud Api without blocking the
+        event loop, reusing the converter's pooled connections
         Args:
             to (str): Message recipient.
             text (str): Message text.
             buttons (list or none): Optional list of buttons
+            idempotency_key (str or none): Key of the message in the
+                outbox, a message is only sent once per key.
+        Returns:
+            dict[str] or None: The api response, or None if a message with
+                the same idempotency key was already sent.
+        Raises:
+            GraphApiError, CircuitOpenError or the aiohttp error if the
+            message can't be sent and a retry policy is set
         """
-        if buttons is not None:
-            if len(buttons) <= 3:
-                message = self._prepare_button_message(to, text, buttons)
-            else:
-                message = self._prepare_list_message(to, text, buttons)
+        body = self.prepare_message_body(to, text, buttons)
+
+        return await self._send_body_async(
+            to,
+            body,
+            self._get_message_type(buttons),
+            idempotency_key,
+        )
+
+    def _get_media_upload(
+        self,
+        media: str | bytes,
+        mime_type: str | None,
+        filename: str | None,
+    ):
+        if isinstance(media, bytes):
+            return filename or 'media', mime_type or get_mime_type(
+                filename or ''
+            )
+
+        return (
+            filename or os.path.basename(media),
+            mime_type or get_mime_type(media),
+        )
+
+    def upload_media(
+        self,
+        media: str | bytes,
+        mime_type: str | None = None,
+        filename: str | None = None,
+    ) -> str:
+        """
+        Uploads a media to Whatsapp Cloud Api, once per content
+        Args:
+            media (str or bytes): Path of the media file, or its content.
+            mime_type (str or none): Mime type, guessed from the filename
+                if not given.
+            filename (str or none): Filename sent along with the content.
+        Returns:
+            str: The media id, taken from the upload cache if the same
+                content was already uploaded.
+        Raises:
+            GraphApiError if the media can't be uploaded
+        """
+        if isinstance(media, bytes):
+            content_hash = get_content_hash(media)
         else:
-            message = self._prepare_text_message(to, text)
+            content_hash = get_file_hash(media)
 
-        return message
+        media_id = self._media_cache.get(content_hash)
 
-    def send_message(
+        if media_id is not None:
+            return media_id
+
+        filename, mime_type = self._get_media_upload(media, mime_type, filename)
+
+        if isinstance(media, bytes):
+            response = self._post_media(media, mime_type, filename)
+        else:
+            with open(media, 'rb') as media_file:
+                response = self._post_media(media_file, mime_type, filename)
+
+        media_id = response['id']
+        self._media_cache.set(content_hash, media_id)
+
+        return media_id
+
+    def _post_media(self, content, mime_type: str, filename: str):
+        response = self._get_session().post(
+            self._get_media_upload_url(),
+            headers=self._get_headers(),
+            data={
+                'messaging_product': 'whatsapp',
+                'type': mime_type,
+            },
+            files={'file': (filename, content, mime_type)},
+            timeout=self._api_timeout,
+        )
+
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+
+        raise_for_graph_error(response.status_code, body)
+
+        return body
+
+    async def upload_media_async(
+        self,
+        media: str | bytes,
+        mime_type: str | None = None,
+        filename: str | None = None,
+    ) -> str:
+        """
+        Uploads a media to Whatsapp Cloud Api, once per content, without
+        blocking the event loop. Files are hashed in a thread and streamed
+        to the api in chunks.
+        Args:
+            media (str or bytes): Path of the media file, or its content.
+            mime_type (str or none): Mime type, guessed from the filename
+                if not given.
+            filename (str or none): Filename sent along with the content.
+        Returns:
+            str: The media id, taken from the upload cache if the same
+                content was already uploaded.
+        Raises:
+            GraphApiError if the media can't be uploaded
+        """
+        if isinstance(media, bytes):
+            content_hash = get_content_hash(media)
+        else:
+            content_hash = await asyncio.to_thread(get_file_hash, media)
+
+        media_id = self._media_cache.get(content_hash)
+
+        if media_id is not None:
+            return media_id
+
+        aiohttp = import_aiohttp()
+
+        filename, mime_type = self._get_media_upload(media, mime_type, filename)
+        form = aiohttp.FormData()
+        form.add_field('messaging_product', 'whatsapp')
+        form.add_field('type', mime_type)
+
+        if isinstance(media, bytes):
+            form.add_field(
+                'file',
+                media,
+                filename=filename,
+                content_type=mime_type,
+            )
+            status, response = await self._async_sender.upload(
+                self._get_media_upload_url(),
+                self._get_headers(),
+                form,
+            )
+        else:
+            with open(media, 'rb') as media_file:
+                form.add_field(
+                    'file',
+                    media_file,
+                    filename=filename,
+                    content_type=mime_type,
+                )
+                status, response = await self._async_sender.upload(
+                    self._get_media_upload_url(),
+                    self._get_headers(),
+                    form,
+                )
+
+        raise_for_graph_error(status, response)
+
+        media_id = response['id']
+        self._media_cache.set(content_hash, media_id)
+
+        return media_id
+
+    def _get_media_object(self, media: str | bytes) -> Dict[str, Any]:
+        if isinstance(media, str) and is_media_link(media):
+            return {'link': media}
+
+        return {'id': self.upload_media(media)}
+
+    async def _get_media_object_async(
+        self,
+        media: str | bytes,
+    ) -> Dict[str, Any]:
+        if isinstance(media, str) and is_media_link(media):
+            return {'link': media}
+
+        return {'id': await self.upload_media_async(media)}
+
+    def send_media(
         self,
         to: str,
-        text: str,
-        buttons: List[Dict[str, Any]] | None = None,
+        media_type: str,
+        media: str | bytes,
+        caption: str | None = None,
+        filename: str | None = None,
     ):
         """
-        Sends a rasa message to Whatsapp Cloud Api
+        Sends a media message to Whatsapp Cloud Api. Links are fetched by
+        the api itself, local files and contents are uploaded once.
         Args:
             to (str): Message recipient.
-            text (str): Message text.
-            buttons (list or none): Optional list of buttons 
+            media_type (str): Image, audio, document, video or sticker.
+            media (str or bytes): Media url, path or content.
+            caption (str or none): Optional caption.
+            filename (str or none): Optional filename of a document.
+        Raises:
+            GraphApiError if the media can't be uploaded
         """
-        url = f"""
-            https://graph.facebook.com/{self._graphql_api_version}{self._phone_identifier}/messages
-        """.strip()
-        headers = {'Authorization': f'Bearer {self._token}'}
+        message = prepare_media_message(
+            to,
+            media_type,
+            self._get_media_object(media),
+            caption,
+            filename,
+        )
 
-        message = self.prepare_message(to, text, buttons)
+        return self._post_message(message, media_type)
 
-        response = requests.post(
-            url,
-            headers=headers,
-            json=message,
-            timeout=self._api_timeout,
+    async def send_media_async(
+        self,
+        to: str,
+        media_type: str,
+        media: str | bytes,
+        caption: str | None = None,
+        filename: str | None = None,
+        idempotency_key: str | None = None,
+    ):
+        """
+        Sends a media message to Whatsapp Cloud Api without blocking the
+        event loop, see send_media
+        Args:
+            to (str): Message recipient.
+            media_type (str): Image, audio, document, video or sticker.
+            media (str or bytes): Media url, path or content.
+            caption (str or none): Optional caption.
+            filename (str or none): Optional filename of a document.
+            idempotency_key (str or none): Key of the message in the
+                outbox, see send_message_async.
+        Raises:
+            GraphApiError if the media can't be uploaded
+        """
+        message = prepare_media_message(
+            to,
+            media_type,
+            await self._get_media_object_async(media),
+            caption,
+            filename,
         )
 
-        return response.json()
+        return await self._send_body_async(
+            to,
+            dumps(message),
+            media_type,
+            idempotency_key,
+        )
 
-    def _get_value(self, data):
-        if "entry" not in data or len(data["entry"]) == 0:
-            raise ValueError("Provided data is invalid!")
+    async def get_media(self, media_id: str) -> Dict[str, Any]:
+        """
+        Gets the download url of a received media
+        Args:
+            media_id (str): Media id of the hook message.
+        Returns:
+            dict[str]: The media url, mime type, sha256 and file size.
+        Raises:
+            GraphApiError if the media can't be found
+        """
+        status, response = await self._async_sender.get(
+            self._get_graph_url(media_id),
+            self._get_headers(),
+        )
 
-        entry = data["entry"][0]
+        raise_for_graph_error(status, response)
 
-        if "changes" not in entry or len(entry["changes"]) == 0:
-            raise ValueError("Provided data is invalid!")
+        return response
 
-        change = entry["changes"][0]
+    async def download_media(
+        self,
+        media_id: str,
+        handler: Callable[[bytes], Awaitable[Any]],
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> Dict[str, Any]:
+        """
+        Downloads a received media in chunks, without holding it in memory
+        Args:
+            media_id (str): Media id of the hook message.
+            handler (callable): Awaited with each chunk of the media.
+            chunk_size (int): Maximum bytes of a chunk.
+        Returns:
+            dict[str]: The media url, mime type, sha256 and file size.
+        Raises:
+            GraphApiError if the media can't be downloaded
+        """
+        media = await self.get_media(media_id)
+        status = await self._async_sender.download(
+            media['url'],
+            self._get_headers(),
+            handler,
+            chunk_size,
+        )
+
+        raise_for_graph_error(status, None)
+
+        return media
+
+    async def download_media_to_file(
+        self,
+        media_id: str,
+        path: str,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> Dict[str, Any]:
+        """
+        Downloads a received media to a file, chunk by chunk. The file is
+        removed if the download fails.
+        Args:
+            media_id (str): Media id of the hook message.
+            path (str): Path of the file.
+            chunk_size (int): Maximum bytes of a chunk.
+        Returns:
+            dict[str]: The media url, mime type, sha256 and file size.
+        Raises:
+            GraphApiError if the media can't be downloaded
+        """
+        with open(path, 'wb') as media_file:
+
+            async def write(chunk: bytes):
+                media_file.write(chunk)
+
+            try:
+                return await self.download_media(media_id, write, chunk_size)
+            except BaseException:
+                media_file.close()
+                os.remove(path)
+                raise
 
-        if "value" not in change:
-            raise ValueError("Provided data is invalid!")
+    def _prepare_outbound_message(
+        self,
+        message: OutboundMessage,
+    ) -> Dict[str, Any]:
+        outbound_media = self._get_outbound_media(message)
+
+        if outbound_media is None:
+            return self.prepare_message(
+                message.to,
+                message.text,
+                message.buttons,
+            )
 
-        return change["value"]
+        media_type, media = outbound_media
+
+        return prepare_media_message(
+            message.to,
+            media_type,
+            self._get_media_object(media),
+            message.text,
+        )
+
+    def send_messages(
+        self,
+        to: str,
+        responses: List[Dict[str, Any]],
+        stop_on_error: bool = True,
+    ) -> List[SendResult]:
+        """
+        Sends the rasa responses of a turn to Whatsapp Cloud Api, in order
+        Args:
+            to (str): Message recipient.
+            responses (list): Rasa response dicts with text and buttons.
+            stop_on_error (bool): Whether to skip the messages following a
+                failed one, so the recipient doesn't get them out of context.
+        Returns:
+            list: A SendResult for each response. Responses with an image
+                or attachment are sent as a media message with the text as
+                caption.
+        """
+        messages = self._get_outbound_messages(to, responses)
+        results = []
+
+        for message in messages:
+            if stop_on_error and results and not results[-1].ok:
+                results.append(SendResult(skipped=True))
+                continue
+
+            try:
+                response = self._post_message(
+                    self._prepare_outbound_message(message),
+                    self._get_outbound_type(message),
+                )
+                # Without a retry policy error responses are returned as is
+                raise_for_graph_error(200, response)
+                results.append(SendResult(response))
+            except Exception as exc:    # pylint: disable=broad-except
+                results.append(SendResult(error=exc))
+
+        return results
+
+    async def send_messages_async(
+        self,
+        to: str,
+        responses: List[Dict[str, Any]],
+        stop_on_error: bool = True,
+        idempotency_key: str | None = None,
+    ) -> List[SendResult]:
+        """
+        Sends the rasa responses of a turn to Whatsapp Cloud Api, in order,
+        without blocking the event loop. Every payload is prepared up front
+        and the messages go back to back over the same pooled connection.
+        They aren't sent concurrently since the api doesn't guarantee the
+        delivery order of concurrent requests.
+        Args:
+            to (str): Message recipient.
+            responses (list): Rasa response dicts with text and buttons.
+            stop_on_error (bool): Whether to skip the messages following a
+                failed one, so the recipient doesn't get them out of context.
+            idempotency_key (str or none): Key of the turn in the outbox,
+                each response is keyed by it and its position.
+        Returns:
+            list: A SendResult for each response. Responses with an image
+                or attachment are sent as a media message with the text as
+                caption.
+        """
+        messages = self._get_outbound_messages(to, responses)
+        # Media messages are prepared when their turn comes, so a failed
+        # upload doesn't hold back the messages before it.
+        bodies = [
+            self.prepare_message_body(
+                message.to,
+                message.text,
+                message.buttons,
+            ) if self._get_outbound_media(message) is None else None
+            for message in messages
+        ]
+        results = []
+
+        for index, (message, body) in enumerate(zip(messages, bodies)):
+            if stop_on_error and results and not results[-1].ok:
+                results.append(SendResult(skipped=True))
+                continue
+
+            try:
+                if body is None:
+                    media_type, media = self._get_outbound_media(message)
+                    body = dumps(
+                        prepare_media_message(
+                            message.to,
+                            media_type,
+                            await self._get_media_object_async(media),
+                            message.text,
+                        )
+                    )
+
+                response = await self._send_body_async(
+                    to,
+                    body,
+                    self._get_outbound_type(message),
+                    idempotency_key and f"{idempotency_key}:{index}",
+                )
+                raise_for_graph_error(200, response)
+                results.append(SendResult(response))
+            except Exception as exc:    # pylint: disable=broad-except
+                results.append(SendResult(error=exc))
+
+        return results
+
+    def is_continuation(self, message: InboundMessage) -> bool:
+        """
+        Checks whether a received message asks for the next page of a list
+        that is still cached. Pages are only kept in this process, so after
+        an eviction or a restart, or on another worker, the reply goes to
+        rasa like any other message.
+        Args:
+            message (InboundMessage): Received message.
+        Returns:
+            bool: Whether the message replied a "More…" row of a known list.
+        """
+        if not super().is_continuation(message):
+            return False
+
+        if self._menus.get_continuation(message.payload) is None:
+            logger.warning(
+                "Forwarding reply to an unknown list page %s to rasa",
+                message.payload,
+            )
+            return False
+
+        return True
+
+    def _get_continuation_page(
+        self,
+        message: InboundMessage | Dict[str, Any],
+    ) -> InteractiveTemplate | None:
+        if isinstance(message, InboundMessage):
+            payload = message.payload
+        else:
+            # Rasa messages of list replies have the row id as text
+            payload = message.get('text')
+
+        page = self._menus.get_continuation(payload)
+
+        if page is None:
+            logger.warning("Dropped reply to an unknown list page %s", payload)
+
+        return page
+
+    def _get_continuation_recipient(
+        self,
+        message: InboundMessage | Dict[str, Any],
+    ) -> str:
+        if isinstance(message, InboundMessage):
+            return message.sender_id
+
+        return message['sender_id']
+
+    def send_continuation(self, message: InboundMessage | Dict[str, Any]):
+        """
+        Sends the list page a "More…" reply asks for
+        Args:
+            message (InboundMessage or dict[str]): Received continuation
+                message, or the rasa message flagged as a continuation by
+                get_message_from_whatsapp_hook.
+        Returns:
+            dict[str] or None: The api response, or None if the list is no
+                longer known.
+        """
+        page = self._get_continuation_page(message)
+
+        if page is None:
+            return None
+
+        return self._post_message(
+            page.build(
+                self._get_continuation_recipient(message),
+                self._menus.more_text,
+            ),
+            'list',
+        )
+
+    async def send_continuation_async(
+        self,
+        message: InboundMessage | Dict[str, Any],
+    ):
+        """
+        Sends the list page a "More…" reply asks for without blocking the
+        event loop
+        Args:
+            message (InboundMessage or dict[str]): Received continuation
+                message, or the rasa message flagged as a continuation by
+                get_message_from_whatsapp_hook.
+        Returns:
+            dict[str] or None: The api response, or None if the list is no
+                longer known.
+        """
+        page = self._get_continuation_page(message)
+
+        if page is None:
+            return None
+
+        to = self._get_continuation_recipient(message)
+
+        if self._scheduler is not None:
+            await self._scheduler.acquire(self._phone_identifier, to)
+
+        return await self._post_message_async(
+            page.encode(to, self._menus.more_text),
+            'list',
+        )
+
+    async def close(self):
+        """
+        Closes the pooled connections used by send_message_async and by
+        the blocking sends
+        """
+        await self._async_sender.close()
+
+        if self._session is not None:
+            self._session.close()
+            self._session = None
 
     def get_message_from_whatsapp_hook(self, data):
         """
@@ -193,37 +894,50 @@ class RasaToWhatsappConverter:
         Args:
             data(dict[str]): Whatsapp hook data.
         Returns:
-            dict[str] or None: The message in the hook data or None.
+            dict[str] or None: The message in the hook data or None. Replies
+                to a "More…" row of a cached list have a true continuation
+                key, they should be answered with send_continuation instead
+                of going to rasa.
         Raises:
             ValueError if the hook data is invalid
         """
         value = self._get_value(data)
 
-        if "messages" not in value or len(value["messages"]) == 0:
+        if (
+            not isinstance(value.get("messages"), list)
+            or len(value["messages"]) == 0
+        ):
             raise ValueError("Provided value is invalid")
 
-        message = value["messages"][0]
-
         try:
-            sender_id = message["from"]
-            text = None
-
-            if message["type"] == "text":
-                text = message["text"]["body"]
-            elif (
-                message["type"] == "interactive"
-                and message['interactive']['type'] == 'button_reply'
-            ):
-                text = message['interactive']['button_reply']['id']
-            elif (
-                message["type"] == "interactive"
-                and message['interactive']['type'] == 'list_reply'
-            ):
-                text = message['interactive']['list_reply']['id']
-        except KeyError as exc:
-            raise ValueError("Provided data is invalid!") from exc
-
-        if text is None:
-            raise ValueError("Provided data is invalid!")
-
-        return {"sender_id": sender_id, "text": text, "metadata": {}}
+            message = self._convert_message(value["messages"][0])
+        except ValueError:
+            get_metrics().count_inbound('dropped', 'invalid')
+            raise
+
+        get_metrics().count_inbound('parsed')
+
+        return self._to_rasa_message(message)
+
+    def iter_messages_from_whatsapp_hook(self, data):
+        """
+        Iterates over every rasa message in a whatsapp hook call, see
+        iter_inbound_messages_from_whatsapp_hook. Replies to a "More…" list
+        row have a true continuation key, see get_message_from_whatsapp_hook.
+        Args:
+            data(dict[str]): Whatsapp hook data.
+        Yields:
+            dict[str]: Each rasa message in the hook data.
+        """
+        for message in self.iter_inbound_messages_from_whatsapp_hook(data):
+            yield self._to_rasa_message(message)
+
+    def _to_rasa_message(self, message: InboundMessage) -> Dict[str, Any]:
+        # Parsing has no side effects, continuations are only flagged so
+        # the caller can answer them the way it sends, blocking or not
+        rasa_message = message.to_rasa_message()
+
+        if self.is_continuation(message):
+            rasa_message['continuation'] = True
+
+        return rasa_message
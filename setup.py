@@ -1,9 +1,28 @@
 from setuptools import setup, find_packages
 
+# Blocking sends need requests, the asynchronous http client and the rasa
+# channel are installed through extras
 install_requires = [
+    'requests==2.31.0',
+]
+http_requires = [
+    'aiohttp>=3.6,!=3.7.4.post0,<3.9',
+]
+rasa_packages = [
     'rasa==3.6.16',
     'rasa-sdk==3.6.2',
-    'requests==2.31.0',
+]
+rasa_requires = [
+    *rasa_packages,
+    *http_requires,
+]
+# Rasa 3.6 only supports python < 3.11, the channel tests are skipped on
+# newer versions
+channel_test_requires = [
+    f'{requirement}; python_version < "3.11"' for requirement in [
+        *rasa_packages,
+        'sanic-testing>=22.3,<22.9',
+    ]
 ]
 
 setup(
@@ -11,7 +30,22 @@ setup(
     version='0.0.1',
     install_requires=install_requires,
     extras_require={
-        'test': ['mock==5.1.0', ],
+        'http': http_requires,
+        'rasa': rasa_requires,
+        'test':
+            [
+                'mock==5.1.0',
+                'prometheus-client>=0.16',
+                'opentelemetry-sdk>=1.20',
+                *http_requires,
+                *channel_test_requires,
+            ],
+        'fast': [
+            'orjson>=3.8',
+            'msgspec>=0.18',
+        ],
+        'prometheus': ['prometheus-client>=0.16', ],
+        'opentelemetry': ['opentelemetry-api>=1.20', ],
     },
-    packages=find_packages(),
+    packages=find_packages(exclude=('tests*', 'benchmarks*')),
 )
@@ -0,0 +1,59 @@
+from rasa_whatsapp_connector.statuses import StatusSink
+
+# Hook calls whose entries, changes or values have the wrong types
+MALFORMED_HOOKS = (
+    {
+        "entry": 5
+    },
+    {
+        "entry": [5]
+    },
+    {
+        "entry": [{
+            "changes": [{
+                "value": 5
+            }]
+        }]
+    },
+    {
+        "entry": [{
+            "changes": [{
+                "value": {
+                    "messages": 3
+                }
+            }]
+        }]
+    },
+)
+
+
+class ListStatusSink(StatusSink):
+    """
+    Status sink keeping the batches it handles, for the tests to check
+    """
+    def __init__(self):
+        self.batches = []
+
+    @property
+    def events(self):
+        """
+        Events of all the handled batches, in order
+        """
+        return [event for batch in self.batches for event in batch]
+
+    async def handle(self, events):
+        self.batches.append(list(events))
+
+
+def get_sent_response(message_id: str = 'wamid.1'):
+    """
+    Gets the status and body the Graph Api answers a sent message with
+    """
+    return 200, {'messages': [{'id': message_id}]}
+
+
+def get_error_response(code: int, status: int = 400):
+    """
+    Gets the status and body the Graph Api answers an error with
+    """
+    return status, {'error': {'code': code}}
@@ -0,0 +1,77 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from benchmarks.__main__ import main, MISSING_BASELINE_EXIT_CODE
+from benchmarks.runner import BenchmarkResult, find_regressions, measure
+
+
+class TestBenchmarkRunner(unittest.TestCase):
+    """
+    Tests the benchmark runner
+    """
+    def test_measure(self):
+        """
+        Tests measuring a case
+        """
+        result = measure('sum', lambda: sum(range(10)), 100, 2, warmup=0)
+
+        self.assertEqual(result.name, 'sum')
+        self.assertEqual(result.messages, 200)
+        self.assertGreater(result.messages_per_second, 0)
+        self.assertLessEqual(result.p50, result.p99)
+
+    def test_find_regressions(self):
+        """
+        Tests comparing results with a baseline
+        """
+        baseline = {
+            'case': {
+                'messages_per_second': 1000,
+                'allocated_bytes': 1000,
+            },
+        }
+
+        def get_result(messages_per_second, allocated_bytes):
+            return BenchmarkResult(
+                'case',
+                1,
+                messages_per_second,
+                1,
+                1,
+                allocated_bytes,
+            )
+
+        self.assertEqual(
+            find_regressions([get_result(850, 1100)], baseline, 0.2),
+            [],
+        )
+        self.assertEqual(
+            len(find_regressions([get_result(700, 1000)], baseline, 0.2)),
+            1,
+        )
+        self.assertEqual(
+            len(find_regressions([get_result(700, 1300)], baseline, 0.2)),
+            2,
+        )
+        # Cases missing from the baseline aren't compared
+        self.assertEqual(find_regressions([get_result(1, 1)], {}, 0.2), [])
+
+    def test_baseline(self):
+        """
+        Tests a missing baseline fails the comparison, and a saved one is
+        compared with
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'baseline.json')
+            argv = ['--iterations', '20', '--no-network', '--baseline', path]
+
+            with contextlib.redirect_stdout(io.StringIO()) as output:
+                self.assertEqual(main(argv), MISSING_BASELINE_EXIT_CODE)
+                self.assertEqual(main(argv + ['--save']), 0)
+                # Tolerant enough for the noise of so few iterations
+                self.assertEqual(main(argv + ['--tolerance', '1']), 0)
+
+        self.assertIn('prepare_body_list_uncached', output.getvalue())
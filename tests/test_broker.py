@@ -0,0 +1,284 @@
+# pylint: disable=protected-access
+import asyncio
+import multiprocessing
+import unittest
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from rasa_whatsapp_connector.broker import (
+    BrokerConsumer,
+    BrokerPublisher,
+    InMemoryBroker,
+    MultiprocessingBroker,
+    decode_message,
+    encode_message,
+    get_partition,
+)
+from rasa_whatsapp_connector.ingress import WebhookIngress
+from rasa_whatsapp_connector.loadtest.payloads import build_messages_hook
+from rasa_whatsapp_connector.models import InboundMessage
+from rasa_whatsapp_connector.serialization import dumps
+from rasa_whatsapp_connector.signature import WebhookSignatureVerifier
+
+
+def _get_message(sender_id: str, text: str) -> InboundMessage:
+    return InboundMessage(
+        sender_id,
+        text,
+        'text',
+        message_id=f'wamid.{sender_id}.{text}',
+        phone_number_id='987654321',
+    )
+
+
+def _consume_partition(broker: MultiprocessingBroker, partition, results):
+    # Worker process consuming a partition until it gets a stop message
+    async def consume():
+        while True:
+            message = decode_message(await broker.consume(partition))
+
+            if message.text == 'stop':
+                return
+
+            results.put((message.sender_id, message.text))
+
+    asyncio.run(consume())
+
+
+async def _append(items, item):
+    items.append(item)
+
+
+class TestBroker(unittest.IsolatedAsyncioTestCase):
+    """
+    Tests the brokers, publisher and consumer
+    """
+    def test_get_partition(self):
+        """
+        Tests senders are spread over partitions deterministically
+        """
+        partitions = {get_partition(f'sender{index}', 8) for index in range(64)}
+
+        self.assertEqual(partitions, set(range(8)))
+        self.assertEqual(
+            get_partition('sender1', 8), get_partition('sender1', 8)
+        )
+
+    def test_encode_message(self):
+        """
+        Tests messages are encoded without their raw hook message
+        """
+        message = _get_message('12345678', 'hi')
+        message.raw = {'id': message.message_id}
+
+        decoded = decode_message(encode_message(message))
+
+        self.assertEqual(decoded, message)
+        self.assertIsNone(decoded.raw)
+        self.assertRaises(ValueError, decode_message, b'{"text":"hi"}')
+
+    async def test_in_memory_broker(self):
+        """
+        Tests the messages of a sender are consumed in order
+        """
+        broker = InMemoryBroker(partitions=4, partition_size=100)
+        publisher = BrokerPublisher(broker)
+        received = []
+
+        async def handle(message: InboundMessage):
+            received.append((message.sender_id, message.text))
+
+        consumer = BrokerConsumer(broker, handle)
+        consumer.start()
+
+        for index in range(10):
+            for sender_id in ('a', 'b', 'c'):
+                await publisher.publish(_get_message(sender_id, str(index)))
+
+        await asyncio.sleep(0.05)
+        await consumer.stop()
+
+        for sender_id in ('a', 'b', 'c'):
+            self.assertEqual(
+                [text for sender, text in received if sender == sender_id],
+                [str(index) for index in range(10)],
+            )
+
+    async def test_in_memory_broker_full(self):
+        """
+        Tests publishing to a full partition fails without waiting
+        """
+        broker = InMemoryBroker(partitions=1, partition_size=1)
+
+        self.assertTrue(await broker.publish(0, b'1'))
+        self.assertFalse(await broker.publish(0, b'2'))
+
+    async def test_multiprocessing_broker(self):
+        """
+        Tests messages are consumed by a worker process
+        """
+        context = multiprocessing.get_context()
+        broker = MultiprocessingBroker(1, 100, context)
+        results = context.Queue()
+        worker = context.Process(
+            target=_consume_partition,
+            args=(broker, 0, results),
+        )
+        worker.start()
+        publisher = BrokerPublisher(broker)
+
+        for index in range(5):
+            await publisher.publish(_get_message('a', str(index)))
+
+        await publisher.publish(_get_message('a', 'stop'))
+        await asyncio.to_thread(worker.join, 10)
+
+        received = [results.get(timeout=1) for _ in range(5)]
+        await broker.close()
+
+        self.assertEqual(received, [('a', str(index)) for index in range(5)])
+
+    async def test_multiprocessing_broker_consumer(self):
+        """
+        Tests a consumer gets the messages in order from threads of the
+        broker's own pool, which is shut down once it stops
+        """
+        broker = MultiprocessingBroker(2, 100)
+        received = []
+        consumer = BrokerConsumer(
+            broker,
+            lambda message: _append(received, message.text),
+        )
+        publisher = BrokerPublisher(broker)
+        consumer.start()
+
+        for index in range(5):
+            await publisher.publish(_get_message('a', str(index)))
+
+        for _ in range(100):
+            if len(received) == 5:
+                break
+
+            await asyncio.sleep(0.01)
+
+        executor = broker._executor
+        await consumer.stop()
+
+        self.assertEqual(received, [str(index) for index in range(5)])
+        self.assertIsNotNone(executor)
+        self.assertIsNone(broker._executor)
+
+        await broker.close()
+
+
+class TestWebhookIngress(unittest.IsolatedAsyncioTestCase):
+    """
+    Tests the WebhookIngress class
+    """
+    async def asyncSetUp(self):
+        self._broker = InMemoryBroker(partitions=2, partition_size=2)
+        self._ingress = WebhookIngress(
+            self._broker,
+            'verify',
+            app_secret='app_secret',
+            phone_identifiers=['987654321'],
+        )
+        self._signer = WebhookSignatureVerifier('app_secret')
+
+    def _get_hook(self, *messages, phone_number_id: str = '987654321'):
+        return dumps(build_messages_hook(phone_number_id, messages, 100))
+
+    async def _consume(self):
+        messages = []
+
+        for partition in range(self._broker.partitions):
+            broker_queue = self._broker._get_queue(partition)
+
+            while not broker_queue.empty():
+                messages.append(decode_message(broker_queue.get_nowait()))
+
+        return messages
+
+    async def test_handle_hook(self):
+        """
+        Tests the messages of a signed hook call are published once
+        """
+        body = self._get_hook(
+            ('a', 'wamid.1', 'hi'),
+            ('b', 'wamid.2', 'hey'),
+        )
+        signature = self._signer.get_signature(body)
+
+        self.assertEqual(await self._ingress.handle_hook(body, signature), 200)
+        self.assertEqual(await self._ingress.handle_hook(body, signature), 200)
+
+        messages = await self._consume()
+
+        self.assertEqual(
+            sorted(message.message_id for message in messages),
+            ['wamid.1', 'wamid.2'],
+        )
+
+    async def test_handle_hook_rejected(self):
+        """
+        Tests forged, invalid and unknown hook calls aren't published
+        """
+        body = self._get_hook(('a', 'wamid.1', 'hi'))
+        unknown = self._get_hook(('a', 'wamid.2', 'hi'), phone_number_id='1')
+
+        self.assertEqual(
+            await self._ingress.handle_hook(body, 'sha256=00'), 403
+        )
+        self.assertEqual(
+            await self._ingress.handle_hook(
+                b'junk',
+                self._signer.get_signature(b'junk'),
+            ),
+            400,
+        )
+        self.assertEqual(
+            await self._ingress.handle_hook(
+                unknown,
+                self._signer.get_signature(unknown),
+            ),
+            200,
+        )
+        self.assertEqual(await self._consume(), [])
+
+    async def test_handle_hook_full(self):
+        """
+        Tests a call is refused when the broker is full, and accepted again
+        once redelivered
+        """
+        body = self._get_hook(
+            *(('a', f'wamid.{index}', str(index)) for index in range(3))
+        )
+        signature = self._signer.get_signature(body)
+
+        with self.assertLogs('rasa_whatsapp_connector.webhook', 'WARNING'):
+            self.assertEqual(
+                await self._ingress.handle_hook(body, signature),
+                503,
+            )
+
+        self.assertEqual(len(await self._consume()), 2)
+        self.assertEqual(await self._ingress.handle_hook(body, signature), 200)
+        self.assertEqual(len(await self._consume()), 1)
+
+    async def test_app(self):
+        """
+        Tests the subscription handshake and webhook of the application
+        """
+        async with TestClient(TestServer(self._ingress.create_app())) as client:
+            response = await client.get(
+                '/webhook',
+                params={
+                    'hub.mode': 'subscribe',
+                    'hub.verify_token': 'verify',
+                    'hub.challenge': '42',
+                },
+            )
+            self.assertEqual(await response.text(), '42')
+
+            response = await client.post('/webhook', data=b'{}')
+            self.assertEqual(response.status, 403)
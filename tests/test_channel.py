@@ -0,0 +1,340 @@
+# pylint: disable=protected-access,possibly-used-before-assignment
+import asyncio
+import importlib.util
+import unittest
+
+from mock import AsyncMock, patch
+
+from rasa_whatsapp_connector.loadtest.payloads import (
+    build_messages_hook,
+    build_statuses_hook,
+)
+from rasa_whatsapp_connector.serialization import dumps
+from rasa_whatsapp_connector.signature import (
+    SIGNATURE_HEADER,
+    WebhookSignatureVerifier,
+)
+from tests.helpers import ListStatusSink
+
+if importlib.util.find_spec('rasa') is not None:
+    from sanic import Sanic
+
+    # pylint: disable-next=ungrouped-imports
+    from rasa_whatsapp_connector.channel import WhatsappCloudInput
+
+PHONE_IDENTIFIER = '987654321'
+URL_PREFIX = '/webhooks/whatsapp_cloud'
+WEBHOOK_URL = f'{URL_PREFIX}/webhook'
+
+
+def _get_body(*messages) -> bytes:
+    return dumps(build_messages_hook(PHONE_IDENTIFIER, list(messages)))
+
+
+@unittest.skipUnless(
+    importlib.util.find_spec('rasa'),
+    'The rasa channel needs rasa installed',
+)
+class TestWhatsappCloudInput(unittest.IsolatedAsyncioTestCase):
+    """
+    Tests the webhook of the WhatsappCloudInput channel
+    """
+    def setUp(self):
+        self._on_new_message = AsyncMock()
+        self._channel = None
+
+    def _create_client(self, verify_token='verify_token', **kwargs):
+        self._channel = WhatsappCloudInput(
+            PHONE_IDENTIFIER,
+            'sample_token',
+            verify_token,
+            **kwargs,
+        )
+        app = Sanic(self._testMethodName)
+        # Mounted like rasa mounts the blueprints of its channels
+        app.blueprint(
+            self._channel.blueprint(self._on_new_message),
+            url_prefix=URL_PREFIX,
+        )
+
+        return app.asgi_client
+
+    async def _wait_for_messages(self, count: int):
+        # Messages are handed to rasa by background tasks
+        for _ in range(100):
+            if self._on_new_message.await_count >= count:
+                break
+
+            await asyncio.sleep(0.01)
+
+        return [
+            call.args[0].text for call in self._on_new_message.await_args_list
+        ]
+
+    async def test_verify(self):
+        """
+        Tests the subscription handshake
+        """
+        client = self._create_client()
+        args = {
+            'hub.mode': 'subscribe',
+            'hub.verify_token': 'verify_token',
+            'hub.challenge': '1158201444',
+        }
+
+        _, response = await client.get(WEBHOOK_URL, params=args)
+
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.text, '1158201444')
+
+        _, response = await client.get(
+            WEBHOOK_URL,
+            params={
+                **args, 'hub.verify_token': 'wrong'
+            },
+        )
+
+        self.assertEqual(response.status, 403)
+
+    async def test_verify_without_token(self):
+        """
+        Tests the handshake is refused when no verify token is configured
+        """
+        client = self._create_client(verify_token=None)
+
+        _, response = await client.get(
+            WEBHOOK_URL,
+            params={
+                'hub.mode': 'subscribe',
+                'hub.verify_token': 'verify_token',
+                'hub.challenge': '1158201444',
+            },
+        )
+
+        self.assertEqual(response.status, 403)
+
+    def test_numeric_phone_identifier(self):
+        """
+        Tests a phone number id given as a number, like yaml credentials
+        may hold it, still gets an output channel
+        """
+        channel = WhatsappCloudInput(
+            int(PHONE_IDENTIFIER),
+            'sample_token',
+            'verify_token',
+        )
+
+        self.assertIsNotNone(channel.get_output_channel())
+
+    def test_from_credentials(self):
+        """
+        Tests missing secrets are reported when the channel is created
+        """
+        credentials = {
+            'phone_identifier': PHONE_IDENTIFIER,
+            'token': 'sample_token',
+        }
+
+        with self.assertLogs('rasa_whatsapp_connector.channel') as logs:
+            WhatsappCloudInput.from_credentials(credentials)
+
+        self.assertEqual(len(logs.records), 2)
+        self.assertIn('verify_token', logs.records[0].getMessage())
+        self.assertIn('app_secret', logs.records[1].getMessage())
+
+        with patch('rasa_whatsapp_connector.channel.logger') as logger_mock:
+            WhatsappCloudInput.from_credentials(
+                {
+                    **credentials,
+                    'verify_token': 'verify_token',
+                    'app_secret': 'app_secret',
+                }
+            )
+
+        logger_mock.warning.assert_not_called()
+
+    async def test_signature(self):
+        """
+        Tests hook calls with an invalid signature are refused
+        """
+        client = self._create_client(app_secret='app_secret')
+        body = _get_body(('1', 'wamid.1', 'hello'))
+        signature = WebhookSignatureVerifier('app_secret').get_signature(body)
+
+        _, response = await client.post(
+            WEBHOOK_URL,
+            content=body,
+            headers={SIGNATURE_HEADER: 'sha256=00'},
+        )
+
+        self.assertEqual(response.status, 403)
+
+        _, response = await client.post(
+            WEBHOOK_URL,
+            content=body,
+            headers={SIGNATURE_HEADER: signature},
+        )
+
+        self.assertEqual(response.status, 200)
+        self.assertEqual(await self._wait_for_messages(1), ['hello'])
+
+    async def test_statuses(self):
+        """
+        Tests calls only carrying statuses go to the status sink, not rasa
+        """
+        status_sink = ListStatusSink()
+        client = self._create_client(status_sink=status_sink)
+        body = dumps(
+            build_statuses_hook(
+                PHONE_IDENTIFIER,
+                [('wamid.1', '1', 'delivered')],
+            )
+        )
+
+        _, response = await client.post(WEBHOOK_URL, content=body)
+
+        self.assertEqual(response.status, 200)
+
+        await self._channel._status_sink.close()
+
+        self.assertEqual([e.status for e in status_sink.events], ['delivered'])
+        self._on_new_message.assert_not_awaited()
+
+    async def test_duplicate(self):
+        """
+        Tests redelivered messages are handed to rasa once
+        """
+        client = self._create_client()
+        body = _get_body(('1', 'wamid.1', 'hello'))
+
+        # The last message of the sender is handled after the redelivery
+        for body in (body, body, _get_body(('1', 'wamid.2', 'bye'))):
+            _, response = await client.post(WEBHOOK_URL, content=body)
+            self.assertEqual(response.status, 200)
+
+        self.assertEqual(await self._wait_for_messages(2), ['hello', 'bye'])
+
+    async def test_queue_full(self):
+        """
+        Tests a call is refused when the queue is full, and its messages
+        that weren't queued are accepted when it is redelivered
+        """
+        client = self._create_client(queue_size=1)
+        body = _get_body(('1', 'wamid.1', 'hello'), ('2', 'wamid.2', 'hi'))
+
+        with self.assertLogs('rasa_whatsapp_connector.webhook', 'WARNING'):
+            _, response = await client.post(WEBHOOK_URL, content=body)
+
+        self.assertEqual(response.status, 503)
+        self.assertEqual(await self._wait_for_messages(1), ['hello'])
+
+        _, response = await client.post(WEBHOOK_URL, content=body)
+
+        self.assertEqual(response.status, 200)
+        self.assertEqual(await self._wait_for_messages(2), ['hello', 'hi'])
+
+    async def test_continuation(self):
+        """
+        Tests replies to a "More…" row are answered without rasa
+        """
+        client = self._create_client()
+        converter = self._channel._registry.get(PHONE_IDENTIFIER)
+        buttons = [
+            {
+                'title': f'Test Button {index}',
+                'payload': f'Payload Button {index}'
+            } for index in range(12)
+        ]
+        message = converter.prepare_message('1', 'text', buttons)
+        rows = message['interactive']['action']['sections'][-1]['rows']
+        hook = build_messages_hook(PHONE_IDENTIFIER, [('1', 'wamid.1', '')])
+        hook['entry'][0]['changes'][0]['value']['messages'][0].update(
+            {
+                'type': 'interactive',
+                'interactive':
+                    {
+                        'type': 'list_reply',
+                        'list_reply': {
+                            'id': rows[-1]['id']
+                        }
+                    },
+            }
+        )
+        body = dumps(hook)
+
+        with patch.object(converter, 'send_continuation_async') as send_mock:
+            _, response = await client.post(WEBHOOK_URL, content=body)
+
+            self.assertEqual(response.status, 200)
+
+            for _ in range(100):
+                if send_mock.await_count:
+                    break
+
+                await asyncio.sleep(0.01)
+
+        send_mock.assert_awaited_once()
+        self.assertEqual(send_mock.await_args.args[0].payload, rows[-1]['id'])
+        self._on_new_message.assert_not_awaited()
+
+    async def test_shutdown(self):
+        """
+        Tests stopping the server hands the coalesced messages to rasa and
+        the collected statuses to the status sink
+        """
+        status_sink = ListStatusSink()
+        # The test client stops the server after each request
+        client = self._create_client(
+            status_sink=status_sink,
+            coalesce_window=60,
+            coalesce_max_wait=60,
+        )
+        hook = build_messages_hook(
+            PHONE_IDENTIFIER,
+            [('1', 'wamid.1', 'hello'), ('1', 'wamid.2', 'there')],
+        )
+        hook['entry'][0]['changes'][0]['value']['statuses'] = (
+            build_statuses_hook(
+                PHONE_IDENTIFIER,
+                [('wamid.0', '1', 'delivered')],
+            )['entry'][0]['changes'][0]['value']['statuses']
+        )
+
+        _, response = await client.post(WEBHOOK_URL, content=dumps(hook))
+
+        self.assertEqual(response.status, 200)
+        self.assertEqual(
+            [
+                call.args[0].text
+                for call in self._on_new_message.await_args_list
+            ],
+            ['hello\nthere'],
+        )
+        self.assertEqual([e.status for e in status_sink.events], ['delivered'])
+
+    async def test_continuation_cache_miss(self):
+        """
+        Tests replies to a "More…" row of a list that is no longer cached,
+        for instance after a restart, are handed to rasa
+        """
+        client = self._create_client()
+        payload = '__more__:0123456789abcdef:1'
+        hook = build_messages_hook(PHONE_IDENTIFIER, [('1', 'wamid.1', '')])
+        hook['entry'][0]['changes'][0]['value']['messages'][0].update(
+            {
+                'type': 'interactive',
+                'interactive':
+                    {
+                        'type': 'list_reply',
+                        'list_reply': {
+                            'id': payload
+                        }
+                    },
+            }
+        )
+
+        with self.assertLogs('rasa_whatsapp_connector.whatsapp', 'WARNING'):
+            _, response = await client.post(WEBHOOK_URL, content=dumps(hook))
+
+        self.assertEqual(response.status, 200)
+        self.assertEqual(await self._wait_for_messages(1), [payload])
@@ -0,0 +1,121 @@
+import asyncio
+import unittest
+
+from rasa_whatsapp_connector.coalesce import (
+    MessageCoalescer,
+    can_coalesce,
+    merge_messages,
+)
+from rasa_whatsapp_connector.models import InboundMessage
+
+
+def _get_message(
+    message_id: str,
+    text: str,
+    sender_id: str = '12345678',
+    payload: str | None = None,
+) -> InboundMessage:
+    return InboundMessage(
+        sender_id,
+        text,
+        'interactive' if payload else 'text',
+        message_id=message_id,
+        payload=payload,
+        phone_number_id='987654321',
+    )
+
+
+class TestMergeMessages(unittest.TestCase):
+    """
+    Tests merging the messages of a burst
+    """
+    def test_can_coalesce(self):
+        """
+        Tests only plain text is merged
+        """
+        self.assertTrue(can_coalesce(_get_message('wamid.1', 'hi')))
+        self.assertFalse(
+            can_coalesce(_get_message('wamid.1', 'yes', payload='yes'))
+        )
+
+    def test_merge_messages(self):
+        """
+        Tests texts are joined and every message id is kept
+        """
+        message = merge_messages(
+            [
+                _get_message('wamid.1', 'hi'),
+                _get_message('wamid.2', 'I want to'),
+                _get_message('wamid.3', 'change my order'),
+            ]
+        )
+
+        self.assertEqual(message.text, 'hi\nI want to\nchange my order')
+        self.assertEqual(message.message_id, 'wamid.3')
+        self.assertEqual(
+            message.metadata,
+            {'message_ids': ['wamid.1', 'wamid.2', 'wamid.3']},
+        )
+
+
+class TestMessageCoalescer(unittest.IsolatedAsyncioTestCase):
+    """
+    Tests the MessageCoalescer class
+    """
+    async def asyncSetUp(self):
+        self._submitted = []
+
+        async def submit(key, item):
+            _, message = item
+            self._submitted.append((key, message.text))
+
+        self._coalescer = MessageCoalescer(submit, window=0.05, max_wait=0.2)
+
+    async def test_window(self):
+        """
+        Tests a burst is handed over once its sender is quiet
+        """
+        await self._coalescer.add('a', (None, _get_message('wamid.1', 'hi')))
+        await self._coalescer.add('b', (None, _get_message('wamid.2', 'hey')))
+        await self._coalescer.add('a', (None, _get_message('wamid.3', 'there')))
+
+        self.assertEqual(self._submitted, [])
+
+        await asyncio.sleep(0.1)
+
+        self.assertEqual(
+            sorted(self._submitted),
+            [('a', 'hi\nthere'), ('b', 'hey')],
+        )
+        self.assertEqual(len(self._coalescer), 0)
+
+    async def test_max_wait(self):
+        """
+        Tests a burst that keeps growing is handed over after max_wait
+        """
+        for index in range(8):
+            await self._coalescer.add(
+                'a',
+                (None, _get_message(f'wamid.{index}', str(index))),
+            )
+            await asyncio.sleep(0.03)
+
+        await asyncio.sleep(0.1)
+
+        self.assertGreater(len(self._submitted), 1)
+        self.assertEqual(
+            '\n'.join(text for _, text in self._submitted),
+            '\n'.join(str(index) for index in range(8)),
+        )
+
+    async def test_interactive_reply(self):
+        """
+        Tests a button reply hands over the pending burst before it
+        """
+        await self._coalescer.add('a', (None, _get_message('wamid.1', 'hi')))
+        await self._coalescer.add(
+            'a',
+            (None, _get_message('wamid.2', 'yes', payload='yes')),
+        )
+
+        self.assertEqual(self._submitted, [('a', 'hi'), ('a', 'yes')])
@@ -0,0 +1,108 @@
+import unittest
+
+from mock import AsyncMock, patch
+
+from rasa_whatsapp_connector.dedup import (
+    DeduplicationCache,
+    MessageDeduplicator,
+    RedisDeduplicationBackend,
+)
+
+
+class TestDeduplicationCache(unittest.TestCase):
+    """
+    Tests the DeduplicationCache class
+    """
+    def test_add(self):
+        """
+        Tests adding seen and unseen message ids
+        """
+        cache = DeduplicationCache()
+
+        self.assertTrue(cache.add('wamid.1'))
+        self.assertFalse(cache.add('wamid.1'))
+        self.assertTrue(cache.add('wamid.2'))
+        self.assertEqual(len(cache), 2)
+
+        cache.discard('wamid.1')
+        self.assertTrue(cache.add('wamid.1'))
+
+    @patch('time.monotonic')
+    def test_ttl(self, monotonic_mock):
+        """
+        Tests message ids are forgotten after the ttl
+        """
+        cache = DeduplicationCache(ttl=10)
+
+        monotonic_mock.return_value = 0
+        self.assertTrue(cache.add('wamid.1'))
+
+        monotonic_mock.return_value = 5
+        self.assertTrue(cache.add('wamid.2'))
+        self.assertFalse(cache.add('wamid.1'))
+
+        monotonic_mock.return_value = 16
+        self.assertTrue(cache.add('wamid.1'))
+        self.assertEqual(len(cache), 1)
+
+    def test_max_size(self):
+        """
+        Tests the least recently seen message ids are evicted
+        """
+        cache = DeduplicationCache(max_size=2)
+
+        cache.add('wamid.1')
+        cache.add('wamid.2')
+        cache.add('wamid.1')
+        cache.add('wamid.3')
+
+        self.assertEqual(len(cache), 2)
+        self.assertFalse(cache.add('wamid.1'))
+        self.assertTrue(cache.add('wamid.2'))
+
+
+class TestMessageDeduplicator(unittest.IsolatedAsyncioTestCase):
+    """
+    Tests the MessageDeduplicator class
+    """
+    async def test_is_duplicate(self):
+        """
+        Tests detecting duplicates with the local cache
+        """
+        deduplicator = MessageDeduplicator()
+
+        self.assertFalse(await deduplicator.is_duplicate('wamid.1'))
+        self.assertTrue(await deduplicator.is_duplicate('wamid.1'))
+
+        await deduplicator.forget('wamid.1')
+        self.assertFalse(await deduplicator.is_duplicate('wamid.1'))
+
+    async def test_is_duplicate_shared_backend(self):
+        """
+        Tests detecting duplicates seen by other nodes
+        """
+        client = AsyncMock()
+        client.set.return_value = None
+        deduplicator = MessageDeduplicator(
+            ttl=60,
+            backend=RedisDeduplicationBackend(client),
+        )
+
+        self.assertTrue(await deduplicator.is_duplicate('wamid.1'))
+        client.set.assert_awaited_with(
+            'whatsapp:wamid:wamid.1',
+            b'1',
+            nx=True,
+            px=60000,
+        )
+
+        client.set.return_value = True
+        self.assertFalse(await deduplicator.is_duplicate('wamid.2'))
+
+        # Already in the local cache, the backend isn't asked again
+        client.set.reset_mock()
+        self.assertTrue(await deduplicator.is_duplicate('wamid.2'))
+        client.set.assert_not_awaited()
+
+        await deduplicator.forget('wamid.2')
+        client.delete.assert_awaited_with('whatsapp:wamid:wamid.2')
@@ -0,0 +1,68 @@
+import subprocess
+import sys
+import unittest
+
+# Seconds the dependency free core may take to import, measured with
+# python -X importtime so the interpreter startup isn't counted
+CORE_IMPORT_BUDGET = 0.3
+HEAVY_MODULES = (
+    'aiohttp',
+    'requests',
+    'rasa',
+    'sanic',
+    'prometheus_client',
+    'opentelemetry',
+)
+
+
+def _import(module: str):
+    script = (
+        f"import sys, {module}\n"
+        "print(' '.join(name for name in sys.modules))"
+    )
+
+    return subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', script],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+
+
+class TestImports(unittest.TestCase):
+    """
+    Tests the converter core starts without its optional dependencies
+    """
+    def _assert_light(self, module: str):
+        loaded = {name.split('.')[0] for name in _import(module).stdout.split()}
+
+        self.assertFalse(loaded.intersection(HEAVY_MODULES))
+
+    def test_core_imports(self):
+        """
+        Tests the core doesn't load http clients, rasa or metrics backends
+        """
+        self._assert_light('rasa_whatsapp_connector.core')
+
+    def test_converter_imports(self):
+        """
+        Tests the http clients are only loaded on first use
+        """
+        self._assert_light('rasa_whatsapp_connector.whatsapp')
+
+    def test_ingress_imports(self):
+        """
+        Tests the webhook ingress doesn't load rasa or http clients
+        """
+        self._assert_light('rasa_whatsapp_connector.ingress')
+
+    def test_core_import_time(self):
+        """
+        Tests the core imports within its budget
+        """
+        importtime = _import('rasa_whatsapp_connector.core').stderr
+        # Lines are "import time: self | cumulative | module", in
+        # microseconds, and the last one is the imported module
+        cumulative = int(importtime.strip().splitlines()[-1].split('|')[1])
+
+        self.assertLess(cumulative / 1e6, CORE_IMPORT_BUDGET)
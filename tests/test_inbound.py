@@ -0,0 +1,72 @@
+import asyncio
+import unittest
+
+from rasa_whatsapp_connector.inbound import InboundMessageQueue
+
+
+class TestInboundMessageQueue(unittest.IsolatedAsyncioTestCase):
+    """
+    Tests the InboundMessageQueue class
+    """
+    async def test_put_and_handle(self):
+        """
+        Tests queued messages are handled by the workers
+        """
+        handled = []
+
+        async def handler(message):
+            handled.append(message)
+
+        queue = InboundMessageQueue(handler, max_size=10, workers=2)
+
+        for i in range(5):
+            self.assertTrue(queue.put(i))
+
+        await queue.stop()
+
+        self.assertEqual(sorted(handled), [0, 1, 2, 3, 4])
+        self.assertFalse(queue.running)
+
+    async def test_put_full_queue(self):
+        """
+        Tests putting a message on a full queue
+        """
+        release = asyncio.Event()
+
+        async def handler(_):
+            await release.wait()
+
+        queue = InboundMessageQueue(handler, max_size=1, workers=1)
+
+        self.assertTrue(queue.put(1))
+        # Let the worker take the first message off the queue
+        await asyncio.sleep(0)
+        self.assertTrue(queue.put(2))
+        self.assertFalse(queue.put(3))
+        self.assertEqual(queue.size, 1)
+
+        release.set()
+        await queue.stop()
+
+    async def test_handler_errors(self):
+        """
+        Tests a failing message doesn't stop the workers
+        """
+        handled = []
+
+        async def handler(message):
+            if message == 'fail':
+                raise RuntimeError(message)
+
+            handled.append(message)
+
+        queue = InboundMessageQueue(handler, workers=1)
+
+        with self.assertLogs('rasa_whatsapp_connector.inbound', 'ERROR'):
+            queue.put('fail')
+            queue.put('ok')
+            await queue.join()
+
+        self.assertEqual(handled, ['ok'])
+
+        await queue.stop()
@@ -0,0 +1,112 @@
+import unittest
+
+from rasa_whatsapp_connector.interactive import (
+    InteractiveMenuBuilder,
+    build_list_action,
+    build_rows,
+    is_continuation,
+)
+
+
+def _get_buttons(count: int, section: str | None = None):
+    return [
+        {
+            'title': f'Option {index}',
+            'payload': f'/option{{"index": {index}}}',
+            'section': section,
+        } for index in range(count)
+    ]
+
+
+class TestInteractive(unittest.TestCase):
+    """
+    Tests building list rows and actions
+    """
+    def test_build_list_action(self):
+        """
+        Tests consecutive rows of the same section are grouped
+        """
+        buttons = (
+            _get_buttons(2, 'Drinks') + _get_buttons(1) +
+            _get_buttons(1, 'A section title longer than allowed')
+        )
+
+        action = build_list_action(build_rows(buttons, 'Select'), 'Select')
+
+        self.assertEqual(action['button'], 'Select')
+        self.assertEqual(
+            [
+                (section['title'], len(section['rows']))
+                for section in action['sections']
+            ],
+            [
+                ('Drinks', 2),
+                ('Select', 1),
+                ('A section title longer t', 1),
+            ],
+        )
+
+
+class TestInteractiveMenuBuilder(unittest.TestCase):
+    """
+    Tests the InteractiveMenuBuilder class
+    """
+    def _get_rows(self, template):
+        return [
+            row for section in template.action['sections']
+            for row in section['rows']
+        ]
+
+    def test_get_menu(self):
+        """
+        Tests lists over the row limit are split into chained pages
+        """
+        builder = InteractiveMenuBuilder(more_title='More')
+        buttons = _get_buttons(25)
+
+        menu = builder.get_menu(buttons)
+
+        self.assertIs(builder.get_menu(buttons), menu)
+        self.assertEqual(
+            [len(self._get_rows(page)) for page in menu.pages],
+            [10, 10, 7],
+        )
+
+        options = []
+
+        for index, page in enumerate(menu.pages):
+            rows = self._get_rows(page)
+
+            if index < len(menu.pages) - 1:
+                more = rows.pop()
+                self.assertEqual(more['title'], 'More')
+                self.assertTrue(is_continuation(more['id']))
+                self.assertIs(
+                    builder.get_continuation(more['id']),
+                    menu.pages[index + 1],
+                )
+
+            options.extend(row['id'] for row in rows)
+
+        self.assertEqual(options, [button['payload'] for button in buttons])
+
+        single_page = builder.get_menu(_get_buttons(10))
+        self.assertEqual(len(single_page.pages), 1)
+
+    def test_get_continuation(self):
+        """
+        Tests resolving invalid and evicted continuation payloads
+        """
+        builder = InteractiveMenuBuilder(max_size=1)
+        menu = builder.get_menu(_get_buttons(11))
+        more = self._get_rows(menu.pages[0])[-1]['id']
+
+        self.assertIsNone(builder.get_continuation('/option'))
+        self.assertIsNone(builder.get_continuation(more[:-1] + '5'))
+        self.assertIsNone(builder.get_continuation(more[:-1] + 'x'))
+        self.assertIsNotNone(builder.get_continuation(more))
+
+        builder.get_menu(_get_buttons(12))
+
+        self.assertEqual(len(builder), 1)
+        self.assertIsNone(builder.get_continuation(more))
@@ -0,0 +1,109 @@
+import asyncio
+import unittest
+
+from rasa_whatsapp_connector.lanes import KeyedExecutor
+
+
+class TestKeyedExecutor(unittest.IsolatedAsyncioTestCase):
+    """
+    Tests the KeyedExecutor class
+    """
+    async def test_order_per_key(self):
+        """
+        Tests items of the same key are handled in order
+        """
+        handled = []
+
+        async def handler(item):
+            _, index = item
+            # Later items finish faster, so only the lane keeps them ordered
+            await asyncio.sleep(0.005 * (5 - index))
+            handled.append(item)
+
+        executor = KeyedExecutor(handler, max_concurrency=4)
+
+        for index in range(5):
+            for key in ('a', 'b'):
+                await executor.submit(key, (key, index))
+
+        await executor.join()
+
+        for key in ('a', 'b'):
+            self.assertEqual(
+                [index for k, index in handled if k == key],
+                [0, 1, 2, 3, 4],
+            )
+
+        await executor.stop()
+
+    async def test_concurrency_across_keys(self):
+        """
+        Tests items of different keys run in parallel up to the cap
+        """
+        running = 0
+        max_running = 0
+
+        async def handler(_):
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        executor = KeyedExecutor(handler, max_concurrency=3)
+
+        for key in range(10):
+            await executor.submit(key, None)
+
+        await executor.join()
+
+        self.assertEqual(max_running, 3)
+
+        await executor.stop()
+
+    async def test_max_pending(self):
+        """
+        Tests submit waits while too many items are pending
+        """
+        release = asyncio.Event()
+
+        async def handler(_):
+            await release.wait()
+
+        executor = KeyedExecutor(handler, max_pending=2)
+
+        await executor.submit('a', 1)
+        await executor.submit('b', 2)
+
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(executor.submit('c', 3), 0.01)
+
+        release.set()
+        await executor.join()
+        await executor.submit('c', 3)
+        await executor.join()
+        await executor.stop()
+
+    async def test_idle_eviction(self):
+        """
+        Tests idle lanes are evicted
+        """
+        async def handler(_):
+            pass
+
+        executor = KeyedExecutor(handler, idle_timeout=0.01)
+
+        await executor.submit('a', 1)
+        await executor.submit('b', 1)
+        self.assertEqual(executor.lanes, 2)
+
+        await executor.join()
+        await asyncio.sleep(0.05)
+        self.assertEqual(executor.lanes, 0)
+
+        await executor.submit('a', 2)
+        await executor.join()
+        self.assertEqual(executor.lanes, 1)
+
+        await executor.stop()
+        self.assertEqual(executor.lanes, 0)
@@ -0,0 +1,201 @@
+# pylint: disable=protected-access
+import asyncio
+import unittest
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from rasa_whatsapp_connector.loadtest.flood import (
+    WebhookFlooder,
+    get_percentile,
+)
+from rasa_whatsapp_connector.loadtest.simulator import GraphApiSimulator
+from rasa_whatsapp_connector.signature import (
+    SIGNATURE_HEADER,
+    WebhookSignatureVerifier,
+)
+from rasa_whatsapp_connector.whatsapp import RasaToWhatsappConverter
+
+
+class TestLoadTest(unittest.IsolatedAsyncioTestCase):
+    """
+    Tests the Graph Api simulator and the webhook flooder
+    """
+    async def asyncSetUp(self):
+        self._hooks = []
+        self._signatures = []
+        self._tasks = set()
+        self._converter = None
+
+        async def handle_webhook(request):
+            hook = await request.json()
+            self._hooks.append(hook)
+            self._signatures.append(
+                (await request.read(), request.headers.get(SIGNATURE_HEADER))
+            )
+            value = hook['entry'][0]['changes'][0]['value']
+
+            # Replies like the connector does, after acknowledging
+            for message in value.get('messages', []):
+                task = asyncio.create_task(
+                    self._converter.send_message_async(message['from'], 'hi')
+                )
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+            return web.Response()
+
+        async def handle_health(_):
+            return web.json_response({'status': 'ok', 'queue_size': 1})
+
+        app = web.Application()
+        app.router.add_post('/webhook', handle_webhook)
+        app.router.add_get('/', handle_health)
+
+        self._server = TestServer(app)
+        await self._server.start_server()
+
+    async def asyncTearDown(self):
+        await asyncio.gather(*self._tasks)
+
+        if self._converter is not None:
+            await self._converter.close()
+
+        await self._server.close()
+
+    async def test_simulator(self):
+        """
+        Tests simulated answers, throttling and statuses
+        """
+        replies = []
+        simulator = GraphApiSimulator(
+            webhook_url=str(self._server.make_url('/webhook')),
+            status_delay=0.01,
+            phone_number_id='987654321',
+        )
+        simulator.add_reply_handler(
+            lambda recipient_id, _: replies.append(recipient_id)
+        )
+
+        async with simulator:
+            url = f"{simulator.url}/v18.0/987654321/messages"
+
+            async with aiohttp.ClientSession() as session:
+                async with session.post(url, json={'to': '123'}) as response:
+                    body = await response.json()
+
+                self.assertEqual(response.status, 200)
+                self.assertTrue(body['messages'][0]['id'])
+
+                await asyncio.sleep(0.1)
+
+                simulator._throttle_rate = 1
+
+                async with session.post(url, json={'to': '123'}) as response:
+                    body = await response.json()
+
+                self.assertEqual(response.status, 429)
+                self.assertEqual(body['error']['code'], 130429)
+
+                # The version and the phone number id are separate segments
+                async with session.post(
+                    f"{simulator.url}/v18.0987654321/messages",
+                    json={'to': '123'},
+                ) as response:
+                    self.assertEqual(response.status, 404)
+
+        self.assertEqual(replies, ['123'])
+        self.assertEqual(
+            simulator.counts,
+            {
+                'sent': 1,
+                'failed': 0,
+                'throttled': 1,
+                'statuses': 3
+            },
+        )
+        self.assertEqual(
+            [
+                hook['entry'][0]['changes'][0]['value']['statuses'][0]['status']
+                for hook in self._hooks
+            ],
+            ['sent', 'delivered', 'read'],
+        )
+
+    async def test_flood(self):
+        """
+        Tests flooding a webhook and measuring the reply loop
+        """
+        async with GraphApiSimulator() as simulator:
+            self._converter = RasaToWhatsappConverter(
+                '987654321',
+                'token',
+                graph_api_url=simulator.url,
+            )
+            flooder = WebhookFlooder(
+                str(self._server.make_url('/webhook')),
+                '987654321',
+                rate=200,
+                duration=0.2,
+                batch_size=2,
+                health_url=str(self._server.make_url('/')),
+            )
+            simulator.add_reply_handler(flooder.handle_reply)
+
+            report = await flooder.run(drain=5)
+
+        self.assertGreater(report.messages, 0)
+        self.assertEqual(report.messages % 2, 0)
+        self.assertEqual(report.answers, {200: report.messages})
+        self.assertEqual(report.replies, report.messages)
+        self.assertEqual(len(report.loop_latencies), report.messages)
+        self.assertEqual(report.queue_depths['queue_size'][0], 1)
+        self.assertIn('loop latency', report.format())
+
+    async def test_signature(self):
+        """
+        Tests hook calls are signed with the app secret
+        """
+        simulator = GraphApiSimulator(
+            webhook_url=str(self._server.make_url('/webhook')),
+            status_delay=0.01,
+            app_secret='app_secret',
+        )
+
+        async with simulator:
+            self._converter = RasaToWhatsappConverter(
+                '987654321',
+                'token',
+                graph_api_url=simulator.url,
+            )
+            flooder = WebhookFlooder(
+                str(self._server.make_url('/webhook')),
+                '987654321',
+                rate=20,
+                duration=0.1,
+                app_secret='app_secret',
+            )
+            simulator.add_reply_handler(flooder.handle_reply)
+
+            report = await flooder.run(drain=5)
+            await asyncio.sleep(0.1)
+
+        verifier = WebhookSignatureVerifier('app_secret')
+
+        self.assertEqual(report.replies, report.messages)
+        self.assertEqual(simulator.counts['statuses'], 3 * report.messages)
+        self.assertEqual(len(self._signatures), 4 * report.messages)
+
+        for body, signature in self._signatures:
+            self.assertTrue(verifier.verify(body, signature))
+
+    def test_get_percentile(self):
+        """
+        Tests getting percentiles
+        """
+        values = list(range(1, 101))
+
+        self.assertEqual(get_percentile(values, 50), 51)
+        self.assertEqual(get_percentile(values, 99), 99)
+        self.assertEqual(get_percentile([], 99), 0)
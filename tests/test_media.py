@@ -0,0 +1,289 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+from mock import AsyncMock, patch
+
+from rasa_whatsapp_connector.media import (
+    MediaUploadCache,
+    get_content_hash,
+    get_file_hash,
+    is_media_link,
+    prepare_media_message,
+)
+from rasa_whatsapp_connector.retry import GraphApiError
+from rasa_whatsapp_connector.whatsapp import RasaToWhatsappConverter
+
+
+class TestMedia(unittest.TestCase):
+    """
+    Tests the media helpers
+    """
+    def test_get_file_hash(self):
+        """
+        Tests hashing a file in chunks gives the hash of its content
+        """
+        content = os.urandom(1000)
+
+        with tempfile.NamedTemporaryFile(delete=False) as media_file:
+            media_file.write(content)
+
+        try:
+            self.assertEqual(
+                get_file_hash(media_file.name, chunk_size=64),
+                get_content_hash(content),
+            )
+        finally:
+            os.remove(media_file.name)
+
+    def test_is_media_link(self):
+        """
+        Tests telling links from local files
+        """
+        self.assertTrue(is_media_link('https://example.com/image.png'))
+        self.assertTrue(is_media_link('http://example.com/image.png'))
+        self.assertFalse(is_media_link('/tmp/image.png'))
+
+    def test_prepare_media_message(self):
+        """
+        Tests preparing media messages
+        """
+        self.assertEqual(
+            prepare_media_message(
+                '123456789',
+                'document',
+                {'id': 'media.1'},
+                'caption',
+                'file.pdf',
+            ),
+            {
+                'messaging_product': 'whatsapp',
+                'to': '123456789',
+                'type': 'document',
+                'document':
+                    {
+                        'id': 'media.1',
+                        'caption': 'caption',
+                        'filename': 'file.pdf',
+                    },
+            },
+        )
+        # Audio can't have a caption
+        self.assertEqual(
+            prepare_media_message(
+                '123456789',
+                'audio',
+                {'link': 'https://example.com/audio.ogg'},
+                'caption',
+            )['audio'],
+            {'link': 'https://example.com/audio.ogg'},
+        )
+        self.assertRaises(
+            ValueError,
+            prepare_media_message,
+            '123456789',
+            'location',
+            {},
+        )
+
+
+class TestMediaUploadCache(unittest.TestCase):
+    """
+    Tests the MediaUploadCache class
+    """
+    def test_get(self):
+        """
+        Tests reusing and evicting media ids
+        """
+        cache = MediaUploadCache(max_size=2)
+
+        cache.set('a', 'media.a')
+        cache.set('b', 'media.b')
+        self.assertEqual(cache.get('a'), 'media.a')
+
+        cache.set('c', 'media.c')
+
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 'media.a')
+
+        cache.discard('a')
+        self.assertIsNone(cache.get('a'))
+
+    @patch('rasa_whatsapp_connector.media.time.monotonic')
+    def test_get_expired(self, monotonic_mock):
+        """
+        Tests media ids aren't reused once expired
+        """
+        cache = MediaUploadCache(ttl=10)
+
+        monotonic_mock.return_value = 100
+        cache.set('a', 'media.a')
+
+        monotonic_mock.return_value = 109
+        self.assertEqual(cache.get('a'), 'media.a')
+
+        monotonic_mock.return_value = 110
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 0)
+
+
+class TestConverterMedia(unittest.TestCase):
+    """
+    Tests sending, uploading and downloading media with the converter
+    """
+    def setUp(self):
+        self._converter = RasaToWhatsappConverter('987654321', 'sample_token')
+
+    def test_send_messages_async_media(self):
+        """
+        Tests sending responses with images, uploading a file only once
+        """
+        async_sender = AsyncMock()
+        async_sender.request.return_value = (200, {'messages': []})
+        async_sender.upload.return_value = (200, {'id': 'media.1'})
+        converter = RasaToWhatsappConverter(
+            '987654321',
+            'sample_token',
+            async_sender=async_sender,
+        )
+
+        with tempfile.NamedTemporaryFile(suffix='.png') as image_file:
+            image_file.write(b'image')
+            image_file.flush()
+
+            results = asyncio.run(
+                converter.send_messages_async(
+                    "123456789",
+                    [
+                        {
+                            "text": "first",
+                            "image": image_file.name
+                        },
+                        {
+                            "text": "second",
+                            "image": image_file.name
+                        },
+                        {
+                            "attachment": "https://example.com/file.pdf"
+                        },
+                    ],
+                )
+            )
+
+        self.assertTrue(all(result.ok for result in results))
+        self.assertEqual(async_sender.upload.call_count, 1)
+        self.assertEqual(
+            [
+                json.loads(call.args[2])
+                for call in async_sender.request.call_args_list
+            ],
+            [
+                {
+                    'messaging_product': 'whatsapp',
+                    'to': '123456789',
+                    'type': 'image',
+                    'image': {
+                        'id': 'media.1',
+                        'caption': 'first'
+                    }
+                },
+                {
+                    'messaging_product': 'whatsapp',
+                    'to': '123456789',
+                    'type': 'image',
+                    'image': {
+                        'id': 'media.1',
+                        'caption': 'second'
+                    }
+                },
+                {
+                    'messaging_product': 'whatsapp',
+                    'to': '123456789',
+                    'type': 'document',
+                    'document': {
+                        'link': 'https://example.com/file.pdf'
+                    }
+                },
+            ],
+        )
+
+    @patch('requests.Session.post')
+    def test_upload_media(self, post_mock):
+        """
+        Tests uploading the same content only once
+        """
+        post_mock.return_value.status_code = 200
+        post_mock.return_value.json.return_value = {'id': 'media.1'}
+
+        self.assertEqual(
+            self._converter.upload_media(b'image', 'image/png'),
+            'media.1',
+        )
+        self.assertEqual(
+            self._converter.upload_media(b'image', 'image/png'),
+            'media.1',
+        )
+
+        post_mock.assert_called_once()
+        self.assertEqual(
+            post_mock.call_args.args[0],
+            'https://graph.facebook.com/v18.0/987654321/media',
+        )
+        self.assertEqual(
+            post_mock.call_args.kwargs['files'],
+            {'file': ('media', b'image', 'image/png')},
+        )
+
+    def test_download_media_to_file(self):
+        """
+        Tests downloading a received media to a file
+        """
+        async_sender = AsyncMock()
+        async_sender.get.return_value = (
+            200,
+            {
+                'url': 'https://lookaside.fbsbx.com/media.1',
+                'mime_type': 'image/jpeg',
+            },
+        )
+
+        async def download(_url, _headers, handler, _chunk_size):
+            await handler(b'first')
+            await handler(b'second')
+            return 200
+
+        async_sender.download.side_effect = download
+        converter = RasaToWhatsappConverter(
+            '987654321',
+            'sample_token',
+            async_sender=async_sender,
+        )
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'media')
+            media = asyncio.run(
+                converter.download_media_to_file('media.1', path)
+            )
+
+            with open(path, 'rb') as media_file:
+                self.assertEqual(media_file.read(), b'firstsecond')
+
+            self.assertEqual(media['mime_type'], 'image/jpeg')
+            self.assertEqual(
+                async_sender.get.call_args.args[0],
+                'https://graph.facebook.com/v18.0/media.1',
+            )
+
+            # Failed downloads don't leave a partial file behind
+            async_sender.download.side_effect = None
+            async_sender.download.return_value = 404
+
+            self.assertRaises(
+                GraphApiError,
+                asyncio.run,
+                converter.download_media_to_file('media.1', path),
+            )
+            self.assertFalse(os.path.exists(path))
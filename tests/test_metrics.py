@@ -0,0 +1,304 @@
+import unittest
+
+from mock import AsyncMock, MagicMock, patch
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+from prometheus_client import CollectorRegistry
+
+from rasa_whatsapp_connector.metrics import (
+    Metrics,
+    OpenTelemetryMetrics,
+    PrometheusMetrics,
+    get_metrics,
+    set_metrics,
+)
+from rasa_whatsapp_connector.retry import GraphApiError, RetryPolicy
+from rasa_whatsapp_connector.sender import AsyncWhatsappSender
+from rasa_whatsapp_connector.whatsapp import RasaToWhatsappConverter
+from tests.helpers import get_error_response, get_sent_response
+
+
+class _RecordingMetrics(Metrics):
+    def __init__(self):
+        self.sends = []
+        self.inbound = []
+        self.in_flight = 0
+        self.pool_usage = []
+
+    def observe_send(self, message_type: str, status: str, duration: float):
+        self.sends.append((message_type, status))
+
+    def count_inbound(self, outcome: str, reason: str = '', count: int = 1):
+        self.inbound.append((outcome, reason, count))
+
+    def add_sends_in_flight(self, delta: int):
+        self.in_flight += delta
+
+    def set_pool_usage(self, in_use: int, limit: int):
+        self.pool_usage.append((in_use, limit))
+
+
+def _get_converter(async_sender=None):
+    return RasaToWhatsappConverter(
+        '987654321',
+        'sample_token',
+        'v18.0',
+        1,
+        async_sender=async_sender,
+        retry_policy=RetryPolicy(max_attempts=1),
+    )
+
+
+def _get_hook(*messages):
+    return {
+        "entry":
+            [
+                {
+                    "changes":
+                        [
+                            {
+                                "value":
+                                    {
+                                        "metadata":
+                                            {
+                                                "phone_number_id": "987654321"
+                                            },
+                                        "messages": list(messages),
+                                    }
+                            }
+                        ]
+                }
+            ]
+    }
+
+
+class TestMetrics(unittest.IsolatedAsyncioTestCase):
+    """
+    Tests the instrumentation of the send and receive paths
+    """
+    def setUp(self):
+        self._metrics = _RecordingMetrics()
+        set_metrics(self._metrics)
+
+    def tearDown(self):
+        set_metrics(Metrics())
+
+    def test_default_metrics(self):
+        """
+        Tests the default instrumentation does nothing
+        """
+        set_metrics(Metrics())
+
+        self.assertFalse(get_metrics().enabled)
+
+        with get_metrics().start_span('whatsapp.send') as span:
+            span.set_attribute('whatsapp.message_id', 'wamid.1')
+
+    async def test_observe_send(self):
+        """
+        Tests sends are observed by message type and status
+        """
+        async_sender = AsyncMock()
+        async_sender.request.side_effect = [
+            get_sent_response(),
+            get_error_response(100),
+        ]
+        converter = _get_converter(async_sender)
+        buttons = [
+            {
+                'title': f'Button {index}',
+                'payload': f'payload{index}'
+            } for index in range(5)
+        ]
+
+        await converter.send_message_async("123456789", "text", buttons)
+
+        with self.assertRaises(GraphApiError):
+            await converter.send_message_async("123456789", "text")
+
+        self.assertEqual(
+            self._metrics.sends,
+            [('list', '200'), ('text', '400')],
+        )
+        self.assertEqual(self._metrics.in_flight, 0)
+
+    async def test_observe_send_without_retry_policy(self):
+        """
+        Tests sends are labelled with the response status when errors are
+        returned rather than raised
+        """
+        async_sender = AsyncMock()
+        async_sender.request.return_value = (429, {'error': {'code': 4}})
+        converter = RasaToWhatsappConverter(
+            '987654321',
+            'sample_token',
+            'v18.0',
+            1,
+            async_sender=async_sender,
+        )
+        response = MagicMock(status_code=500)
+        response.json.return_value = {'error': {'code': 1}}
+
+        await converter.send_message_async("123456789", "text")
+
+        with patch('requests.Session.post', return_value=response):
+            converter.send_message("123456789", "text")
+
+        self.assertEqual(
+            self._metrics.sends,
+            [('text', '429'), ('text', '500')],
+        )
+
+    def test_count_inbound(self):
+        """
+        Tests received messages are counted by outcome
+        """
+        converter = _get_converter()
+        hook = _get_hook(
+            {
+                "from": "12345678",
+                "id": "wamid.1",
+                "type": "text",
+                "text": {
+                    "body": "hello"
+                },
+            },
+            {
+                "from": "12345678",
+                "id": "wamid.2",
+                "type": "unsupported",
+            },
+        )
+
+        messages = list(
+            converter.iter_inbound_messages_from_whatsapp_hook(hook)
+        )
+
+        self.assertEqual(len(messages), 1)
+        self.assertEqual(
+            self._metrics.inbound,
+            [('parsed', '', 1), ('dropped', 'invalid', 1)],
+        )
+
+    async def test_pool_usage(self):
+        """
+        Tests the requests holding a pooled connection are tracked
+        """
+        async def handle_messages(_):
+            return web.json_response({'messages': [{'id': 'wamid.1'}]})
+
+        app = web.Application()
+        app.router.add_post('/messages', handle_messages)
+        server = TestServer(app)
+        await server.start_server()
+
+        async with AsyncWhatsappSender(api_timeout=1, pool_limit=4) as sender:
+            await sender.request(str(server.make_url('/messages')), {}, {})
+
+            self.assertEqual(sender.in_use, 0)
+
+        await server.close()
+
+        self.assertEqual(self._metrics.pool_usage, [(1, 4), (0, 4)])
+
+
+class TestPrometheusMetrics(unittest.TestCase):
+    """
+    Tests the PrometheusMetrics class
+    """
+    def test_metrics(self):
+        """
+        Tests the metrics are exported to the registry
+        """
+        registry = CollectorRegistry()
+        metrics = PrometheusMetrics(registry)
+
+        metrics.observe_send('text', '200', 0.2)
+        metrics.count_inbound('dropped', 'queue_full', 3)
+        metrics.add_sends_in_flight(1)
+        metrics.set_pool_usage(2, 100)
+
+        self.assertEqual(
+            registry.get_sample_value(
+                'whatsapp_graph_api_request_seconds_count',
+                {
+                    'message_type': 'text',
+                    'status': '200'
+                },
+            ),
+            1,
+        )
+        self.assertEqual(
+            registry.get_sample_value(
+                'whatsapp_inbound_messages_total',
+                {
+                    'outcome': 'dropped',
+                    'reason': 'queue_full'
+                },
+            ),
+            3,
+        )
+        self.assertEqual(
+            registry.get_sample_value('whatsapp_sends_in_flight'),
+            1,
+        )
+        self.assertEqual(
+            registry.get_sample_value('whatsapp_pool_connections_in_use'),
+            2,
+        )
+
+
+class TestOpenTelemetryMetrics(unittest.IsolatedAsyncioTestCase):
+    """
+    Tests the OpenTelemetryMetrics class
+    """
+    def setUp(self):
+        self._exporter = InMemorySpanExporter()
+        tracer_provider = TracerProvider()
+        tracer_provider.add_span_processor(SimpleSpanProcessor(self._exporter))
+        self._reader = InMemoryMetricReader()
+        set_metrics(
+            OpenTelemetryMetrics(
+                MeterProvider(metric_readers=[self._reader]),
+                tracer_provider,
+            )
+        )
+
+    def tearDown(self):
+        set_metrics(Metrics())
+
+    async def test_send_span(self):
+        """
+        Tests the span of a reply is a child of the received message's one
+        """
+        async_sender = AsyncMock()
+        async_sender.request.return_value = get_sent_response('wamid.2')
+        converter = _get_converter(async_sender)
+
+        with get_metrics().start_span(
+            'whatsapp.receive',
+            {'whatsapp.message_id': 'wamid.1'},
+        ):
+            await converter.send_message_async("123456789", "text")
+
+        send, receive = self._exporter.get_finished_spans()
+
+        self.assertEqual(send.name, 'whatsapp.send')
+        self.assertEqual(send.parent.span_id, receive.context.span_id)
+        self.assertEqual(send.attributes['whatsapp.message_id'], 'wamid.2')
+        self.assertEqual(receive.attributes['whatsapp.message_id'], 'wamid.1')
+
+        names = [
+            metric.name
+            for resource in self._reader.get_metrics_data().resource_metrics
+            for scope in resource.scope_metrics for metric in scope.metrics
+        ]
+        self.assertIn('whatsapp.graph_api.duration', names)
@@ -0,0 +1,66 @@
+import unittest
+
+from rasa_whatsapp_connector.models import InboundMessage, OutboundMessage
+
+
+class TestInboundMessage(unittest.TestCase):
+    """
+    Tests the InboundMessage class
+    """
+    def test_to_rasa_message(self):
+        """
+        Tests converting a message to the rasa message dict
+        """
+        message = InboundMessage(
+            "12345678",
+            "sample text",
+            "text",
+            message_id="wamid.1",
+        )
+
+        self.assertEqual(
+            message.to_rasa_message(),
+            {
+                "sender_id": "12345678",
+                "text": "sample text",
+                "metadata": {},
+                "message_id": "wamid.1",
+            },
+        )
+
+    def test_slots(self):
+        """
+        Tests messages don't carry an instance dict
+        """
+        message = InboundMessage("12345678", "sample text", "text")
+
+        self.assertFalse(hasattr(message, '__dict__'))
+
+
+class TestOutboundMessage(unittest.TestCase):
+    """
+    Tests the OutboundMessage class
+    """
+    def test_from_rasa_response(self):
+        """
+        Tests creating a message from a rasa response
+        """
+        buttons = [{'title': 'A', 'payload': 'a'}]
+
+        self.assertEqual(
+            OutboundMessage.from_rasa_response(
+                "123", {
+                    "text": "sample",
+                    "buttons": buttons
+                }
+            ),
+            OutboundMessage("123", "sample", buttons),
+        )
+        self.assertIsNone(
+            OutboundMessage.from_rasa_response(
+                "123", {
+                    "text": "sample",
+                    "buttons": []
+                }
+            ).buttons
+        )
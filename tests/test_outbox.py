@@ -0,0 +1,188 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from mock import AsyncMock
+
+from rasa_whatsapp_connector.outbox import OutboxEntry, SqliteOutbox
+from rasa_whatsapp_connector.retry import GraphApiError, RetryPolicy
+from rasa_whatsapp_connector.whatsapp import RasaToWhatsappConverter
+from tests.helpers import get_error_response, get_sent_response
+
+
+def _get_entry(key: str, created_at: float | None = None) -> OutboxEntry:
+    return OutboxEntry(
+        key,
+        '987654321',
+        '123456789',
+        'text',
+        b'{"text":"hello"}',
+        created_at or time.time(),
+    )
+
+
+class TestSqliteOutbox(unittest.IsolatedAsyncioTestCase):
+    """
+    Tests the SqliteOutbox class
+    """
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+        self._path = os.path.join(self._directory, 'outbox.db')
+
+    def tearDown(self):
+        shutil.rmtree(self._directory)
+
+    async def test_add_ack(self):
+        """
+        Tests acked entries are no longer pending
+        """
+        outbox = SqliteOutbox(self._path)
+
+        self.assertTrue(await outbox.add(_get_entry('turn.1:0')))
+        self.assertTrue(await outbox.add(_get_entry('turn.1:1')))
+
+        outbox.ack('turn.1:0')
+        await outbox.flush()
+
+        self.assertEqual(
+            [entry.key for entry in outbox.pending()],
+            ['turn.1:1'],
+        )
+
+        await outbox.close()
+
+    async def test_idempotency_key(self):
+        """
+        Tests an entry is only written once per key, even once acked
+        """
+        outbox = SqliteOutbox(self._path)
+
+        self.assertTrue(await outbox.add(_get_entry('turn.1:0')))
+        self.assertFalse(await outbox.add(_get_entry('turn.1:0')))
+
+        outbox.ack('turn.1:0')
+        await outbox.flush()
+
+        self.assertFalse(await outbox.add(_get_entry('turn.1:0')))
+
+        await outbox.close()
+
+    async def test_prune(self):
+        """
+        Tests acked entries past their retention are deleted while running
+        """
+        outbox = SqliteOutbox(self._path, retention=0, prune_interval=0)
+
+        await outbox.add(_get_entry('turn.1'))
+        outbox.ack('turn.1')
+        await outbox.flush()
+        await outbox.add(_get_entry('turn.2'))
+
+        # The acked entry is gone, so its key is no longer known
+        self.assertTrue(await outbox.add(_get_entry('turn.1')))
+        self.assertEqual(
+            [entry.key for entry in outbox.pending()],
+            ['turn.2', 'turn.1'],
+        )
+
+        await outbox.close()
+
+    async def test_batched_commits(self):
+        """
+        Tests concurrent writes share a commit
+        """
+        outbox = SqliteOutbox(self._path)
+
+        added = await asyncio.gather(
+            *(outbox.add(_get_entry(f'turn.{index}')) for index in range(50))
+        )
+
+        self.assertTrue(all(added))
+        self.assertEqual(outbox.commits, 1)
+
+        await outbox.close()
+
+    async def test_replay(self):
+        """
+        Tests the entries a previous process left unacked are replayed
+        """
+        outbox = SqliteOutbox(self._path)
+        await outbox.add(_get_entry('sent'))
+        await outbox.add(_get_entry('failed'))
+        await outbox.add(_get_entry('stale', time.time() - 7200))
+        await outbox.add(_get_entry('lost'))
+        outbox.ack('sent')
+        await outbox.close()
+
+        outbox = SqliteOutbox(self._path)
+        sent = []
+
+        async def send(entry: OutboxEntry):
+            if entry.key == 'failed':
+                raise ConnectionError()
+
+            sent.append(entry.key)
+
+        self.assertEqual(outbox.recovered, 3)
+
+        with self.assertLogs('rasa_whatsapp_connector.outbox') as logs:
+            self.assertEqual(await outbox.replay(send), 1)
+
+        self.assertEqual(
+            [record.getMessage() for record in logs.records],
+            [
+                'Failed to replay outbox message failed',
+                'Dropped stale outbox message stale',
+            ],
+        )
+        await outbox.flush()
+
+        self.assertEqual(sent, ['lost'])
+        self.assertEqual(
+            [entry.key for entry in outbox.pending()],
+            ['failed'],
+        )
+
+        await outbox.close()
+
+    async def test_converter(self):
+        """
+        Tests the converter writes messages to the outbox before sending
+        them and acks them once sent
+        """
+        outbox = SqliteOutbox(self._path)
+        async_sender = AsyncMock()
+        async_sender.request.side_effect = [
+            get_sent_response(),
+            ConnectionError(),
+            get_error_response(100),
+        ]
+        converter = RasaToWhatsappConverter(
+            '987654321',
+            'sample_token',
+            async_sender=async_sender,
+            retry_policy=RetryPolicy(max_attempts=1),
+            outbox=outbox,
+        )
+
+        await converter.send_message_async("123456789", "hello", None, 'a')
+        # Sending the same key again is skipped
+        self.assertIsNone(
+            await converter.send_message_async("123456789", "hello", None, 'a')
+        )
+
+        with self.assertRaises(ConnectionError):
+            await converter.send_message_async("123456789", "hi", None, 'b')
+
+        with self.assertRaises(GraphApiError):
+            await converter.send_message_async("123456789", "hey", None, 'c')
+
+        await outbox.flush()
+
+        self.assertEqual(async_sender.request.await_count, 3)
+        self.assertEqual([entry.key for entry in outbox.pending()], ['b'])
+
+        await outbox.close()
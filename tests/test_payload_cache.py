@@ -0,0 +1,224 @@
+import json
+import unittest
+
+from rasa_whatsapp_connector.payload_cache import (
+    InteractiveTemplate,
+    PayloadTemplateCache,
+    ResponseCache,
+    encode_text_message,
+)
+from rasa_whatsapp_connector.core import WhatsappMessageConverter
+
+
+class TestInteractiveTemplate(unittest.TestCase):
+    """
+    Tests the InteractiveTemplate class
+    """
+    def test_encode(self):
+        """
+        Tests encoding gives the same payload as building
+        """
+        template = InteractiveTemplate(
+            'button',
+            {
+                'buttons':
+                    [{
+                        'type': 'reply',
+                        'reply': {
+                            'id': 'a',
+                            'title': 'A'
+                        }
+                    }]
+            },
+        )
+
+        self.assertEqual(
+            json.loads(template.encode('123', 'text "quoted"')),
+            template.build('123', 'text "quoted"'),
+        )
+
+    def test_encode_text_message(self):
+        """
+        Tests encoding a text message
+        """
+        self.assertEqual(
+            json.loads(encode_text_message('123', 'line\nline')),
+            {
+                'messaging_product': 'whatsapp',
+                'to': '123',
+                'text': {
+                    'body': 'line\nline'
+                }
+            },
+        )
+
+
+class TestPayloadTemplateCache(unittest.TestCase):
+    """
+    Tests the PayloadTemplateCache class
+    """
+    def test_get(self):
+        """
+        Tests templates are built once per set of buttons
+        """
+        cache = PayloadTemplateCache()
+        built = []
+
+        def build_action():
+            built.append(1)
+            return {'buttons': []}
+
+        def build_list_action():
+            built.append(1)
+            return {'button': 'Select', 'sections': []}
+
+        buttons = [{'title': 'A', 'payload': 'a'}]
+
+        first = cache.get('button', buttons, build_action)
+        second = cache.get('button', list(buttons), build_action)
+        other = cache.get('list', buttons, build_list_action, 'Select')
+
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+        self.assertEqual(len(built), 2)
+
+    def test_max_size(self):
+        """
+        Tests the least recently used templates are evicted
+        """
+        cache = PayloadTemplateCache(max_size=2)
+
+        def buttons(payload):
+            return [{'title': payload, 'payload': payload}]
+
+        def build_action():
+            return {'buttons': []}
+
+        first = cache.get('button', buttons('a'), build_action)
+        cache.get('button', buttons('b'), build_action)
+        cache.get('button', buttons('a'), build_action)
+        cache.get('button', buttons('c'), build_action)
+
+        self.assertEqual(len(cache), 2)
+        self.assertIs(cache.get('button', buttons('a'), build_action), first)
+
+
+class TestResponseCache(unittest.TestCase):
+    """
+    Tests the ResponseCache class
+    """
+    def test_encode(self):
+        """
+        Tests responses are encoded once, whatever their recipient
+        """
+        cache = ResponseCache()
+        key = cache.get_key('hello "you"')
+        encoded = []
+
+        def encode(to):
+            encoded.append(to)
+            return encode_text_message(to, 'hello "you"')
+
+        first = cache.encode(key, '123', encode)
+        second = cache.encode(key, '456', encode)
+
+        self.assertEqual(first, encode_text_message('123', 'hello "you"'))
+        self.assertEqual(second, encode_text_message('456', 'hello "you"'))
+        self.assertEqual(len(encoded), 1)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_get_key(self):
+        """
+        Tests responses with different buttons or types have different keys
+        """
+        buttons = [{'title': 'A', 'payload': 'a'}]
+
+        self.assertEqual(
+            ResponseCache.get_key('hi', buttons),
+            ResponseCache.get_key('hi', list(buttons)),
+        )
+        self.assertNotEqual(
+            ResponseCache.get_key('hi', buttons),
+            ResponseCache.get_key('hi', [{
+                'title': 'A',
+                'payload': 'b'
+            }]),
+        )
+        self.assertNotEqual(
+            ResponseCache.get_key('hi'),
+            ResponseCache.get_key('hi', []),
+        )
+        self.assertNotEqual(
+            ResponseCache.get_key('hi', buttons),
+            ResponseCache.get_key('hi', buttons * 4),
+        )
+
+    def test_max_size(self):
+        """
+        Tests the least recently used responses are evicted
+        """
+        cache = ResponseCache(max_size=2)
+
+        for text in ('a', 'b', 'a', 'c', 'a', 'b'):
+            cache.encode(
+                cache.get_key(text),
+                '123',
+                lambda to, text=text: encode_text_message(to, text),
+            )
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual((cache.hits, cache.misses), (2, 4))
+
+    def test_converter(self):
+        """
+        Tests cached responses give the same payloads as uncached ones
+        """
+        cached = WhatsappMessageConverter('987654321')
+        uncached = WhatsappMessageConverter('987654321', response_cache_size=0)
+        buttons = [
+            {
+                'title': f'Option {index}',
+                'payload': f'/option{index}'
+            } for index in range(5)
+        ]
+
+        for to in ('123', '456'):
+            for response in (None, buttons[:2], buttons):
+                self.assertEqual(
+                    cached.prepare_message(to, 'Pick one', response),
+                    uncached.prepare_message(to, 'Pick one', response),
+                )
+                self.assertEqual(
+                    cached.prepare_message_body(to, 'Pick one', response),
+                    uncached.prepare_message_body(to, 'Pick one', response),
+                )
+
+        self.assertIsNone(uncached.response_cache)
+        self.assertEqual(cached.response_cache.hits, 3)
+        self.assertEqual(cached.response_cache.misses, 3)
+
+    def test_prepared_messages_not_shared(self):
+        """
+        Tests modifying a prepared message doesn't change the ones prepared
+        later for other recipients
+        """
+        converter = WhatsappMessageConverter('987654321')
+
+        message = converter.prepare_message('111', 'hello')
+        message['text']['body'] = 'changed'
+        converter.prepare_message_body('111', 'hello')
+
+        self.assertEqual(
+            converter.prepare_message('222', 'hello')['text']['body'],
+            'hello',
+        )
+        self.assertEqual(
+            json.loads(converter.prepare_message_body('222', 'hello')),
+            {
+                'messaging_product': 'whatsapp',
+                'to': '222',
+                'text': {
+                    'body': 'hello'
+                }
+            },
+        )
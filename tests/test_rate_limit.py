@@ -0,0 +1,153 @@
+import asyncio
+import time
+import unittest
+
+from mock import patch
+
+from rasa_whatsapp_connector.rate_limit import TokenBucket, SendScheduler
+
+
+class TestTokenBucket(unittest.TestCase):
+    """
+    Tests the TokenBucket class
+    """
+    @patch('time.monotonic')
+    def test_reserve(self, monotonic_mock):
+        """
+        Tests reserving tokens within and over the burst
+        """
+        monotonic_mock.return_value = 0
+        bucket = TokenBucket(rate=2, capacity=2)
+
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertAlmostEqual(bucket.reserve(), 0.5)
+        self.assertAlmostEqual(bucket.reserve(), 1.0)
+
+        monotonic_mock.return_value = 10
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertAlmostEqual(bucket.reserve(), 0.5)
+
+
+    @patch('time.monotonic')
+    def test_refund(self, monotonic_mock):
+        """
+        Tests refunded tokens are given back, up to the capacity
+        """
+        monotonic_mock.return_value = 0
+        bucket = TokenBucket(rate=2, capacity=1)
+
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertAlmostEqual(bucket.reserve(), 0.5)
+
+        bucket.refund()
+        bucket.refund()
+        bucket.refund()
+
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertAlmostEqual(bucket.reserve(), 0.5)
+
+class TestSendScheduler(unittest.IsolatedAsyncioTestCase):
+    """
+    Tests the SendScheduler class
+    """
+    async def test_acquire_recipient_limit(self):
+        """
+        Tests bursts to the same recipient are smoothed in order
+        """
+        scheduler = SendScheduler(recipient_rate=100, recipient_burst=1)
+        finished = []
+
+        async def send(index):
+            await scheduler.acquire('987654321', '123456789')
+            finished.append(index)
+
+        start = time.monotonic()
+        await asyncio.gather(*(send(index) for index in range(4)))
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.025)
+        self.assertEqual(finished, [0, 1, 2, 3])
+
+        metrics = scheduler.get_metrics()
+        self.assertEqual(metrics['scheduled'], 4)
+        self.assertEqual(metrics['delayed'], 3)
+        self.assertEqual(metrics['queue_depth'], 0)
+        self.assertAlmostEqual(metrics['max_wait'], 0.03, places=2)
+
+    async def test_acquire_phone_limit(self):
+        """
+        Tests the phone number limit applies across recipients
+        """
+        scheduler = SendScheduler(phone_rate=100, phone_burst=2)
+
+        tasks = [
+            asyncio.create_task(scheduler.acquire('987654321', str(to)))
+            for to in range(4)
+        ]
+        await asyncio.sleep(0)
+
+        self.assertEqual(scheduler.queue_depth, 2)
+
+        await asyncio.gather(*tasks)
+
+        self.assertEqual(scheduler.queue_depth, 0)
+        self.assertEqual(scheduler.get_metrics()['delayed'], 2)
+
+        # Other phone numbers have their own limit
+        await scheduler.acquire('111111111', '0')
+        self.assertEqual(scheduler.get_metrics()['delayed'], 2)
+
+    async def test_acquire_busy_recipient(self):
+        """
+        Tests messages held back for a busy recipient don't hold back the
+        messages to other recipients
+        """
+        scheduler = SendScheduler(
+            phone_rate=10,
+            phone_burst=1,
+            recipient_rate=0.1,
+            recipient_burst=1,
+        )
+
+        tasks = [
+            asyncio.create_task(scheduler.acquire('987654321', 'a'))
+            for _ in range(30)
+        ]
+        await asyncio.sleep(0)
+
+        start = time.monotonic()
+        await scheduler.acquire('987654321', 'b')
+
+        self.assertLess(time.monotonic() - start, 0.2)
+
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.assertEqual(scheduler.queue_depth, 0)
+
+    async def test_acquire_cancelled(self):
+        """
+        Tests cancelled messages give their tokens back, so the following
+        messages don't wait for them
+        """
+        scheduler = SendScheduler(recipient_rate=10, recipient_burst=1)
+        await scheduler.acquire('987654321', '123456789')
+
+        tasks = [
+            asyncio.create_task(scheduler.acquire('987654321', '123456789'))
+            for _ in range(5)
+        ]
+        await asyncio.sleep(0)
+
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        start = time.monotonic()
+        await scheduler.acquire('987654321', '123456789')
+
+        self.assertLess(time.monotonic() - start, 0.3)
+        self.assertEqual(scheduler.queue_depth, 0)
@@ -0,0 +1,256 @@
+# pylint: disable=protected-access
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+from rasa_whatsapp_connector.registry import ConverterRegistry
+from rasa_whatsapp_connector.retry import CircuitBreaker
+
+
+def _prepare_hook(*values):
+    return {"entry": [{"changes": [{"value": value} for value in values]}]}
+
+
+def _prepare_value(phone_number_id: str, sender_id: str, text: str):
+    return {
+        "metadata": {
+            "phone_number_id": phone_number_id
+        },
+        "messages":
+            [{
+                "from": sender_id,
+                "type": "text",
+                "text": {
+                    "body": text
+                }
+            }]
+    }
+
+
+class TestConverterRegistry(unittest.TestCase):
+    """
+    Tests the ConverterRegistry class
+    """
+    def setUp(self):
+        self._registry = ConverterRegistry()
+        self._registry.load(
+            [
+                {
+                    'phone_identifier': '111',
+                    'token': 'token_1'
+                },
+                {
+                    'phone_identifier': '222',
+                    'token': 'token_2'
+                },
+            ]
+        )
+
+    def test_get(self):
+        """
+        Tests getting the converter of a phone number
+        """
+        self.assertEqual(len(self._registry), 2)
+        self.assertIn('111', self._registry)
+        self.assertEqual(self._registry.get('222').phone_identifier, '222')
+        self.assertIsNone(self._registry.get('333'))
+
+    def test_load_keeps_unchanged_converters(self):
+        """
+        Tests reloading keeps the converters of unchanged tenants
+        """
+        first = self._registry.get('111')
+        second = self._registry.get('222')
+
+        self._registry.load(
+            [
+                {
+                    'phone_identifier': '111',
+                    'token': 'token_1'
+                },
+                {
+                    'phone_identifier': '222',
+                    'token': 'new_token'
+                },
+            ]
+        )
+
+        self.assertIs(self._registry.get('111'), first)
+        self.assertIsNot(self._registry.get('222'), second)
+
+        self._registry.load([{'phone_identifier': '222', 'token': 'new_token'}])
+        self.assertIsNone(self._registry.get('111'))
+
+        self.assertRaises(
+            ValueError,
+            self._registry.load,
+            [{
+                'phone_identifier': '111'
+            }],
+        )
+        self.assertEqual(len(self._registry), 1)
+
+    def test_circuit_breaker_per_tenant(self):
+        """
+        Tests every phone number gets its own circuit breaker
+        """
+        registry = ConverterRegistry(circuit_breaker_factory=CircuitBreaker)
+        registry.load(
+            [
+                {
+                    'phone_identifier': '111',
+                    'token': 'token_1'
+                },
+                {
+                    'phone_identifier': 222,
+                    'token': 'token_2'
+                },
+            ]
+        )
+        first = registry.get('111')._circuit_breaker
+        second = registry.get('222')._circuit_breaker
+
+        self.assertIsInstance(first, CircuitBreaker)
+        self.assertIsInstance(second, CircuitBreaker)
+        self.assertIsNot(first, second)
+
+    def test_iter_inbound_messages_from_whatsapp_hook(self):
+        """
+        Tests routing the messages of a hook call to their converters
+        """
+        data = _prepare_hook(
+            _prepare_value('111', '1', 'a'),
+            _prepare_value('333', '2', 'b'),
+            _prepare_value('222', '3', 'c'),
+        )
+
+        with self.assertLogs('rasa_whatsapp_connector.registry', 'WARNING'):
+            routed = [
+                (converter.phone_identifier, message.text)
+                for converter, message in
+                self._registry.iter_inbound_messages_from_whatsapp_hook(data)
+            ]
+
+        self.assertEqual(routed, [('111', 'a'), ('222', 'c')])
+
+    def test_iter_inbound_messages_from_malformed_whatsapp_hook(self):
+        """
+        Tests values with malformed metadata or messages are skipped
+        """
+        data = _prepare_hook(
+            {
+                "metadata": 5,
+                "messages": [{}]
+            },
+            {
+                "metadata": {
+                    "phone_number_id": ["111"]
+                },
+                "messages": 3
+            },
+            {
+                "metadata": {
+                    "phone_number_id": "111"
+                },
+                "messages": [5]
+            },
+            _prepare_value('111', '1', 'a'),
+        )
+
+        with self.assertLogs('rasa_whatsapp_connector.registry', 'WARNING'):
+            routed = [
+                (converter.phone_identifier, message.text)
+                for converter, message in
+                self._registry.iter_inbound_messages_from_whatsapp_hook(data)
+            ]
+
+        self.assertEqual(routed, [('111', 'a')])
+
+    def test_load_file(self):
+        """
+        Tests loading the tenants from a file
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'tenants.json')
+
+            with open(path, 'w', encoding='utf-8') as tenants_file:
+                json.dump(
+                    {
+                        'tenants':
+                            [{
+                                'phone_identifier': 333,
+                                'token': 'token_3'
+                            }]
+                    },
+                    tenants_file,
+                )
+
+            self._registry.load_file(path)
+
+            with open(path, 'w', encoding='utf-8') as tenants_file:
+                json.dump({'tenants': 'invalid'}, tenants_file)
+
+            self.assertRaises(ValueError, self._registry.load_file, path)
+
+        self.assertEqual(len(self._registry), 1)
+        self.assertIn('333', self._registry)
+
+
+class TestConverterRegistryWatch(unittest.IsolatedAsyncioTestCase):
+    """
+    Tests hot reloading the tenants of a ConverterRegistry
+    """
+    async def test_watch_file(self):
+        """
+        Tests the tenants are reloaded when the file changes
+        """
+        registry = ConverterRegistry()
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'tenants.json')
+
+            def write_tenants(tenants):
+                with open(path, 'w', encoding='utf-8') as tenants_file:
+                    json.dump(tenants, tenants_file)
+
+            write_tenants([{'phone_identifier': '111', 'token': 'token_1'}])
+
+            task = asyncio.create_task(registry.watch_file(path, 0.01))
+            await asyncio.sleep(0.05)
+            self.assertIn('111', registry)
+
+            write_tenants([{'phone_identifier': '222', 'token': 'token_2'}])
+            os.utime(path, ns=(0, 1))
+            await asyncio.sleep(0.05)
+            self.assertIn('222', registry)
+            self.assertNotIn('111', registry)
+
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def test_watch_invalid_file(self):
+        """
+        Tests an invalid file is reported once and the tenants are kept
+        """
+        registry = ConverterRegistry()
+        registry.load([{'phone_identifier': '111', 'token': 'token_1'}])
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'tenants.json')
+
+            with open(path, 'w', encoding='utf-8') as tenants_file:
+                tenants_file.write('{')
+
+            with self.assertLogs(
+                'rasa_whatsapp_connector.registry',
+                'ERROR',
+            ) as logs:
+                task = asyncio.create_task(registry.watch_file(path, 0.01))
+                await asyncio.sleep(0.05)
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn('111', registry)
@@ -0,0 +1,317 @@
+import asyncio
+import unittest
+
+from mock import MagicMock, AsyncMock, patch
+
+from rasa_whatsapp_connector.retry import (
+    CircuitBreaker,
+    CircuitOpenError,
+    GraphApiError,
+    RetryPolicy,
+    call_with_retry,
+    call_with_retry_async,
+    raise_for_graph_error,
+)
+
+
+class TestGraphApiError(unittest.TestCase):
+    """
+    Tests classifying Graph Api errors
+    """
+    def test_raise_for_graph_error(self):
+        """
+        Tests raising the error of a response
+        """
+        raise_for_graph_error(200, {'messages': [{'id': 'wamid.1'}]})
+
+        with self.assertRaises(GraphApiError) as context:
+            raise_for_graph_error(
+                400,
+                {'error': {
+                    'message': 'Invalid parameter',
+                    'code': 100
+                }},
+            )
+
+        self.assertEqual(context.exception.status, 400)
+        self.assertEqual(context.exception.code, 100)
+        self.assertEqual(str(context.exception), 'Invalid parameter')
+
+        self.assertRaises(GraphApiError, raise_for_graph_error, 502, None)
+
+    def test_retryable(self):
+        """
+        Tests which errors are retryable
+        """
+        self.assertTrue(GraphApiError(400, {'code': 131056}).retryable)
+        self.assertTrue(GraphApiError(400, {'code': 130429}).retryable)
+        self.assertTrue(GraphApiError(429, {}).retryable)
+        self.assertTrue(GraphApiError(503, {}).retryable)
+        self.assertFalse(GraphApiError(400, {'code': 100}).retryable)
+        self.assertFalse(GraphApiError(401, {'code': 190}).retryable)
+
+
+class TestRetryPolicy(unittest.TestCase):
+    """
+    Tests the RetryPolicy class
+    """
+    def test_get_delay(self):
+        """
+        Tests delays grow exponentially up to the maximum
+        """
+        policy = RetryPolicy(base_delay=1, max_delay=5)
+
+        with patch('random.uniform', side_effect=lambda a, b: b):
+            self.assertEqual(policy.get_delay(1), 1)
+            self.assertEqual(policy.get_delay(2), 2)
+            self.assertEqual(policy.get_delay(3), 4)
+            self.assertEqual(policy.get_delay(4), 5)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """
+    Tests the CircuitBreaker class
+    """
+    @patch('time.monotonic')
+    def test_open_and_reset(self, monotonic_mock):
+        """
+        Tests the circuit opens after consecutive failures and lets a
+        trial call through after the reset timeout
+        """
+        monotonic_mock.return_value = 0
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+
+        breaker.before_call()
+        breaker.record_failure()
+        self.assertFalse(breaker.open)
+
+        breaker.record_failure()
+        self.assertTrue(breaker.open)
+        self.assertRaises(CircuitOpenError, breaker.before_call)
+
+        monotonic_mock.return_value = 11
+        breaker.before_call()
+        # Only one trial call at a time
+        self.assertRaises(CircuitOpenError, breaker.before_call)
+
+        breaker.record_failure()
+        self.assertRaises(CircuitOpenError, breaker.before_call)
+
+        monotonic_mock.return_value = 22
+        breaker.before_call()
+        breaker.record_success()
+        self.assertFalse(breaker.open)
+        breaker.before_call()
+
+
+class TestCallWithRetry(unittest.TestCase):
+    """
+    Tests the call_with_retry function
+    """
+    def setUp(self):
+        self._policy = RetryPolicy(max_attempts=3, base_delay=0, max_delay=0)
+
+    def test_retry_until_success(self):
+        """
+        Tests retryable errors are retried
+        """
+        call = MagicMock(
+            side_effect=[
+                GraphApiError(503, {}),
+                ConnectionError(),
+                {
+                    'messages': []
+                },
+            ]
+        )
+
+        result = call_with_retry(
+            call,
+            self._policy,
+            None,
+            1,
+            (ConnectionError, ),
+        )
+
+        self.assertEqual(result, {'messages': []})
+        self.assertEqual(call.call_count, 3)
+
+    def test_permanent_error(self):
+        """
+        Tests permanent errors aren't retried
+        """
+        call = MagicMock(side_effect=GraphApiError(400, {'code': 100}))
+
+        self.assertRaises(
+            GraphApiError,
+            call_with_retry,
+            call,
+            self._policy,
+            None,
+            1,
+        )
+        self.assertEqual(call.call_count, 1)
+
+        call = MagicMock(side_effect=KeyError())
+        self.assertRaises(
+            KeyError,
+            call_with_retry,
+            call,
+            self._policy,
+            None,
+            1,
+        )
+        self.assertEqual(call.call_count, 1)
+
+    def test_max_attempts(self):
+        """
+        Tests giving up after the maximum number of attempts
+        """
+        call = MagicMock(side_effect=GraphApiError(503, {}))
+
+        self.assertRaises(
+            GraphApiError,
+            call_with_retry,
+            call,
+            self._policy,
+            None,
+            1,
+        )
+        self.assertEqual(call.call_count, 3)
+
+    def test_deadline(self):
+        """
+        Tests attempts are given the time left before the deadline
+        """
+        call = MagicMock(side_effect=GraphApiError(503, {}))
+        policy = RetryPolicy(max_attempts=10, base_delay=1, max_delay=1)
+
+        with patch('random.uniform', return_value=0.6):
+            self.assertRaises(
+                GraphApiError,
+                call_with_retry,
+                call,
+                policy,
+                None,
+                1,
+            )
+
+        self.assertEqual(call.call_count, 2)
+        self.assertAlmostEqual(call.call_args_list[0].args[0], 1, places=2)
+        self.assertLess(call.call_args_list[1].args[0], 0.5)
+
+    def test_circuit_breaker(self):
+        """
+        Tests failing fast once the circuit is open
+        """
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        call = MagicMock(side_effect=GraphApiError(503, {}))
+
+        self.assertRaises(
+            CircuitOpenError,
+            call_with_retry,
+            call,
+            self._policy,
+            breaker,
+            1,
+        )
+        self.assertEqual(call.call_count, 2)
+
+        self.assertRaises(
+            CircuitOpenError,
+            call_with_retry,
+            call,
+            self._policy,
+            breaker,
+            1,
+        )
+        self.assertEqual(call.call_count, 2)
+
+
+class TestCallWithRetryAsync(unittest.IsolatedAsyncioTestCase):
+    """
+    Tests the call_with_retry_async function
+    """
+    async def test_retry_until_success(self):
+        """
+        Tests retryable errors are retried
+        """
+        policy = RetryPolicy(max_attempts=3, base_delay=0, max_delay=0)
+        call = AsyncMock(
+            side_effect=[
+                GraphApiError(400, {'code': 131056}), {
+                    'messages': []
+                }
+            ]
+        )
+
+        result = await call_with_retry_async(call, policy, None, 1)
+
+        self.assertEqual(result, {'messages': []})
+        self.assertEqual(call.await_count, 2)
+
+    async def _open_circuit(self, breaker: CircuitBreaker):
+        policy = RetryPolicy(max_attempts=1)
+
+        with self.assertRaises(GraphApiError):
+            await call_with_retry_async(
+                AsyncMock(side_effect=GraphApiError(503, {})),
+                policy,
+                breaker,
+                1,
+            )
+
+        self.assertTrue(breaker.open)
+
+    async def test_cancelled_trial(self):
+        """
+        Tests a cancelled trial call lets another trial through
+        """
+        policy = RetryPolicy(max_attempts=1)
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        await self._open_circuit(breaker)
+
+        with self.assertRaises(asyncio.CancelledError):
+            await call_with_retry_async(
+                AsyncMock(side_effect=asyncio.CancelledError()),
+                policy,
+                breaker,
+                1,
+            )
+
+        result = await call_with_retry_async(
+            AsyncMock(return_value={'messages': []}),
+            policy,
+            breaker,
+            1,
+        )
+
+        self.assertEqual(result, {'messages': []})
+        self.assertFalse(breaker.open)
+
+    async def test_unclassified_error_trial(self):
+        """
+        Tests a trial call failing with an unclassified error counts as a
+        failure, not leaving the circuit stuck open
+        """
+        policy = RetryPolicy(max_attempts=1)
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        await self._open_circuit(breaker)
+
+        with self.assertRaises(KeyError):
+            await call_with_retry_async(
+                AsyncMock(side_effect=KeyError('messages')),
+                policy,
+                breaker,
+                1,
+            )
+
+        result = await call_with_retry_async(
+            AsyncMock(return_value={'messages': []}),
+            policy,
+            breaker,
+            1,
+        )
+
+        self.assertEqual(result, {'messages': []})
+        self.assertFalse(breaker.open)
@@ -0,0 +1,171 @@
+import asyncio
+import unittest
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from rasa_whatsapp_connector.sender import AsyncWhatsappSender
+
+
+class TestAsyncWhatsappSender(unittest.IsolatedAsyncioTestCase):
+    """
+    Tests the AsyncWhatsappSender class
+    """
+    async def asyncSetUp(self):
+        self._requests = []
+        self._peers = set()
+
+        async def handle_messages(request):
+            self._requests.append(
+                {
+                    'headers': dict(request.headers),
+                    'body': await request.json(),
+                }
+            )
+            self._peers.add(request.transport.get_extra_info('peername'))
+
+            return web.json_response({'messages': [{'id': 'wamid.1'}]})
+
+        async def handle_media(request):
+            form = await request.post()
+
+            # Uploaded files are spooled to a temporary file
+            with form['file'].file as media_file:
+                self._requests.append(
+                    {
+                        'headers': dict(request.headers),
+                        'body': media_file.read(),
+                    }
+                )
+
+            return web.json_response({'id': 'media.1'})
+
+        async def handle_download(request):
+            if request.headers.get('Authorization') != 'Bearer sample_token':
+                return web.json_response({}, status=401)
+
+            return web.Response(body=b'x' * 1000)
+
+        async def handle_slow(_):
+            await asyncio.sleep(2)
+
+            return web.json_response({})
+
+        app = web.Application()
+        app.router.add_post('/messages', handle_messages)
+        app.router.add_post('/slow', handle_slow)
+        app.router.add_get('/slow', handle_slow)
+        app.router.add_post('/media', handle_media)
+        app.router.add_get('/download', handle_download)
+
+        self._server = TestServer(app)
+        await self._server.start_server()
+
+        self._sender = AsyncWhatsappSender(api_timeout=0.3, pool_limit=1)
+
+    async def asyncTearDown(self):
+        await self._sender.close()
+        await self._server.close()
+
+    async def test_post(self):
+        """
+        Tests posting a message
+        """
+        url = str(self._server.make_url('/messages'))
+        headers = {'Authorization': 'Bearer sample_token'}
+        message = {'messaging_product': 'whatsapp', 'to': '123456789'}
+
+        response = await self._sender.post(url, headers, message)
+
+        self.assertEqual(response, {'messages': [{'id': 'wamid.1'}]})
+        self.assertEqual(self._requests[0]['body'], message)
+        self.assertEqual(
+            self._requests[0]['headers']['Authorization'],
+            'Bearer sample_token',
+        )
+
+    async def test_timeout(self):
+        """
+        Tests requests without a timeout of their own use the sender's one
+        """
+        url = str(self._server.make_url('/slow'))
+
+        with self.assertRaises(asyncio.TimeoutError):
+            await self._sender.post(url, {}, {})
+
+        with self.assertRaises(asyncio.TimeoutError):
+            await self._sender.get(url, {})
+
+        with self.assertRaises(asyncio.TimeoutError):
+            await self._sender.request(url, {}, {}, timeout=0.1)
+
+    async def test_post_reuses_connection(self):
+        """
+        Tests consecutive posts share the same pooled connection
+        """
+        url = str(self._server.make_url('/messages'))
+
+        for _ in range(5):
+            await self._sender.post(url, {}, {})
+
+        self.assertEqual(len(self._requests), 5)
+        self.assertEqual(len(self._peers), 1)
+
+    async def test_close(self):
+        """
+        Tests closing the sender and reopening it on the next post
+        """
+        url = str(self._server.make_url('/messages'))
+
+        self.assertTrue(self._sender.closed)
+
+        await self._sender.post(url, {}, {})
+        self.assertFalse(self._sender.closed)
+
+        await self._sender.close()
+        self.assertTrue(self._sender.closed)
+
+        await self._sender.post(url, {}, {})
+        self.assertFalse(self._sender.closed)
+
+    async def test_upload(self):
+        """
+        Tests posting a multipart form
+        """
+        url = str(self._server.make_url('/media'))
+        form = aiohttp.FormData()
+        form.add_field('file', b'content', filename='file.txt')
+
+        status, response = await self._sender.upload(url, {}, form)
+
+        self.assertEqual(status, 200)
+        self.assertEqual(response, {'id': 'media.1'})
+        self.assertEqual(self._requests[0]['body'], b'content')
+
+    async def test_download(self):
+        """
+        Tests downloading a file in chunks
+        """
+        url = str(self._server.make_url('/download'))
+        chunks = []
+
+        async def handle_chunk(chunk):
+            chunks.append(chunk)
+
+        status = await self._sender.download(
+            url,
+            {'Authorization': 'Bearer sample_token'},
+            handle_chunk,
+            chunk_size=100,
+        )
+
+        self.assertEqual(status, 200)
+        self.assertEqual(b''.join(chunks), b'x' * 1000)
+        self.assertTrue(all(len(chunk) <= 100 for chunk in chunks))
+
+        chunks.clear()
+        status = await self._sender.download(url, {}, handle_chunk)
+
+        self.assertEqual(status, 401)
+        self.assertEqual(chunks, [])
@@ -0,0 +1,153 @@
+import json
+import unittest
+
+from rasa_whatsapp_connector import serialization
+from rasa_whatsapp_connector.serialization import (
+    JsonSerializer,
+    MsgspecSerializer,
+    OrjsonSerializer,
+)
+
+HOOK = {
+    "object":
+        "whatsapp_business_account",
+    "entry":
+        [
+            {
+                "id":
+                    "1",
+                "changes":
+                    [
+                        {
+                            "field": "messages",
+                            "value":
+                                {
+                                    "messaging_product":
+                                        "whatsapp",
+                                    "metadata":
+                                        {
+                                            "display_phone_number": "1555",
+                                            "phone_number_id": "987654321"
+                                        },
+                                    "contacts":
+                                        [
+                                            {
+                                                "profile": {
+                                                    "name": "Sample"
+                                                },
+                                                "wa_id": "12345678"
+                                            }
+                                        ],
+                                    "messages":
+                                        [
+                                            {
+                                                "from": "12345678",
+                                                "id": "wamid.1",
+                                                "timestamp": "1700000000",
+                                                "type": "text",
+                                                "text": {
+                                                    "body": "hello ñ"
+                                                }
+                                            }
+                                        ]
+                                }
+                        }
+                    ]
+            }
+        ]
+}
+
+
+class TestSerializers(unittest.TestCase):
+    """
+    Tests every available serializer
+    """
+    def _get_serializers(self):
+        serializers = [JsonSerializer()]
+
+        if serialization.orjson is not None:
+            serializers.append(OrjsonSerializer())
+
+        if serialization.msgspec is not None:
+            serializers.append(MsgspecSerializer())
+
+        return serializers
+
+    def test_dumps_and_loads(self):
+        """
+        Tests encoding and decoding values
+        """
+        value = {'to': '123', 'text': {'body': 'hello "ñ"'}, 'list': [1, 2]}
+
+        for serializer in self._get_serializers():
+            encoded = serializer.dumps(value)
+
+            self.assertIsInstance(encoded, bytes)
+            self.assertEqual(json.loads(encoded), value)
+            self.assertEqual(serializer.loads(encoded), value)
+            self.assertRaises(ValueError, serializer.loads, b'{invalid')
+
+    def test_decode_webhook(self):
+        """
+        Tests decoding a hook call keeps the fields the converter reads
+        """
+        data = json.dumps(HOOK).encode()
+
+        for serializer in self._get_serializers():
+            hook = serializer.decode_webhook(data)
+            value = hook["entry"][0]["changes"][0]["value"]
+
+            self.assertEqual(
+                value["messages"],
+                HOOK["entry"][0]["changes"][0]["value"]["messages"]
+            )
+            self.assertEqual(value["metadata"]["phone_number_id"], "987654321")
+
+    def test_decode_webhook_unknown_fields(self):
+        """
+        Tests decoding a hook call keeps the fields the converter doesn't
+        read, so the raw messages are the ones Meta sent
+        """
+        message = {
+            "from": "12345678",
+            "id": "wamid.2",
+            "type": "text",
+            "text": {
+                "body": "yes"
+            },
+            "context": {
+                "from": "987654321",
+                "id": "wamid.1"
+            },
+            "referral": {
+                "source_type": "ad"
+            },
+            "unknown": [1, {
+                "nested": True
+            }],
+        }
+        hook = {"entry": [{"changes": [{"value": {"messages": [message]}}]}]}
+        data = json.dumps(hook).encode()
+
+        for serializer in self._get_serializers():
+            self.assertEqual(serializer.decode_webhook(data), hook)
+            self.assertEqual(
+                serializer.decode_webhook(b'{"entry": "invalid"}'),
+                {"entry": "invalid"},
+            )
+
+    def test_set_serializer(self):
+        """
+        Tests replacing the serializer used by the connector
+        """
+        default = serialization.get_serializer()
+
+        try:
+            serialization.set_serializer(JsonSerializer())
+            self.assertIsInstance(
+                serialization.get_serializer(),
+                JsonSerializer,
+            )
+            self.assertEqual(serialization.dumps({'a': 1}), b'{"a":1}')
+        finally:
+            serialization.set_serializer(default)
@@ -0,0 +1,76 @@
+import hashlib
+import hmac
+import unittest
+
+from rasa_whatsapp_connector.signature import (
+    WebhookSignatureVerifier,
+    verify_subscription,
+)
+
+BODY = b'{"object":"whatsapp_business_account","entry":[]}'
+
+
+class TestWebhookSignatureVerifier(unittest.TestCase):
+    """
+    Tests the WebhookSignatureVerifier class
+    """
+    def setUp(self):
+        self._verifier = WebhookSignatureVerifier('app_secret')
+        digest = hmac.new(b'app_secret', BODY, hashlib.sha256).hexdigest()
+        self._signature = f'sha256={digest}'
+
+    def test_get_signature(self):
+        """
+        Tests bodies are signed like Meta does
+        """
+        self.assertEqual(self._verifier.get_signature(BODY), self._signature)
+        # The keyed hmac is copied, not consumed
+        self.assertEqual(self._verifier.get_signature(BODY), self._signature)
+
+    def test_verify(self):
+        """
+        Tests only the signature of the raw body is accepted
+        """
+        self.assertTrue(self._verifier.verify(BODY, self._signature))
+        self.assertFalse(self._verifier.verify(BODY + b' ', self._signature))
+        self.assertFalse(self._verifier.verify(BODY, self._signature.upper()))
+        self.assertFalse(self._verifier.verify(BODY, 'sha256=zz'))
+        self.assertFalse(self._verifier.verify(BODY, 'sha1=00'))
+        self.assertFalse(self._verifier.verify(BODY, None))
+
+
+class TestVerifySubscription(unittest.TestCase):
+    """
+    Tests the verify_subscription function
+    """
+    def test_verify_subscription(self):
+        """
+        Tests the challenge is only answered with the verify token
+        """
+        args = {
+            'hub.mode': 'subscribe',
+            'hub.verify_token': 'verify',
+            'hub.challenge': '1158201444',
+        }
+
+        self.assertEqual(verify_subscription(args, 'verify'), '1158201444')
+        self.assertIsNone(verify_subscription(args, 'other'))
+        self.assertIsNone(
+            verify_subscription({
+                **args, 'hub.mode': 'unsubscribe'
+            }, 'verify')
+        )
+        self.assertIsNone(verify_subscription({}, 'verify'))
+
+    def test_without_verify_token(self):
+        """
+        Tests every subscription is refused without a verify token
+        """
+        args = {
+            'hub.mode': 'subscribe',
+            'hub.verify_token': 'verify',
+            'hub.challenge': '1158201444',
+        }
+
+        self.assertIsNone(verify_subscription(args, None))
+        self.assertIsNone(verify_subscription({'hub.mode': 'subscribe'}, None))
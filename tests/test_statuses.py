@@ -0,0 +1,244 @@
+import asyncio
+import unittest
+
+from rasa_whatsapp_connector.statuses import (
+    BatchingStatusSink,
+    DeliveryLatencyAggregator,
+    StatusEvent,
+    classify_whatsapp_hook,
+    iter_statuses_from_whatsapp_hook,
+)
+from tests.helpers import MALFORMED_HOOKS, ListStatusSink
+
+
+def _prepare_status(message_id: str, status: str, timestamp: str):
+    return {
+        "id": message_id,
+        "recipient_id": "12345678",
+        "status": status,
+        "timestamp": timestamp,
+    }
+
+
+HOOK = {
+    "entry":
+        [
+            {
+                "changes":
+                    [
+                        {
+                            "value":
+                                {
+                                    "metadata": {
+                                        "phone_number_id": "987654321"
+                                    },
+                                    "statuses":
+                                        [
+                                            _prepare_status(
+                                                "wamid.1", "sent", "100"
+                                            ),
+                                            _prepare_status(
+                                                "wamid.1", "delivered", "103"
+                                            ),
+                                        ]
+                                }
+                        }, {
+                            "value": {
+                                "errors": [{
+                                    "code": 131000
+                                }]
+                            }
+                        }
+                    ]
+            }
+        ]
+}
+
+
+class TestStatuses(unittest.TestCase):
+    """
+    Tests classifying hook calls and reading their statuses
+    """
+    def test_classify_whatsapp_hook(self):
+        """
+        Tests counting the messages, statuses and errors of hook calls
+        """
+        classification = classify_whatsapp_hook(HOOK)
+
+        self.assertEqual(classification.messages, 0)
+        self.assertEqual(classification.statuses, 2)
+        self.assertEqual(classification.errors, 1)
+
+        for data in (
+            {},
+            {
+                "entry": []
+            },
+            {
+                "entry": [{}]
+            },
+            None,
+            *MALFORMED_HOOKS,
+        ):
+            classification = classify_whatsapp_hook(data)
+            self.assertEqual(classification.messages, 0)
+            self.assertEqual(classification.statuses, 0)
+
+    def test_iter_statuses_from_malformed_whatsapp_hook(self):
+        """
+        Tests malformed statuses and metadata are skipped
+        """
+        data = {
+            "entry":
+                [
+                    {
+                        "changes":
+                            [
+                                {
+                                    "value": {
+                                        "statuses": 3
+                                    }
+                                }, {
+                                    "value":
+                                        {
+                                            "metadata":
+                                                5,
+                                            "statuses":
+                                                [
+                                                    "status",
+                                                    _prepare_status(
+                                                        "wamid.1", "sent", "100"
+                                                    ),
+                                                ]
+                                        }
+                                }
+                            ]
+                    }
+                ]
+        }
+
+        self.assertEqual(
+            list(iter_statuses_from_whatsapp_hook(data)),
+            [StatusEvent("wamid.1", "12345678", "sent", 100)],
+        )
+
+    def test_iter_statuses_from_whatsapp_hook(self):
+        """
+        Tests iterating over the statuses of a hook call
+        """
+        events = list(iter_statuses_from_whatsapp_hook(HOOK))
+
+        self.assertEqual(
+            events,
+            [
+                StatusEvent("wamid.1", "12345678", "sent", 100, "987654321"),
+                StatusEvent(
+                    "wamid.1", "12345678", "delivered", 103, "987654321"
+                ),
+            ],
+        )
+
+
+class TestDeliveryLatencyAggregator(unittest.TestCase):
+    """
+    Tests the DeliveryLatencyAggregator class
+    """
+    def test_add(self):
+        """
+        Tests aggregating delivery latencies per recipient
+        """
+        aggregator = DeliveryLatencyAggregator()
+
+        for event in iter_statuses_from_whatsapp_hook(HOOK):
+            aggregator.add(event)
+
+        aggregator.add(StatusEvent("wamid.1", "12345678", "read", 110))
+        aggregator.add(StatusEvent("wamid.2", "12345678", "sent", 200))
+        aggregator.add(StatusEvent("wamid.2", "12345678", "delivered", 205))
+        # Never seen as sent
+        aggregator.add(StatusEvent("wamid.3", "12345678", "delivered", 300))
+
+        self.assertEqual(
+            aggregator.get_stats("12345678"),
+            {
+                'delivered': {
+                    'count': 2,
+                    'average': 4,
+                    'max': 5
+                },
+                'read': {
+                    'count': 1,
+                    'average': 10,
+                    'max': 10
+                },
+            },
+        )
+        self.assertEqual(aggregator.get_stats("other"), {})
+
+    def test_max_tracked_recipients(self):
+        """
+        Tests the recipients with the least recent deliveries are dropped
+        """
+        aggregator = DeliveryLatencyAggregator(max_tracked_recipients=2)
+
+        for index, recipient_id in enumerate(('a', 'b', 'a', 'c')):
+            message_id = f"wamid.{index}"
+            aggregator.add(StatusEvent(message_id, recipient_id, "sent", 100))
+            aggregator.add(
+                StatusEvent(message_id, recipient_id, "delivered", 101)
+            )
+
+        self.assertEqual(aggregator.get_stats("b"), {})
+        self.assertEqual(aggregator.get_stats("a")['delivered']['count'], 2)
+        self.assertEqual(aggregator.get_stats("c")['delivered']['count'], 1)
+
+
+class TestBatchingStatusSink(unittest.IsolatedAsyncioTestCase):
+    """
+    Tests the BatchingStatusSink class
+    """
+    async def test_batches(self):
+        """
+        Tests statuses are handed over when a batch is full or later
+        """
+        sink = ListStatusSink()
+        batching_sink = BatchingStatusSink(
+            sink,
+            batch_size=2,
+            flush_interval=0.01,
+        )
+        events = list(iter_statuses_from_whatsapp_hook(HOOK))
+
+        batching_sink.add(events[0])
+        batching_sink.add(events[1])
+        batching_sink.add(events[0])
+        await asyncio.sleep(0)
+
+        self.assertEqual(sink.batches, [events])
+        self.assertEqual(batching_sink.pending, 1)
+
+        await asyncio.sleep(0.05)
+
+        self.assertEqual(sink.batches, [events, [events[0]]])
+        self.assertEqual(batching_sink.pending, 0)
+
+    async def test_close(self):
+        """
+        Tests closing hands over the pending statuses and waits for the
+        batches being handled
+        """
+        sink = ListStatusSink()
+        batching_sink = BatchingStatusSink(
+            sink,
+            batch_size=2,
+            flush_interval=60,
+        )
+        events = list(iter_statuses_from_whatsapp_hook(HOOK))
+
+        batching_sink.add(events[0])
+        batching_sink.add(events[1])
+        batching_sink.add(events[0])
+        await batching_sink.close()
+
+        self.assertEqual(sink.batches, [[events[0]], events])
+        self.assertEqual(batching_sink.pending, 0)
@@ -0,0 +1,242 @@
+import json
+import os
+import tempfile
+import unittest
+
+from mock import AsyncMock
+
+from rasa_whatsapp_connector.outbox import SqliteOutbox
+from rasa_whatsapp_connector.retry import GraphApiError, RetryPolicy
+from rasa_whatsapp_connector.templates import MessageTemplate
+from rasa_whatsapp_connector.whatsapp import RasaToWhatsappConverter
+from tests.helpers import get_error_response, get_sent_response
+
+COMPONENTS = [
+    {
+        'type': 'header',
+        'parameters': [{
+            'type': 'image',
+            'image': {
+                'link': '{{image}}'
+            }
+        }]
+    },
+    {
+        'type':
+            'body',
+        'parameters':
+            [
+                {
+                    'type': 'text',
+                    'text': '{{ name }}'
+                }, {
+                    'type': 'text',
+                    'text': '{{order}}'
+                }
+            ]
+    },
+    {
+        'type': 'button',
+        'sub_type': 'url',
+        'index': '0',
+        'parameters': [{
+            'type': 'text',
+            'text': '{{order}}'
+        }]
+    },
+]
+PARAMETERS = {
+    'image': 'https://example.com/parcel.png',
+    'name': 'Ana "Ani"',
+    'order': '42',
+}
+
+
+class TestMessageTemplate(unittest.TestCase):
+    """
+    Tests the MessageTemplate class
+    """
+    def test_parameters(self):
+        """
+        Tests the parameters of a template are found once each, in order
+        """
+        template = MessageTemplate('order_shipped', COMPONENTS)
+
+        self.assertEqual(template.parameters, ('image', 'name', 'order'))
+
+    def test_build(self):
+        """
+        Tests parameters are bound into the components
+        """
+        template = MessageTemplate('order_shipped', COMPONENTS, 'es')
+        message = template.build('123', PARAMETERS)
+
+        self.assertEqual(message['to'], '123')
+        self.assertEqual(message['type'], 'template')
+        self.assertEqual(message['template']['name'], 'order_shipped')
+        self.assertEqual(message['template']['language'], {'code': 'es'})
+        self.assertEqual(
+            message['template']['components'][1]['parameters'][0]['text'],
+            'Ana "Ani"',
+        )
+        self.assertEqual(
+            message['template']['components'][2]['parameters'][0]['text'],
+            '42',
+        )
+        # The registered components are left untouched
+        self.assertEqual(
+            COMPONENTS[1]['parameters'][1]['text'],
+            '{{order}}',
+        )
+
+    def test_encode(self):
+        """
+        Tests encoding gives the same payload as building
+        """
+        template = MessageTemplate('order_shipped', COMPONENTS)
+
+        for to in ('123', '456'):
+            self.assertEqual(
+                json.loads(template.encode(to, PARAMETERS)),
+                template.build(to, PARAMETERS),
+            )
+
+    def test_without_components(self):
+        """
+        Tests templates without parameters
+        """
+        template = MessageTemplate('hello_world')
+
+        self.assertEqual(
+            json.loads(template.encode('123')),
+            {
+                'messaging_product': 'whatsapp',
+                'to': '123',
+                'type': 'template',
+                'template':
+                    {
+                        'name': 'hello_world',
+                        'language': {
+                            'code': 'en_US'
+                        }
+                    }
+            },
+        )
+
+    def test_missing_parameter(self):
+        """
+        Tests a missing parameter is an error
+        """
+        template = MessageTemplate('order_shipped', COMPONENTS)
+
+        with self.assertRaises(ValueError):
+            template.encode('123', {'name': 'Ana'})
+
+
+class TestTemplateMessages(unittest.IsolatedAsyncioTestCase):
+    """
+    Tests sending template messages with the RasaToWhatsappConverter class
+    """
+    def setUp(self):
+        self._async_sender = AsyncMock()
+        self._converter = RasaToWhatsappConverter(
+            '987654321',
+            'sample_token',
+            async_sender=self._async_sender,
+            retry_policy=RetryPolicy(max_attempts=1),
+        )
+        self._converter.register_template('order_shipped', COMPONENTS)
+
+    def test_unknown_template(self):
+        """
+        Tests preparing a template that isn't registered is an error
+        """
+        with self.assertRaises(ValueError):
+            self._converter.prepare_template_message('123', 'unknown')
+
+        with self.assertRaises(ValueError):
+            self._converter.prepare_template_message(
+                '123',
+                'order_shipped',
+                PARAMETERS,
+                'es',
+            )
+
+    async def test_send_template_async(self):
+        """
+        Tests sending a template message
+        """
+        self._async_sender.request.return_value = (200, {'messages': []})
+
+        await self._converter.send_template_async(
+            '123',
+            'order_shipped',
+            PARAMETERS,
+        )
+
+        body = self._async_sender.request.await_args.args[2]
+        self.assertEqual(
+            json.loads(body),
+            self._converter.prepare_template_message(
+                '123',
+                'order_shipped',
+                PARAMETERS,
+            ),
+        )
+
+    async def test_send_templates_async(self):
+        """
+        Tests bulk sends give a result per recipient, in order
+        """
+        self._async_sender.request.side_effect = [
+            get_sent_response(),
+            get_error_response(131026),
+        ]
+
+        results = await self._converter.send_templates_async(
+            'order_shipped',
+            [
+                ('123', PARAMETERS),
+                ('456', PARAMETERS),
+                ('789', {
+                    'name': 'Ana'
+                }),
+            ],
+            concurrency=1,
+        )
+
+        self.assertTrue(results[0].ok)
+        self.assertIsInstance(results[1].error, GraphApiError)
+        self.assertIsInstance(results[2].error, ValueError)
+        self.assertEqual(self._async_sender.request.await_count, 2)
+
+    async def test_send_templates_async_idempotency_key(self):
+        """
+        Tests a recipient listed twice gets both messages, and resending
+        the campaign with the same key sends nothing again
+        """
+        self._async_sender.request.return_value = (200, {'messages': []})
+
+        with tempfile.TemporaryDirectory() as directory:
+            outbox = SqliteOutbox(os.path.join(directory, 'outbox.db'))
+            converter = RasaToWhatsappConverter(
+                '987654321',
+                'sample_token',
+                async_sender=self._async_sender,
+                outbox=outbox,
+            )
+            converter.register_template('order_shipped', COMPONENTS)
+            recipients = [('123', PARAMETERS), ('123', PARAMETERS)]
+
+            for _ in range(2):
+                results = await converter.send_templates_async(
+                    'order_shipped',
+                    recipients,
+                    idempotency_key='campaign',
+                )
+
+                self.assertTrue(all(result.ok for result in results))
+
+            await outbox.close()
+
+        self.assertEqual(self._async_sender.request.await_count, 2)
@@ -0,0 +1,135 @@
+import unittest
+
+from rasa_whatsapp_connector.core import WhatsappMessageConverter
+from rasa_whatsapp_connector.dedup import MessageDeduplicator
+from rasa_whatsapp_connector.loadtest.payloads import (
+    build_messages_hook,
+    build_statuses_hook,
+)
+from rasa_whatsapp_connector.serialization import dumps
+from rasa_whatsapp_connector.signature import WebhookSignatureVerifier
+from rasa_whatsapp_connector.statuses import BatchingStatusSink
+from rasa_whatsapp_connector.webhook import WebhookHandler
+from tests.helpers import ListStatusSink
+
+_CONVERTER = WhatsappMessageConverter('')
+
+
+class TestWebhookHandler(unittest.IsolatedAsyncioTestCase):
+    """
+    Tests the WebhookHandler class
+    """
+    def setUp(self):
+        self._dispatched = []
+        self._accept = True
+        self._deduplicator = MessageDeduplicator()
+        self._status_sink = ListStatusSink()
+        self._batching_sink = BatchingStatusSink(self._status_sink)
+        self._handler = WebhookHandler(
+            _CONVERTER.iter_inbound_messages_from_whatsapp_hook,
+            self._dispatch,
+            self._deduplicator,
+            'verify_token',
+            status_sink=self._batching_sink,
+        )
+
+    async def _dispatch(self, message):
+        if not self._accept:
+            return False
+
+        self._dispatched.append(message.message_id)
+        return True
+
+    def test_verify(self):
+        """
+        Tests the subscription handshake
+        """
+        args = {
+            'hub.mode': 'subscribe',
+            'hub.verify_token': 'verify_token',
+            'hub.challenge': '1158201444',
+        }
+
+        self.assertEqual(self._handler.verify(args), '1158201444')
+        self.assertIsNone(
+            self._handler.verify({
+                **args, 'hub.verify_token': 'wrong'
+            })
+        )
+
+    async def test_signature(self):
+        """
+        Tests hook calls are checked against their signature
+        """
+        handler = WebhookHandler(
+            _CONVERTER.iter_inbound_messages_from_whatsapp_hook,
+            self._dispatch,
+            self._deduplicator,
+            'verify_token',
+            'app_secret',
+        )
+        body = dumps(build_messages_hook('987654321', [('1', 'wamid.1', 'a')]))
+        signature = WebhookSignatureVerifier('app_secret').get_signature(body)
+
+        self.assertEqual(await handler.handle_hook(body, None), 403)
+        self.assertEqual(await handler.handle_hook(body, 'sha256=00'), 403)
+        self.assertEqual(self._dispatched, [])
+        self.assertEqual(await handler.handle_hook(body, signature), 200)
+        self.assertEqual(self._dispatched, ['wamid.1'])
+
+    async def test_invalid_body(self):
+        """
+        Tests bodies that aren't a json object are refused
+        """
+        self.assertEqual(await self._handler.handle_hook(b'{', None), 400)
+        self.assertEqual(await self._handler.handle_hook(b'[]', None), 400)
+
+    async def test_statuses(self):
+        """
+        Tests calls only carrying statuses go to the status sink
+        """
+        body = dumps(
+            build_statuses_hook('987654321', [('wamid.1', '1', 'delivered')])
+        )
+
+        self.assertEqual(await self._handler.handle_hook(body, None), 200)
+        self.assertEqual(self._dispatched, [])
+
+        await self._batching_sink.close()
+
+        self.assertEqual(len(self._status_sink.events), 1)
+        self.assertEqual(self._status_sink.events[0].status, 'delivered')
+
+    async def test_duplicate(self):
+        """
+        Tests redelivered messages are dispatched once
+        """
+        body = dumps(
+            build_messages_hook(
+                '987654321',
+                [('1', 'wamid.1', 'a'), ('1', 'wamid.1', 'a')],
+            )
+        )
+
+        self.assertEqual(await self._handler.handle_hook(body, None), 200)
+        self.assertEqual(await self._handler.handle_hook(body, None), 200)
+        self.assertEqual(self._dispatched, ['wamid.1'])
+
+    async def test_full(self):
+        """
+        Tests a message without room makes the call fail, and is accepted
+        again when redelivered
+        """
+        body = dumps(build_messages_hook('987654321', [('1', 'wamid.1', 'a')]))
+        self._accept = False
+
+        with self.assertLogs('rasa_whatsapp_connector.webhook', 'WARNING'):
+            self.assertEqual(await self._handler.handle_hook(body, None), 503)
+
+        self.assertFalse(await self._deduplicator.is_duplicate('wamid.1'))
+
+        await self._deduplicator.forget('wamid.1')
+        self._accept = True
+
+        self.assertEqual(await self._handler.handle_hook(body, None), 200)
+        self.assertEqual(self._dispatched, ['wamid.1'])
@@ -1,10 +1,15 @@
+# pylint: disable=protected-access
 from typing import Dict, Any
 
+import asyncio
+import json
 import unittest
 
-from mock import patch
+from mock import patch, AsyncMock, MagicMock
 
+from rasa_whatsapp_connector.retry import GraphApiError, RetryPolicy
 from rasa_whatsapp_connector.whatsapp import RasaToWhatsappConverter
+from tests.helpers import get_sent_response
 
 
 class TestWhatsappCloudApiConverter(unittest.TestCase):
@@ -209,7 +214,80 @@ class TestWhatsappCloudApiConverter(unittest.TestCase):
             expected,
         )
 
-    @patch('requests.post')
+    def test_prepare_message_body(self):
+        """
+        Tests preparing the json encoded body of a message
+        """
+        to = "123456789"
+        text = "Sample \"text\" message ñ"
+
+        buttons_below_limit = self._get_buttons_below_limit_interactive()
+        buttons_above_limit = self._get_buttons_above_limit_interactive()
+
+        sections = [
+            {
+                'title': f'Option {index}',
+                'payload': f'/option{index}',
+                'section': 'Drinks' if index < 3 else None,
+            } for index in range(5)
+        ]
+
+        for buttons in (
+            None,
+            buttons_below_limit,
+            buttons_above_limit,
+            sections,
+        ):
+            self.assertEqual(
+                json.loads(
+                    self._converter.prepare_message_body(to, text, buttons)
+                ),
+                self._converter.prepare_message(to, text, buttons),
+            )
+
+    def test_prepare_message_reuses_template(self):
+        """
+        Tests encoded interactive messages for the same buttons reuse their
+        template, and prepared messages don't share their action
+        """
+        buttons = self._get_buttons_below_limit_interactive()
+        menu = [
+            {
+                'title': f'Button {index}',
+                'payload': f'Payload {index}'
+            } for index in range(12)
+        ]
+
+        self._converter.prepare_message_body("1", "first", buttons)
+        self._converter.prepare_message_body("2", "second", buttons)
+        self._converter.prepare_message_body("1", "first", buttons[:2])
+
+        self.assertEqual(len(self._converter._templates), 2)
+
+        for items in (buttons, menu):
+            first = self._converter.prepare_message("1", "first", items)
+            second = self._converter.prepare_message("2", "second", items)
+
+            self.assertEqual(
+                first['interactive'], {
+                    **second['interactive'], 'body': {
+                        'text': 'first'
+                    }
+                }
+            )
+
+            first['interactive']['action'].clear()
+
+            self.assertTrue(second['interactive']['action'])
+            self.assertEqual(
+                self._converter.prepare_message("2", "second", items),
+                second,
+            )
+
+        self.assertEqual(second['to'], "2")
+        self.assertEqual(second['interactive']['body']['text'], "second")
+
+    @patch('requests.Session.post')
     def test_send_message(self, post_mock):
         """
         Tests sending a message
@@ -220,7 +298,7 @@ class TestWhatsappCloudApiConverter(unittest.TestCase):
         expected = self._get_expected_buttons_below_limit_interactive(to, text)
         expected_headers = {'Authorization': 'Bearer sample_token'}
         expected_url = f"""
-            https://graph.facebook.com/{self._graphql_api_version}{self._phone_identifier}/messages
+            https://graph.facebook.com/{self._graphql_api_version}/{self._phone_identifier}/messages
         """.strip()
 
         self._converter.send_message(to, text, buttons_below_limit)
@@ -232,6 +310,124 @@ class TestWhatsappCloudApiConverter(unittest.TestCase):
             timeout=self._timeout,
         )
 
+    @patch('requests.Session.close')
+    @patch('requests.Session.post')
+    def test_send_message_session(self, post_mock, close_mock):
+        """
+        Tests blocking sends share one session until the converter is
+        closed
+        """
+        self._converter.send_message("123456789", "first")
+        session = self._converter._session
+        self._converter.send_message("123456789", "second")
+
+        self.assertIsNotNone(session)
+        self.assertIs(self._converter._session, session)
+        self.assertEqual(post_mock.call_count, 2)
+
+        asyncio.run(self._converter.close())
+
+        close_mock.assert_called_once()
+        self.assertIsNone(self._converter._session)
+
+    @patch('requests.Session.post')
+    def test_send_message_retry(self, post_mock):
+        """
+        Tests sending a message with a retry policy
+        """
+        throttled = MagicMock(status_code=400)
+        throttled.json.return_value = {'error': {'code': 131056}}
+        invalid = MagicMock(status_code=400)
+        invalid.json.return_value = {'error': {'code': 100}}
+        sent = MagicMock(status_code=200)
+        sent.json.return_value = {'messages': [{'id': 'wamid.1'}]}
+        post_mock.side_effect = [throttled, sent, invalid]
+
+        converter = RasaToWhatsappConverter(
+            self._phone_identifier,
+            self._token,
+            self._graphql_api_version,
+            self._timeout,
+            retry_policy=RetryPolicy(base_delay=0, max_delay=0),
+        )
+
+        self.assertEqual(
+            converter.send_message("123456789", "sample text"),
+            {'messages': [{
+                'id': 'wamid.1'
+            }]},
+        )
+        self.assertEqual(post_mock.call_count, 2)
+
+        self.assertRaises(
+            GraphApiError,
+            converter.send_message,
+            "123456789",
+            "sample text",
+        )
+        self.assertEqual(post_mock.call_count, 3)
+
+    def test_send_message_async(self):
+        """
+        Tests sending a message through the pooled async sender
+        """
+        to = "123456789"
+        text = "This is a sample text message"
+        buttons_below_limit = self._get_buttons_below_limit_interactive()
+        expected = self._get_expected_buttons_below_limit_interactive(to, text)
+        expected_headers = {'Authorization': 'Bearer sample_token'}
+        expected_url = f"""
+            https://graph.facebook.com/{self._graphql_api_version}/{self._phone_identifier}/messages
+        """.strip()
+
+        async_sender = AsyncMock()
+        async_sender.request.return_value = get_sent_response()
+        converter = RasaToWhatsappConverter(
+            self._phone_identifier,
+            self._token,
+            self._graphql_api_version,
+            self._timeout,
+            async_sender=async_sender,
+        )
+
+        response = asyncio.run(
+            converter.send_message_async(to, text, buttons_below_limit)
+        )
+
+        self.assertEqual(response, {'messages': [{'id': 'wamid.1'}]})
+
+        url, headers, body = async_sender.request.call_args.args
+        self.assertEqual(url, expected_url)
+        self.assertEqual(headers, expected_headers)
+        self.assertEqual(json.loads(body), expected)
+
+        asyncio.run(converter.close())
+        async_sender.close.assert_awaited_once()
+
+    def test_send_message_async_scheduler(self):
+        """
+        Tests sending a message waits for the scheduler
+        """
+        async_sender = AsyncMock()
+        async_sender.request.return_value = (200, {'messages': []})
+        scheduler = AsyncMock()
+        converter = RasaToWhatsappConverter(
+            self._phone_identifier,
+            self._token,
+            self._graphql_api_version,
+            self._timeout,
+            async_sender=async_sender,
+            scheduler=scheduler,
+        )
+
+        asyncio.run(converter.send_message_async("123456789", "sample text"))
+
+        scheduler.acquire.assert_awaited_with(
+            self._phone_identifier,
+            "123456789",
+        )
+        async_sender.request.assert_awaited_once()
+
     def test_get_message_from_whatsapp_hook_invalid_value(self):
         """
         Tests invalid value received from a whatsapp hook call
@@ -424,6 +620,7 @@ class TestWhatsappCloudApiConverter(unittest.TestCase):
         text_message = self._prepare_whatsapp_message(
             {
                 "from": "12345678",
+                "id": "wamid.1",
                 "type": "text",
                 "text": {
                     "body": "sample text message"
@@ -435,6 +632,7 @@ class TestWhatsappCloudApiConverter(unittest.TestCase):
             text_message
         )
 
+        self.assertEqual(rasa_text_message["message_id"], "wamid.1")
         self.assertEqual(rasa_text_message["sender_id"], "12345678")
         self.assertEqual(rasa_text_message["text"], "sample text message")
         self.assertDictEqual(rasa_text_message["metadata"], {})
@@ -482,3 +680,235 @@ class TestWhatsappCloudApiConverter(unittest.TestCase):
         self.assertEqual(rasa_list_message["sender_id"], "12345678")
         self.assertEqual(rasa_list_message["text"], "sample_list_id")
         self.assertDictEqual(rasa_list_message["metadata"], {})
+
+    def test_get_message_from_whatsapp_hook_media_message(self):
+        """
+        Tests media received from a whatsapp hook call
+        """
+        image_message = self._prepare_whatsapp_message(
+            {
+                "from": "12345678",
+                "id": "wamid.1",
+                "type": "image",
+                "image":
+                    {
+                        "id": "media.1",
+                        "mime_type": "image/jpeg",
+                        "caption": "sample caption"
+                    }
+            }
+        )
+
+        rasa_image_message = self._converter.get_message_from_whatsapp_hook(
+            image_message
+        )
+
+        self.assertEqual(rasa_image_message["text"], "sample caption")
+        self.assertDictEqual(
+            rasa_image_message["metadata"],
+            {
+                "media":
+                    {
+                        "type": "image",
+                        "id": "media.1",
+                        "mime_type": "image/jpeg",
+                        "caption": "sample caption"
+                    }
+            },
+        )
+
+        audio_message = self._prepare_whatsapp_message(
+            {
+                "from": "12345678",
+                "type": "audio",
+                "audio": {
+                    "id": "media.2"
+                }
+            }
+        )
+
+        rasa_audio_message = self._converter.get_message_from_whatsapp_hook(
+            audio_message
+        )
+
+        self.assertEqual(rasa_audio_message["text"], "")
+        self.assertEqual(
+            rasa_audio_message["metadata"]["media"]["id"], "media.2"
+        )
+
+        self.assertRaises(
+            ValueError,
+            self._converter.get_message_from_whatsapp_hook,
+            self._prepare_whatsapp_message(
+                {
+                    "from": "12345678",
+                    "type": "document"
+                }
+            ),
+        )
+
+    @patch('requests.Session.post')
+    def test_get_message_from_whatsapp_hook_continuation(self, post_mock):
+        """
+        Tests replies to a "More…" row are answered with the next page
+        """
+        buttons = [
+            {
+                'title': f'Test Button {index}',
+                'payload': f'Payload Button {index}'
+            } for index in range(12)
+        ]
+        message = self._converter.prepare_message("12345678", "text", buttons)
+        rows = message['interactive']['action']['sections'][-1]['rows']
+
+        self.assertEqual(len(rows), 10)
+
+        continuation_message = self._prepare_whatsapp_message(
+            {
+                "from": "12345678",
+                "type": "interactive",
+                "interactive":
+                    {
+                        "type": "list_reply",
+                        "list_reply": {
+                            "id": rows[-1]['id']
+                        }
+                    }
+            }
+        )
+
+        rasa_message = self._converter.get_message_from_whatsapp_hook(
+            continuation_message
+        )
+
+        self.assertTrue(rasa_message['continuation'])
+        post_mock.assert_not_called()
+
+        self._converter.send_continuation(rasa_message)
+
+        page = post_mock.call_args.kwargs['json']
+        self.assertEqual(page['to'], "12345678")
+        self.assertEqual(
+            [
+                row['id']
+                for row in page['interactive']['action']['sections'][0]['rows']
+            ],
+            ['Payload Button 9', 'Payload Button 10', 'Payload Button 11'],
+        )
+
+    def test_continuation_cache_miss(self):
+        """
+        Tests a reply to a list page that is no longer cached is not flagged
+        as a continuation, so it goes to rasa
+        """
+        continuation_message = self._prepare_whatsapp_message(
+            {
+                "from": "12345678",
+                "type": "interactive",
+                "interactive":
+                    {
+                        "type": "list_reply",
+                        "list_reply": {
+                            "id": "__more__:0123456789abcdef:1"
+                        }
+                    }
+            }
+        )
+
+        with self.assertLogs('rasa_whatsapp_connector.whatsapp', 'WARNING'):
+            rasa_message = self._converter.get_message_from_whatsapp_hook(
+                continuation_message
+            )
+
+        self.assertNotIn('continuation', rasa_message)
+        self.assertEqual(rasa_message['text'], '__more__:0123456789abcdef:1')
+
+    @patch('requests.Session.post')
+    def test_send_messages(self, post_mock):
+        """
+        Tests sending the responses of a turn in order
+        """
+        sent = MagicMock()
+        sent.json.return_value = {'messages': [{'id': 'wamid.1'}]}
+        failed = MagicMock()
+        failed.json.return_value = {'error': {'code': 100}}
+        post_mock.side_effect = [sent, failed]
+
+        to = "123456789"
+        buttons = self._get_buttons_below_limit_interactive()
+        responses = [
+            {
+                "text": "first"
+            },
+            {
+                "text": "second",
+                "buttons": buttons
+            },
+            {
+                "text": "third"
+            },
+        ]
+
+        results = self._converter.send_messages(to, responses)
+
+        self.assertEqual(post_mock.call_count, 2)
+        self.assertEqual(
+            post_mock.call_args_list[1].kwargs['json'],
+            self._get_expected_buttons_below_limit_interactive(to, "second"),
+        )
+        self.assertTrue(results[0].ok)
+        self.assertEqual(results[0].response, {'messages': [{'id': 'wamid.1'}]})
+        self.assertIsInstance(results[1].error, GraphApiError)
+        self.assertTrue(results[2].skipped)
+
+        post_mock.side_effect = [failed, sent]
+        results = self._converter.send_messages(
+            to,
+            responses[:2],
+            stop_on_error=False,
+        )
+
+        self.assertFalse(results[0].ok)
+        self.assertTrue(results[1].ok)
+
+    def test_send_messages_async(self):
+        """
+        Tests sending the responses of a turn without blocking
+        """
+        async_sender = AsyncMock()
+        async_sender.request.side_effect = [
+            (200, {
+                'messages': []
+            }),
+            (200, {
+                'messages': []
+            }),
+        ]
+        converter = RasaToWhatsappConverter(
+            self._phone_identifier,
+            self._token,
+            self._graphql_api_version,
+            self._timeout,
+            async_sender=async_sender,
+        )
+
+        results = asyncio.run(
+            converter.send_messages_async(
+                "123456789",
+                [{
+                    "text": "first"
+                }, {
+                    "text": "second",
+                    "buttons": []
+                }],
+            )
+        )
+
+        self.assertTrue(all(result.ok for result in results))
+        self.assertEqual(
+            [
+                json.loads(call.args[2])['text']['body']
+                for call in async_sender.request.call_args_list
+            ],
+            ["first", "second"],
+        )
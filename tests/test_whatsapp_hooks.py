@@ -0,0 +1,199 @@
+from typing import Any, Dict
+
+import unittest
+
+from rasa_whatsapp_connector.whatsapp import RasaToWhatsappConverter
+from tests.helpers import MALFORMED_HOOKS
+
+
+class TestWhatsappHookIteration(unittest.TestCase):
+    """
+    Tests iterating over the messages of batched whatsapp hook calls
+    """
+    def setUp(self):
+        self._converter = RasaToWhatsappConverter('987654321', 'sample_token')
+
+    def _prepare_whatsapp_value(self, data: Dict[str, Any]):
+        return {"entry": [{"changes": [{"value": data}]}]}
+
+    def test_iter_messages_from_whatsapp_hook(self):
+        """
+        Tests iterating over every message of a batched whatsapp hook call
+        """
+        def text_message(sender_id: str, body: str):
+            return {"from": sender_id, "type": "text", "text": {"body": body}}
+
+        data = {
+            "entry":
+                [
+                    {
+                        "changes":
+                            [
+                                {
+                                    "value":
+                                        {
+                                            "messages":
+                                                [
+                                                    text_message("1", "a"),
+                                                    text_message("2", "b"),
+                                                ]
+                                        }
+                                }, {
+                                    "value": {
+                                        "statuses": [{}]
+                                    }
+                                }
+                            ]
+                    }, {
+                        "changes":
+                            [
+                                {
+                                    "value":
+                                        {
+                                            "messages":
+                                                [
+                                                    {
+                                                        "from": "3",
+                                                        "type": "unsupported"
+                                                    },
+                                                    text_message("4", "c"),
+                                                ]
+                                        }
+                                }
+                            ]
+                    }, {}
+                ]
+        }
+
+        messages = list(self._converter.iter_messages_from_whatsapp_hook(data))
+
+        self.assertEqual(
+            [(m["sender_id"], m["text"]) for m in messages],
+            [("1", "a"), ("2", "b"), ("4", "c")],
+        )
+
+        self.assertEqual(
+            list(self._converter.iter_messages_from_whatsapp_hook({})),
+            [],
+        )
+
+    def test_iter_messages_from_malformed_whatsapp_hook(self):
+        """
+        Tests malformed elements of a hook call are skipped without losing
+        the valid messages around them
+        """
+        valid = {"from": "1", "type": "text", "text": {"body": "a"}}
+        data = {
+            "entry":
+                [
+                    5,
+                    {
+                        "changes": 3
+                    },
+                    {
+                        "changes": [7, {
+                            "value": "value"
+                        }]
+                    },
+                    {
+                        "changes":
+                            [
+                                {
+                                    "value":
+                                        {
+                                            "metadata":
+                                                4,
+                                            "messages":
+                                                [
+                                                    "message",
+                                                    None,
+                                                    {
+                                                        "from": "2",
+                                                        "type": "text",
+                                                        "text": "b"
+                                                    },
+                                                    valid,
+                                                ]
+                                        }
+                                }, {
+                                    "value": {
+                                        "messages": 3
+                                    }
+                                }
+                            ]
+                    },
+                ]
+        }
+
+        messages = list(self._converter.iter_messages_from_whatsapp_hook(data))
+
+        self.assertEqual(
+            [(m["sender_id"], m["text"]) for m in messages],
+            [("1", "a")],
+        )
+
+        for data in ({"entry": 5}, {"entry": None}, []):
+            self.assertEqual(
+                list(self._converter.iter_messages_from_whatsapp_hook(data)),
+                [],
+            )
+
+        for data in (
+            *MALFORMED_HOOKS,
+            {
+                "entry": [{
+                    "changes": [{
+                        "value": {
+                            "messages": [3]
+                        }
+                    }]
+                }]
+            },
+        ):
+            self.assertRaises(
+                ValueError,
+                self._converter.get_message_from_whatsapp_hook,
+                data,
+            )
+
+    def test_iter_inbound_messages_from_whatsapp_hook(self):
+        """
+        Tests iterating over the typed messages of a whatsapp hook call
+        """
+        message = {
+            "from": "12345678",
+            "id": "wamid.1",
+            "timestamp": "1700000000",
+            "type": "interactive",
+            "interactive":
+                {
+                    "type": "list_reply",
+                    "list_reply": {
+                        "id": "sample_list_id"
+                    }
+                }
+        }
+        data = self._prepare_whatsapp_value(
+            {
+                "metadata": {
+                    "phone_number_id": "987654321"
+                },
+                "messages": [message]
+            }
+        )
+
+        inbound_messages = list(
+            self._converter.iter_inbound_messages_from_whatsapp_hook(data)
+        )
+
+        self.assertEqual(len(inbound_messages), 1)
+
+        inbound_message = inbound_messages[0]
+        self.assertEqual(inbound_message.sender_id, "12345678")
+        self.assertEqual(inbound_message.text, "sample_list_id")
+        self.assertEqual(inbound_message.payload, "sample_list_id")
+        self.assertEqual(inbound_message.type, "interactive")
+        self.assertEqual(inbound_message.message_id, "wamid.1")
+        self.assertEqual(inbound_message.timestamp, "1700000000")
+        self.assertEqual(inbound_message.phone_number_id, "987654321")
+        self.assertIs(inbound_message.raw, message)